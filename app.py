@@ -1,10 +1,20 @@
 import streamlit as st
-import time
-from src.logger import logger
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from src.logger import logger, new_correlation_id
 from src.personality import get_greeting, get_name
 from src.url_handler import fetch_article_from_url, URLHandlerError
-from src.pdf_handler import extract_text_from_pdf, PDFHandlerError
+from src.pdf_handler import PDFHandlerError
+from src.pdf_store import get_pdf_store
 from src.summarizer import get_summarizer, SummarizerError
+from src.memory import ConversationMemory
+from src.batch import parse_url_list, summarize_urls
+from src.rate_limiter import current_session
+from src.resources import ResourceRegistry, get_registry
+from src.metrics import metrics
+from src.session_memory import SESSION_MEMORY_BUDGET, format_bytes, measure, trim_oldest
+
+HISTORY_PAGE_SIZE = 20
+MEMORY_FIRST_KEYS = ("messages", "memory", "current_pdf")
 
 st.set_page_config(
     page_title=f"{get_name()} - AI Assistant",
@@ -18,21 +28,159 @@ def show_loading(message: str):
 def show_loading_spinner(message: str):
     return st.spinner(f"⏳ {message}")
 
+# Interactive answers stay on the synchronous streaming API on purpose: st.write_stream
+# has to be driven from the session's script thread, which waits for the whole answer
+# either way, so running the model stream on the shared event loop would not free a
+# thread. Batch work, which fans out many calls per session, runs on the loop.
+def stream_until_first_chunk(stream, loading_placeholder):
+    try:
+        for i, chunk in enumerate(stream):
+            if i == 0:
+                loading_placeholder.empty()
+            yield chunk
+    finally:
+        loading_placeholder.empty()
+
 def init_session_state():
     if "messages" not in st.session_state:
         st.session_state.messages = []
     if "greeting_shown" not in st.session_state:
         st.session_state.greeting_shown = False
-    if "current_pdf_text" not in st.session_state:
-        st.session_state.current_pdf_text = None
+    if "current_pdf" not in st.session_state:
+        st.session_state.current_pdf = None
     if "current_pdf_name" not in st.session_state:
         st.session_state.current_pdf_name = None
+    if "memory" not in st.session_state:
+        st.session_state.memory = ConversationMemory()
+    if "history_limit" not in st.session_state:
+        st.session_state.history_limit = HISTORY_PAGE_SIZE
+    if "pdf_uploads" not in st.session_state:
+        st.session_state.pdf_uploads = 0
+    if "memory_evictions" not in st.session_state:
+        st.session_state.memory_evictions = 0
+
+@st.cache_resource(show_spinner=False)
+def get_resources() -> ResourceRegistry:
+    logger.info("Starting EIT Assistant application")
+    registry = get_registry()
+    registry.warm_up()
+    return registry
+
+def show_resource_status(resources: ResourceRegistry):
+    health = resources.health()
+    if health["ready"]:
+        return
+    failed = [name for name, r in health["resources"].items() if r["state"] == "failed" and r["required"]]
+    if failed:
+        st.caption(f"⚠️ Some services are unavailable: {', '.join(failed)}")
+    elif health["warming"]:
+        st.caption("⏳ EIT is warming up, the first answer may take a moment...")
+
+def bind_session():
+    new_correlation_id()
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        current_session.set(ctx.session_id)
+
+def release_pdf(keep_doc_id: str = None):
+    doc_id = st.session_state.get("current_pdf")
+    if doc_id is None or doc_id == keep_doc_id:
+        return
+    try:
+        get_summarizer().release_document(doc_id)
+    except Exception as e:
+        logger.warning(f"Could not release cached PDF context: {str(e)}")
+
+def pdf_chat_key(pdf_name: str) -> str:
+    return f"pdf_chat_{pdf_name}"
+
+def drop_pdf_chats(keep_key: str = None):
+    for key in [k for k in st.session_state.keys() if k.startswith("pdf_chat_") and not k.endswith("_limit")]:
+        if key != keep_key:
+            del st.session_state[key]
+            st.session_state.pop(f"{key}_limit", None)
+
+def unload_pdf():
+    release_pdf()
+    drop_pdf_chats()
+    st.session_state.current_pdf = None
+    st.session_state.current_pdf_name = None
 
 def clear_chat():
+    unload_pdf()
     st.session_state.messages = []
     st.session_state.greeting_shown = False
-    st.session_state.current_pdf_text = None
-    st.session_state.current_pdf_name = None
+    st.session_state.memory = ConversationMemory()
+    st.session_state.history_limit = HISTORY_PAGE_SIZE
+
+def session_memory_usage() -> dict:
+    return measure({key: st.session_state[key] for key in st.session_state.keys()}, MEMORY_FIRST_KEYS)
+
+def evicted(kind: str, description: str, freed: int):
+    st.session_state.memory_evictions += 1
+    metrics.inc("cantell_session_evictions_total", kind=kind)
+    logger.info(f"Session over its memory budget, evicted {description} ({format_bytes(freed)})")
+
+# Keeps each session under SESSION_MEMORY_BUDGET, evicting in order: chat
+# histories of PDFs that are no longer loaded, the oldest messages (always
+# keeping the last page of history), and finally the loaded PDF itself, whose
+# text stays in the on-disk store if it is uploaded again.
+def enforce_memory_budget(budget: int = SESSION_MEMORY_BUDGET) -> dict:
+    usage = session_memory_usage()
+    used = sum(usage.values())
+    if used <= budget:
+        return usage
+    
+    current_key = pdf_chat_key(st.session_state.current_pdf_name) if st.session_state.current_pdf else None
+    stale = sum(size for key, size in usage.items() if key.startswith("pdf_chat_") and key != current_key)
+    if stale:
+        drop_pdf_chats(keep_key=current_key)
+        used -= stale
+        evicted("pdf_chat", "chats about PDFs that are no longer loaded", stale)
+    
+    if used > budget:
+        removed = trim_oldest(st.session_state.messages, used - budget, HISTORY_PAGE_SIZE)
+        if removed:
+            removed_ids = {id(message) for message in removed}
+            if current_key and current_key in st.session_state:
+                st.session_state[current_key] = [m for m in st.session_state[current_key] if id(m) not in removed_ids]
+            before = used
+            used = sum(session_memory_usage().values())
+            evicted("messages", f"the {len(removed)} oldest messages", before - used)
+    
+    if used > budget and st.session_state.current_pdf:
+        name = st.session_state.current_pdf_name
+        unload_pdf()
+        before = used
+        used = sum(session_memory_usage().values())
+        evicted("pdf", f"the loaded PDF {name}", before - used)
+        st.toast(f"📄 {name} was unloaded to free memory. Upload it again to keep asking about it.")
+    
+    return session_memory_usage()
+
+# Chat, URL and PDF interactions rerun only their fragment, so each pane checks
+# the budget once it has added to the history or replaced the loaded PDF. When
+# anything was evicted the whole app reruns, so the history, the panes and the
+# memory report all show what is left.
+def check_memory_budget():
+    evictions = st.session_state.memory_evictions
+    enforce_memory_budget()
+    if st.session_state.memory_evictions != evictions:
+        st.rerun()
+
+def show_memory_report(usage: dict, budget: int = SESSION_MEMORY_BUDGET):
+    used = sum(usage.values())
+    with st.sidebar.expander("🧠 Session memory"):
+        st.progress(min(used / budget, 1.0), text=f"{format_bytes(used)} of {format_bytes(budget)}")
+        largest = sorted(usage.items(), key=lambda item: item[1], reverse=True)[:8]
+        st.markdown("\n".join(f"- `{key}`: {format_bytes(size)}" for key, size in largest))
+
+def remember_turn(user_content: str, assistant_content: str):
+    st.session_state.messages.append({"role": "assistant", "content": assistant_content})
+    try:
+        st.session_state.memory.add_turn(user_content, assistant_content, get_summarizer())
+    except Exception as e:
+        logger.warning(f"Could not update conversation memory: {str(e)}")
 
 def show_greeting():
     if not st.session_state.greeting_shown:
@@ -50,14 +198,16 @@ def handle_url_summarization(url: str):
         loading_placeholder.info("✍️ Summarizing article... Please wait...")
         
         summarizer = get_summarizer()
-        summary = summarizer.summarize_text(article_text)
-        loading_placeholder.empty()
+        with st.chat_message("assistant"):
+            st.markdown("**📝 Article Summary:**")
+            summary = st.write_stream(
+                stream_until_first_chunk(summarizer.summarize_text_stream(article_text), loading_placeholder)
+            )
         
         st.session_state.messages.append({"role": "user", "content": f"🔗 Summarize URL: {url}"})
-        st.session_state.messages.append({"role": "assistant", "content": f"**📝 Article Summary:**\n\n{summary}"})
+        remember_turn(f"🔗 Summarize URL: {url}", f"**📝 Article Summary:**\n\n{summary}")
         
         st.success("✅ Summary generated successfully!")
-        st.chat_message("assistant").markdown(f"**📝 Article Summary:**\n\n{summary}")
         
     except URLHandlerError as e:
         st.error(f"❌ Error fetching URL: {str(e)}")
@@ -69,28 +219,81 @@ def handle_url_summarization(url: str):
         st.error(f"❌ An unexpected error occurred: {str(e)}")
         logger.error(f"Unexpected error in URL summarization: {str(e)}")
 
-def handle_pdf_summarization(pdf_file):
+def handle_batch_url_summarization(urls: list):
     try:
-        loading_placeholder = st.empty()
-        loading_placeholder.info("📄 Extracting text from PDF... Please wait...")
+        summarizer = get_summarizer()
+        progress_bar = st.progress(0, text=f"Summarizing {len(urls)} URLs...")
+        completed = 0
+        succeeded = []
+        failed = 0
         
-        pdf_text = extract_text_from_pdf(pdf_file)
-        loading_placeholder.empty()
+        for result in summarize_urls(urls, summarizer):
+            completed += 1
+            progress_bar.progress(completed / len(urls), text=f"Summarized {completed} of {len(urls)} URLs")
+            
+            if result["error"]:
+                failed += 1
+                st.error(f"❌ {result['url']}: {result['error']}")
+                continue
+            
+            content = f"**📝 Article Summary:**\n\n{result['summary']}"
+            with st.chat_message("assistant"):
+                st.markdown(f"🔗 {result['url']}")
+                st.markdown(content)
+            
+            st.session_state.messages.append({"role": "user", "content": f"🔗 Summarize URL: {result['url']}"})
+            st.session_state.messages.append({"role": "assistant", "content": content})
+            succeeded.append(result)
         
-        loading_placeholder.info("✍️ Summarizing PDF... Please wait...")
+        progress_bar.empty()
+        
+        if succeeded:
+            digest = "\n\n".join(f"{r['url']}:\n{r['summary']}" for r in succeeded)
+            st.session_state.memory.add_turn(f"🔗 Summarize {len(succeeded)} URLs", digest, summarizer)
+        
+        st.success(f"✅ Summarized {len(succeeded)} of {len(urls)} URLs" + (f" ({failed} failed)" if failed else ""))
+        
+    except SummarizerError as e:
+        st.error(f"❌ Error summarizing: {str(e)}")
+        logger.error(f"Summarizer Error: {str(e)}")
+    except Exception as e:
+        st.error(f"❌ An unexpected error occurred: {str(e)}")
+        logger.error(f"Unexpected error in batch URL summarization: {str(e)}")
+
+def handle_pdf_summarization(pdf_file):
+    try:
+        store = get_pdf_store()
+        sha256, pages = store.iter_pages(pdf_file)
         
         summarizer = get_summarizer()
-        summary = summarizer.summarize_text(pdf_text)
-        loading_placeholder.empty()
+        summary = ""
+        with st.chat_message("assistant"):
+            st.markdown("**📄 PDF Summary:**")
+            progress_bar = st.progress(0.0, text="📄 Reading PDF... Please wait...")
+            summary_placeholder = st.empty()
+            for progress in summarizer.summarize_pages(pages, doc_id=sha256):
+                if progress.total_pages:
+                    status = f"📄 Read page {progress.pages_read} of {progress.total_pages}"
+                    if progress.summarized_through:
+                        status += f" · summary covers pages 1–{progress.summarized_through}"
+                    progress_bar.progress(min(progress.pages_read / progress.total_pages, 1.0), text=status)
+                if progress.summary != summary:
+                    summary = progress.summary
+                    summary_placeholder.markdown(summary)
+            progress_bar.empty()
         
-        st.session_state.current_pdf_text = pdf_text
+        if store.index(sha256) is None:
+            raise PDFHandlerError("The extracted PDF text could not be saved. Please try again.")
+        release_pdf(keep_doc_id=sha256)
+        drop_pdf_chats(keep_key=pdf_chat_key(pdf_file.name))
+        st.session_state.pdf_uploads += 1
+        st.session_state.current_pdf = sha256
         st.session_state.current_pdf_name = pdf_file.name
         
         st.session_state.messages.append({"role": "user", "content": f"📄 Summarize PDF: {pdf_file.name}"})
-        st.session_state.messages.append({"role": "assistant", "content": f"**📄 PDF Summary:**\n\n{summary}"})
+        remember_turn(f"📄 Summarize PDF: {pdf_file.name}", f"**📄 PDF Summary:**\n\n{summary}")
         
         st.success("✅ PDF Summary generated! You can now ask questions about this PDF below.")
-        st.chat_message("assistant").markdown(f"**📄 PDF Summary:**\n\n{summary}")
         
     except PDFHandlerError as e:
         st.error(f"❌ Error processing PDF: {str(e)}")
@@ -107,29 +310,19 @@ def handle_chat(user_message: str):
     
     try:
         loading_placeholder = st.empty()
-        progress_bar = st.progress(0)
-        
         loading_placeholder.info("🤔 EIT is thinking... Please wait...")
-        progress_bar.progress(25)
         
         summarizer = get_summarizer()
-        history = [
-            {"user": m["content"], "assistant": st.session_state.messages[i+1]["content"]}
-            for i, m in enumerate(st.session_state.messages[:-1])
-            if m["role"] == "user" and i + 1 < len(st.session_state.messages) and st.session_state.messages[i+1]["role"] == "assistant"
-        ]
-        
-        progress_bar.progress(50)
-        loading_placeholder.info("💭 Generating response...")
+        memory = st.session_state.memory
         
-        response = summarizer.chat(user_message, history)
-        
-        progress_bar.progress(100)
-        loading_placeholder.empty()
-        progress_bar.empty()
+        with st.chat_message("assistant"):
+            response = st.write_stream(
+                stream_until_first_chunk(
+                    summarizer.chat_stream(user_message, memory.history(), memory.summary), loading_placeholder
+                )
+            )
         
-        st.session_state.messages.append({"role": "assistant", "content": response})
-        st.chat_message("assistant").markdown(response)
+        remember_turn(user_message, response)
         
     except SummarizerError as e:
         st.error(f"❌ Error: {str(e)}")
@@ -138,46 +331,170 @@ def handle_chat(user_message: str):
         st.error(f"❌ An unexpected error occurred: {str(e)}")
         logger.error(f"Unexpected error in chat: {str(e)}")
 
-def handle_pdf_chat(user_message: str, pdf_text: str, pdf_name: str):
+def handle_pdf_chat(user_message: str, doc_id: str, pdf_name: str):
     st.session_state.messages.append({"role": "user", "content": user_message})
     
     try:
         loading_placeholder = st.empty()
-        progress_bar = st.progress(0)
-        
         loading_placeholder.info("🤔 EIT is analyzing the PDF... Please wait...")
-        progress_bar.progress(25)
-        
-        summarizer = get_summarizer()
         
-        progress_bar.progress(50)
-        loading_placeholder.info("💭 Generating response based on PDF content...")
+        pdf_index = get_pdf_store().index(doc_id)
+        if pdf_index is None:
+            loading_placeholder.empty()
+            raise PDFHandlerError(f"The text of {pdf_name} is no longer stored. Please upload it again.")
         
-        response = summarizer.chat_about_pdf(user_message, pdf_text)
-        
-        progress_bar.progress(100)
-        loading_placeholder.empty()
-        progress_bar.empty()
+        summarizer = get_summarizer()
+        with st.chat_message("assistant"):
+            response = st.write_stream(
+                stream_until_first_chunk(
+                    summarizer.chat_about_pdf_stream(user_message, pdf_index=pdf_index), loading_placeholder
+                )
+            )
         
-        st.session_state.messages.append({"role": "assistant", "content": response})
-        st.chat_message("assistant").markdown(response)
+        remember_turn(user_message, response)
         
-    except SummarizerError as e:
+    except (PDFHandlerError, SummarizerError) as e:
         st.error(f"❌ Error: {str(e)}")
         logger.error(f"PDF Chat Error: {str(e)}")
     except Exception as e:
         st.error(f"❌ An unexpected error occurred: {str(e)}")
         logger.error(f"Unexpected error in PDF chat: {str(e)}")
 
+def render_message(message: dict):
+    with st.chat_message(message["role"]):
+        st.markdown(message["content"])
+
+def show_more(limit_key: str):
+    st.session_state[limit_key] += HISTORY_PAGE_SIZE
+
+def render_paginated(messages: list, limit_key: str, label: str = "messages"):
+    if limit_key not in st.session_state:
+        st.session_state[limit_key] = HISTORY_PAGE_SIZE
+    
+    hidden = max(0, len(messages) - st.session_state[limit_key])
+    if hidden:
+        st.button(f"⬆️ Show earlier {label} ({hidden} hidden)", key=f"{limit_key}_more",
+                  on_click=show_more, args=(limit_key,))
+    
+    for message in messages[hidden:]:
+        render_message(message)
+
+def render_pane_messages(pane: str):
+    messages = st.session_state.messages
+    indexes = st.session_state.pane_messages.get(pane, [])
+    for index in indexes[-HISTORY_PAGE_SIZE:]:
+        render_message(messages[index])
+
+def track_pane_messages(pane: str, start: int):
+    added = range(start, len(st.session_state.messages))
+    st.session_state.pane_messages.setdefault(pane, []).extend(added)
+
+@st.fragment
+def history_pane():
+    render_paginated(st.session_state.messages[:st.session_state.history_end], "history_limit")
+
+@st.fragment
+def chat_pane():
+    bind_session()
+    prompt = st.chat_input("Type your message here...")
+    render_pane_messages("chat")
+    
+    if prompt:
+        start = len(st.session_state.messages)
+        st.chat_message("user").markdown(prompt)
+        handle_chat(prompt)
+        track_pane_messages("chat", start)
+        check_memory_budget()
+
+@st.fragment
+def url_pane():
+    bind_session()
+    render_pane_messages("url")
+    start = len(st.session_state.messages)
+    submitted = False
+    
+    with st.form("url_form"):
+        url_input = st.text_input("Enter article URL:", placeholder="https://example.com/article")
+        submit_url = st.form_submit_button("Summarize URL")
+        
+        if submit_url and url_input:
+            handle_url_summarization(url_input)
+            submitted = True
+        elif submit_url and not url_input:
+            st.warning("Please enter a URL")
+    
+    with st.expander("📚 Batch mode: summarize many URLs"):
+        with st.form("batch_url_form"):
+            batch_input = st.text_area("Paste URLs (one per line):", placeholder="https://example.com/article-1\nhttps://example.com/article-2")
+            batch_file = st.file_uploader("Or upload a list of URLs:", type=["txt", "csv"])
+            submit_batch = st.form_submit_button("Summarize URLs")
+            
+            if submit_batch:
+                batch_text = batch_input or ""
+                if batch_file is not None:
+                    batch_text += "\n" + batch_file.getvalue().decode("utf-8", errors="ignore")
+                urls = parse_url_list(batch_text)
+                if urls:
+                    handle_batch_url_summarization(urls)
+                    submitted = True
+                else:
+                    st.warning("Please enter at least one URL")
+    
+    track_pane_messages("url", start)
+    if submitted:
+        check_memory_budget()
+
+@st.fragment
+def pdf_pane():
+    bind_session()
+    render_pane_messages("pdf")
+    start = len(st.session_state.messages)
+    
+    with st.form("pdf_form"):
+        pdf_input = st.file_uploader("Upload a PDF file:", type=["pdf"], key=f"pdf_upload_{st.session_state.pdf_uploads}")
+        submit_pdf = st.form_submit_button("Summarize PDF")
+        
+        if submit_pdf and pdf_input:
+            handle_pdf_summarization(pdf_input)
+        elif submit_pdf and not pdf_input:
+            st.warning("Please upload a PDF file")
+    
+    track_pane_messages("pdf", start)
+    if submit_pdf and pdf_input:
+        check_memory_budget()
+    
+    if st.session_state.current_pdf:
+        st.divider()
+        st.markdown(f"### 💬 Chat about: *{st.session_state.current_pdf_name}*")
+        
+        chat_key = pdf_chat_key(st.session_state.current_pdf_name)
+        
+        if chat_key not in st.session_state:
+            st.session_state[chat_key] = []
+        
+        render_paginated(st.session_state[chat_key], f"{chat_key}_limit", "questions")
+        
+        if pdf_chat_prompt := st.chat_input(f"Ask questions about {st.session_state.current_pdf_name}..."):
+            st.chat_message("user").markdown(pdf_chat_prompt)
+            
+            start = len(st.session_state.messages)
+            handle_pdf_chat(pdf_chat_prompt, st.session_state.current_pdf, st.session_state.current_pdf_name)
+            st.session_state[chat_key].extend(st.session_state.messages[start:])
+            check_memory_budget()
+
 def main():
+    resources = get_resources()
+    bind_session()
     init_session_state()
+    memory_usage = enforce_memory_budget()
+    st.session_state.history_end = len(st.session_state.messages)
+    st.session_state.pane_messages = {}
     
     st.title(f"🤖 {get_name()} - AI Assistant")
+    show_resource_status(resources)
+    show_memory_report(memory_usage)
     st.markdown("---")
     
-    with st.spinner("🤖 Loading EIT Assistant..."):
-        time.sleep(0.5)
-    
     show_greeting()
     
     col1, col2 = st.columns([6, 1])
@@ -186,62 +503,20 @@ def main():
             clear_chat()
             st.rerun()
     
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
+    history_pane()
     
     st.markdown("### 📌 Choose an option:")
     
     tab1, tab2, tab3 = st.tabs(["💬 Chat", "🔗 URL Summary", "📄 PDF Summary"])
     
     with tab1:
-        if prompt := st.chat_input("Type your message here..."):
-            st.chat_message("user").markdown(prompt)
-            handle_chat(prompt)
+        chat_pane()
     
     with tab2:
-        with st.form("url_form"):
-            url_input = st.text_input("Enter article URL:", placeholder="https://example.com/article")
-            submit_url = st.form_submit_button("Summarize URL")
-            
-            if submit_url and url_input:
-                handle_url_summarization(url_input)
-            elif submit_url and not url_input:
-                st.warning("Please enter a URL")
+        url_pane()
     
     with tab3:
-        with st.form("pdf_form"):
-            pdf_input = st.file_uploader("Upload a PDF file:", type=["pdf"])
-            submit_pdf = st.form_submit_button("Summarize PDF")
-            
-            if submit_pdf and pdf_input:
-                handle_pdf_summarization(pdf_input)
-            elif submit_pdf and not pdf_input:
-                st.warning("Please upload a PDF file")
-        
-        if st.session_state.current_pdf_text:
-            st.divider()
-            st.markdown(f"### 💬 Chat about: *{st.session_state.current_pdf_name}*")
-            
-            pdf_chat_key = f"pdf_chat_{st.session_state.current_pdf_name}"
-            
-            if pdf_chat_key not in st.session_state:
-                st.session_state[pdf_chat_key] = []
-            
-            for msg in st.session_state[pdf_chat_key]:
-                with st.chat_message(msg["role"]):
-                    st.markdown(msg["content"])
-            
-            if pdf_chat_prompt := st.chat_input(f"Ask questions about {st.session_state.current_pdf_name}..."):
-                st.chat_message("user").markdown(pdf_chat_prompt)
-                
-                st.session_state[pdf_chat_key].append({"role": "user", "content": pdf_chat_prompt})
-                
-                handle_pdf_chat(pdf_chat_prompt, st.session_state.current_pdf_text, st.session_state.current_pdf_name)
-                
-                response = st.session_state.messages[-1]["content"]
-                st.session_state[pdf_chat_key].append({"role": "assistant", "content": response})
+        pdf_pane()
 
 if __name__ == "__main__":
-    logger.info("Starting EIT Assistant application")
     main()
@@ -0,0 +1,325 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures", "html")
+SCENARIOS = ("fetch", "pdf", "summarize", "summarize_long", "stream")
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "ttft_p50_ms", "ttft_p95_ms", "peak_rss_mb")
+HIGHER_IS_BETTER = ("throughput_per_s", "pages_per_s")
+
+def make_pdf(pages: int, lines_per_page: int = 40) -> bytes:
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(pages))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    font_id = 3 + 2 * pages
+    for i in range(pages):
+        lines = [f"Page {i + 1} line {j}: the committee reviewed the quarterly figures, and the board agreed"
+                 for j in range(lines_per_page)]
+        content = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(f"({line}) '" for line in lines) + " ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>".encode())
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+def load_fixtures() -> dict:
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, "rb") as f:
+            fixtures[os.path.basename(path)] = f.read()
+    if not fixtures:
+        sys.exit(f"No HTML fixtures found in {FIXTURES_DIR}")
+    return fixtures
+
+def start_fixture_server(fixtures: dict, latency: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = fixtures.get(self.path.split("?")[0].lstrip("/"))
+            if latency:
+                time.sleep(latency)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+def latency_stats(latencies: list, elapsed: float) -> dict:
+    return {
+        "count": len(latencies),
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+def run_concurrently(fn, items: list, concurrency: int) -> dict:
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def timed(item):
+        started = time.perf_counter()
+        try:
+            fn(item)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+            return
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, items))
+    stats = latency_stats(latencies, time.perf_counter() - started)
+    stats["errors"] = len(errors)
+    return stats
+
+def fake_summarizer(args):
+    from src.fake_model import FakeModel
+    from src.summarizer import ArticleSummarizer
+
+    token_latency = 1.0 / args.token_rate if args.token_rate else 0.0
+    model = FakeModel(latency=args.model_latency, token_latency=token_latency)
+    return ArticleSummarizer(model=model, max_workers=args.concurrency)
+
+def article_texts() -> list:
+    from src.extraction import get_extractor
+
+    texts = []
+    for name, content in load_fixtures().items():
+        title, text = get_extractor().extract(content)
+        texts.append(f"{title}\n\n{text}")
+    return texts
+
+def scenario_fetch(args) -> dict:
+    from src.url_handler import fetch_article_from_url
+
+    fixtures = load_fixtures()
+    server = start_fixture_server(fixtures, args.server_latency)
+    names = list(fixtures)
+    urls = [f"http://127.0.0.1:{server.server_port}/{names[i % len(names)]}?request={i}" for i in range(args.requests)]
+    try:
+        return run_concurrently(fetch_article_from_url, urls, args.concurrency)
+    finally:
+        server.shutdown()
+
+def scenario_pdf(args) -> dict:
+    from src.pdf_handler import extract_text_from_pdf
+
+    results = {}
+    directory = tempfile.mkdtemp(prefix="cantell-bench-")
+    for pages in args.pdf_pages:
+        path = os.path.join(directory, f"{pages}.pdf")
+        with open(path, "wb") as f:
+            f.write(make_pdf(pages))
+        latencies = []
+        for _ in range(args.pdf_repeat):
+            started = time.perf_counter()
+            extract_text_from_pdf(path, max_pages=max(pages, 1))
+            latencies.append(time.perf_counter() - started)
+        stats = latency_stats(latencies, sum(latencies))
+        stats["pages_per_s"] = round(pages / statistics.median(latencies), 1)
+        results[f"{pages}_pages"] = stats
+    return results
+
+def scenario_summarize(args) -> dict:
+    summarizer = fake_summarizer(args)
+    texts = article_texts()
+    # Every request is a distinct text, so identical in-flight summaries are not
+    # coalesced and each request costs its own model call.
+    items = [f"{texts[i % len(texts)]}\n\nRequest {i}." for i in range(args.requests)]
+    stats = run_concurrently(summarizer.summarize_text, items, args.concurrency)
+    stats["model_calls"] = summarizer.model.call_count // args.requests
+    return stats
+
+def scenario_summarize_long(args) -> dict:
+    summarizer = fake_summarizer(args)
+    document = "\n\n".join(article_texts())
+    repeats = max(1, args.long_doc_tokens * 4 // len(document))
+    document = "\n\n".join([document] * repeats)
+    stats = run_concurrently(summarizer.summarize_text, [document] * args.long_doc_repeat, 1)
+    stats["model_calls"] = summarizer.model.call_count // args.long_doc_repeat
+    return stats
+
+def scenario_stream(args) -> dict:
+    summarizer = fake_summarizer(args)
+    first_tokens = []
+    lock = threading.Lock()
+
+    def chat(message: str):
+        started = time.perf_counter()
+        for i, _ in enumerate(summarizer.chat_stream(message)):
+            if i == 0:
+                with lock:
+                    first_tokens.append(time.perf_counter() - started)
+
+    stats = run_concurrently(chat, [f"Question {i}: what changed this quarter?" for i in range(args.requests)],
+                             args.concurrency)
+    stats["ttft_p50_ms"] = round(percentile(first_tokens, 0.50) * 1000, 2)
+    stats["ttft_p95_ms"] = round(percentile(first_tokens, 0.95) * 1000, 2)
+    return stats
+
+def peak_rss_mb() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(max(own, children) / scale, 1)
+
+def run_scenario(name: str, args):
+    os.environ["CANTELL_CACHE_DIR"] = tempfile.mkdtemp(prefix="cantell-bench-cache-")
+    os.environ["CANTELL_LOG_DIR"] = tempfile.mkdtemp(prefix="cantell-bench-logs-")
+    os.environ["CANTELL_LOG_DEBUG_RATE"] = "1"
+    result = globals()[f"scenario_{name}"](args)
+    result["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(result))
+
+def run_in_subprocess(name: str, argv: list) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), "--run-scenario", name] + argv
+    completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        sys.exit(f"Scenario {name} failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def flatten(results: dict) -> dict:
+    flat = {}
+    for scenario, values in results.items():
+        nested = {k: v for k, v in values.items() if isinstance(v, dict)}
+        for key, value in values.items():
+            if not isinstance(value, dict):
+                flat[(scenario, key)] = value
+        for group, stats in nested.items():
+            for key, value in stats.items():
+                flat[(f"{scenario}/{group}", key)] = value
+    return flat
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    current_flat = flatten(current)
+    for (scenario, metric), base in flatten(baseline).items():
+        value = current_flat.get((scenario, metric))
+        if value is None or not base or metric not in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            continue
+        change = (value - base) / base
+        worse = change > tolerance if metric in LOWER_IS_BETTER else change < -tolerance
+        print(f"{scenario:<28}{metric:<18}{base:>12}{value:>12}{change * 100:>+9.1f}%{'  REGRESSION' if worse else ''}")
+        if worse:
+            regressions.append((scenario, metric))
+    return regressions
+
+def print_results(results: dict):
+    for (scenario, metric), value in flatten(results).items():
+        print(f"{scenario:<28}{metric:<18}{value:>12}")
+
+def scenario_argv(args) -> list:
+    return [
+        "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+        "--server-latency", str(args.server_latency), "--model-latency", str(args.model_latency),
+        "--token-rate", str(args.token_rate), "--pdf-repeat", str(args.pdf_repeat),
+        "--long-doc-tokens", str(args.long_doc_tokens), "--long-doc-repeat", str(args.long_doc_repeat),
+        "--pdf-pages", *[str(p) for p in args.pdf_pages],
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="End-to-end benchmarks against a local fixture server, generated PDFs and a fake model."
+    )
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per fetch/summarize/stream scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--server-latency", type=float, default=0.02, help="Fixture server delay in seconds")
+    parser.add_argument("--model-latency", type=float, default=0.2, help="Fake model time to first token")
+    parser.add_argument("--token-rate", type=float, default=200, help="Fake model output tokens per second")
+    parser.add_argument("--pdf-pages", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--pdf-repeat", type=int, default=3)
+    parser.add_argument("--long-doc-tokens", type=int, default=60000, help="Size of the map-reduce document")
+    parser.add_argument("--long-doc-repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--save-baseline", help="Write the results to this baseline file")
+    parser.add_argument("--baseline", help="Compare against this baseline file and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative change before failing")
+    parser.add_argument("--run-scenario", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_scenario:
+        run_scenario(args.run_scenario, args)
+        return
+
+    results = {}
+    for name in args.scenarios:
+        print(f"Running {name}...", file=sys.stderr, flush=True)
+        results[name] = run_in_subprocess(name, scenario_argv(args))
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    print_results(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print()
+        print(f"{'scenario':<28}{'metric':<18}{'baseline':>12}{'current':>12}{'change':>10}")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
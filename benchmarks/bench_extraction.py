@@ -0,0 +1,55 @@
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.extraction import ENGINES
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+
+def time_engine(engine, content: bytes, repeat: int):
+    timings = []
+    text = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _, text = engine.extract(content)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), len(text)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare article extraction engines on saved HTML fixtures.")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Directory of .html fixtures")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per fixture and engine (median is reported)")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.fixtures, "*.html")))
+    if not paths:
+        sys.exit(f"No HTML fixtures found in {args.fixtures}")
+
+    engines = {name: ENGINES[name]() for name in args.engines}
+    totals = {name: 0.0 for name in engines}
+
+    header = f"{'fixture':<24}{'bytes':>9}" + "".join(f"{name + ' ms':>16}{name + ' chars':>18}" for name in engines)
+    print(header)
+    print("-" * len(header))
+
+    for path in paths:
+        with open(path, "rb") as f:
+            content = f.read()
+        row = f"{os.path.basename(path):<24}{len(content):>9}"
+        for name, engine in engines.items():
+            seconds, chars = time_engine(engine, content, args.repeat)
+            totals[name] += seconds
+            row += f"{seconds * 1000:>16.2f}{chars:>18}"
+        print(row)
+
+    print("-" * len(header))
+    print(f"{'total':<33}" + "".join(f"{totals[name] * 1000:>16.2f}{'':>18}" for name in engines))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+LOG_ENV = dict(os.environ, CANTELL_LOG_DIR=tempfile.mkdtemp(prefix="cantell-startup-logs-"))
+
+RENDER_SCRIPT = """
+import json, sys, time, warnings
+started = time.perf_counter()
+warnings.filterwarnings("ignore")
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=120)
+app.run()
+first = time.perf_counter() - started
+if app.exception:
+    sys.exit(f"App raised: {app.exception}")
+rerun_started = time.perf_counter()
+app.run()
+print(json.dumps({"first_render": first, "rerun": time.perf_counter() - rerun_started}))
+"""
+
+def app_imports(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+def parse_importtime(output: str) -> list:
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        try:
+            rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return rows
+
+def measure_imports(code: str) -> list:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=LOG_ENV,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"Import failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+def measure_render() -> dict:
+    result = subprocess.run([sys.executable, "-c", RENDER_SCRIPT, APP], cwd=ROOT, env=LOG_ENV,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"Render failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and time-to-first-render of the Streamlit app.")
+    parser.add_argument("--repeat", type=int, default=3, help="Cold runs per measurement (median is reported)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imported modules to list")
+    parser.add_argument("--max-import-ms", type=float, help="Fail if the app's own imports exceed this")
+    parser.add_argument("--max-render-ms", type=float, help="Fail if time to first render exceeds this")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    code = app_imports(APP)
+    baseline_runs = [sum(row[1] for row in measure_imports("import streamlit")) for _ in range(args.repeat)]
+    app_runs = [measure_imports(code) for _ in range(args.repeat)]
+    renders = [measure_render() for _ in range(args.repeat)]
+
+    streamlit_ms = statistics.median(baseline_runs) / 1000
+    total_ms = statistics.median(sum(row[1] for row in rows) for rows in app_runs) / 1000
+    own_ms = max(0.0, total_ms - streamlit_ms)
+    first_render_ms = statistics.median(r["first_render"] for r in renders) * 1000
+    rerun_ms = statistics.median(r["rerun"] for r in renders) * 1000
+
+    slowest = sorted(app_runs[-1], key=lambda row: -row[2])
+    top_level = [row for row in slowest if not row[0].startswith(" ") or row[0].strip().startswith("src")]
+
+    results = {
+        "streamlit_import_ms": round(streamlit_ms, 1),
+        "app_import_ms": round(total_ms, 1),
+        "app_own_import_ms": round(own_ms, 1),
+        "first_render_ms": round(first_render_ms, 1),
+        "rerun_ms": round(rerun_ms, 1),
+        "slowest_imports": [{"module": name.strip(), "cumulative_ms": round(cum / 1000, 1)}
+                            for name, _, cum in top_level[:args.top]],
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'streamlit import':<28}{streamlit_ms:>10.1f} ms")
+        print(f"{'app imports (total)':<28}{total_ms:>10.1f} ms")
+        print(f"{'app imports (own)':<28}{own_ms:>10.1f} ms")
+        print(f"{'time to first render':<28}{first_render_ms:>10.1f} ms")
+        print(f"{'rerun':<28}{rerun_ms:>10.1f} ms")
+        print()
+        print(f"{'slowest imports':<48}{'cumulative ms':>14}")
+        print("-" * 62)
+        for row in results["slowest_imports"]:
+            print(f"{row['module']:<48}{row['cumulative_ms']:>14.1f}")
+
+    failed = False
+    if args.max_import_ms is not None and own_ms > args.max_import_ms:
+        print(f"FAIL: app imports took {own_ms:.1f} ms (budget {args.max_import_ms:.1f} ms)", file=sys.stderr)
+        failed = True
+    if args.max_render_ms is not None and first_render_ms > args.max_render_ms:
+        print(f"FAIL: first render took {first_render_ms:.1f} ms (budget {args.max_render_ms:.1f} ms)", file=sys.stderr)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
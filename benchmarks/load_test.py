@@ -0,0 +1,340 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import warnings
+
+from bench_e2e import ROOT, load_fixtures, make_pdf, percentile, start_fixture_server
+
+APP_PATH = os.path.join(ROOT, "app.py")
+ACTIONS = ("chat", "url", "pdf", "pdf_chat")
+CHAT_PLACEHOLDER = "Type your message here..."
+
+# AppTest is written for one test at a time: every run installs a mock
+# Runtime singleton and removes it when it finishes, and compiles the script
+# again. With many sessions running at once, a run that finishes would pull the
+# Runtime from under the others, so the last mock stays installed, and one
+# script cache is shared the way a real server compiles app.py once.
+def allow_concurrent_app_tests():
+    from streamlit.runtime.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import local_script_runner
+
+    installed = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            installed[:] = [cls._instance]
+        if not installed:
+            raise RuntimeError("Runtime hasn't been created!")
+        return installed[0]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(installed))
+    shared_cache = ScriptCache()
+    local_script_runner.ScriptCache = lambda: shared_cache
+
+def install_fake_model(args):
+    import src.summarizer as summarizer_module
+    from src.cache import SummaryCache
+    from src.fake_model import FakeModel
+    from src.summarizer import ArticleSummarizer
+
+    token_latency = 1.0 / args.token_rate if args.token_rate else 0.0
+    model = FakeModel(latency=args.model_latency, token_latency=token_latency)
+    cache = SummaryCache() if args.summary_cache else None
+    summarizer_module.summarizer = ArticleSummarizer(model=model, cache=cache)
+    return model
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError):
+        scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+
+class RSSSampler:
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_mb())
+
+# One simulated browser session: its own AppTest (and so its own session state)
+# performing a weighted mix of actions with think time in between, recording
+# the latency of each script run and whether it ended in an exception or error.
+class SimulatedSession:
+    def __init__(self, number: int, args, origin: str, fixtures: list, pdf: bytes):
+        from streamlit.testing.v1 import AppTest
+
+        self.number = number
+        self.args = args
+        self.origin = origin
+        self.fixtures = fixtures
+        self.pdf = pdf
+        self.random = random.Random(args.seed + number)
+        self.app = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+        self.results = []
+        self.sequence = 0
+
+    def open(self):
+        self.app.run()
+        if self.app.exception:
+            raise RuntimeError(f"session {self.number} failed to start: {self.app.exception[0].message}")
+
+    def _chat_input(self, placeholder: str = None):
+        for chat_input in self.app.chat_input:
+            if placeholder is None or chat_input.proto.placeholder == placeholder:
+                return chat_input
+        return None
+
+    def _button(self, label: str):
+        return next(button for button in self.app.button if button.label == label)
+
+    def _choose(self) -> str:
+        weights = dict(self.args.mix)
+        if self.app.session_state["current_pdf"] is None:
+            weights.pop("pdf_chat", None)
+        names = list(weights)
+        return self.random.choices(names, weights=[weights[n] for n in names])[0]
+
+    def _chat(self):
+        self._chat_input(CHAT_PLACEHOLDER).set_value(f"Session {self.number} message {self.sequence}: what is new?")
+
+    def _url(self):
+        name = self.random.choice(self.fixtures)
+        self.app.text_input[0].set_value(f"{self.origin}/{name}?session={self.number}&request={self.sequence}")
+        self._button("Summarize URL").click()
+
+    def _pdf(self):
+        data = self.pdf + f"%{uuid.uuid4().hex}\n".encode() if self.args.unique_pdfs else self.pdf
+        uploader = next(u for u in self.app.file_uploader if u.label.startswith("Upload a PDF"))
+        uploader.set_value((f"session-{self.number}.pdf", data, "application/pdf"))
+        self._button("Summarize PDF").click()
+
+    def _pdf_chat(self):
+        chat_input = next(c for c in self.app.chat_input if c.proto.placeholder != CHAT_PLACEHOLDER)
+        chat_input.set_value(f"Session {self.number} question {self.sequence}: what did the board agree?")
+
+    def act(self, action: str) -> tuple:
+        self.sequence += 1
+        started = time.perf_counter()
+        try:
+            getattr(self, f"_{action}")()
+            self.app.run()
+            error = self.app.exception[0].message if self.app.exception else None
+            if error is None and self.app.error:
+                error = self.app.error[0].value
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)}"
+            self.app.run()
+        return action, time.perf_counter() - started, error
+
+    def run(self, deadline: float):
+        while time.monotonic() < deadline:
+            self.results.append(self.act(self._choose()))
+            if self.args.think_time:
+                time.sleep(self.random.uniform(0.5, 1.5) * self.args.think_time)
+
+def action_stats(results: list, elapsed: float) -> dict:
+    latencies = [seconds for _, seconds, error in results if error is None]
+    errors = [error for _, _, error in results if error is not None]
+    return {
+        "actions": len(results),
+        "throughput_per_s": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "error_rate": round(len(errors) / len(results), 4) if results else 0.0,
+    }
+
+def run_level(args) -> dict:
+    fixtures = load_fixtures()
+    server = start_fixture_server(fixtures, args.server_latency)
+    origin = f"http://127.0.0.1:{server.server_port}"
+    model = install_fake_model(args)
+    allow_concurrent_app_tests()
+    pdf = make_pdf(args.pdf_pages)
+
+    sessions = [SimulatedSession(i, args, origin, list(fixtures), pdf) for i in range(args.run_level)]
+    opening = []
+    # Sessions are opened before the clock starts, so the first page load is
+    # reported separately and not counted as load.
+    for session in sessions:
+        started = time.perf_counter()
+        session.open()
+        opening.append(time.perf_counter() - started)
+
+    errors = []
+    with RSSSampler() as rss:
+        started = time.perf_counter()
+        deadline = time.monotonic() + args.duration
+        threads = [
+            threading.Thread(target=session.run, args=(deadline,), name=f"session-{session.number}")
+            for session in sessions
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    results = [result for session in sessions for result in session.results]
+    for _, _, error in results:
+        if error is not None and error not in errors:
+            errors.append(error)
+    level = action_stats(results, elapsed)
+    level.update({
+        "sessions": args.run_level,
+        "open_p50_ms": round(percentile(opening, 0.50) * 1000, 1),
+        "peak_rss_mb": rss.peak,
+        "model_calls": model.call_count,
+        "peak_model_concurrency": model.peak_concurrency,
+        "by_action": {
+            action: action_stats([r for r in results if r[0] == action], elapsed)
+            for action in ACTIONS if any(r[0] == action for r in results)
+        },
+        "sample_errors": errors[:5],
+    })
+    return level
+
+def run_level_in_subprocess(sessions: int, argv: list) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), "--run-level", str(sessions)] + argv
+    completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        sys.exit(f"Load level with {sessions} sessions failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def find_saturation(levels: list, min_gain: float, max_error_rate: float, max_p95_ms: float) -> dict:
+    best = None
+    for previous, level in zip([None] + levels, levels):
+        reasons = []
+        if level["error_rate"] > max_error_rate:
+            reasons.append(f"error rate {level['error_rate']:.1%}")
+        if max_p95_ms and level["p95_ms"] > max_p95_ms:
+            reasons.append(f"p95 {level['p95_ms']:.0f} ms")
+        if previous is not None and level["throughput_per_s"] < previous["throughput_per_s"] * (1 + min_gain):
+            reasons.append(f"throughput gain under {min_gain:.0%}")
+        if reasons:
+            return {"capacity_sessions": best["sessions"] if best else 0,
+                    "saturated_at": level["sessions"], "reasons": reasons}
+        best = level
+    return {"capacity_sessions": best["sessions"] if best else 0, "saturated_at": None, "reasons": []}
+
+def print_levels(levels: list):
+    print(f"{'sessions':>8}{'actions':>9}{'actions/s':>11}{'p50_ms':>10}{'p95_ms':>10}{'p99_ms':>10}"
+          f"{'errors':>8}{'rss_mb':>9}")
+    for level in levels:
+        print(f"{level['sessions']:>8}{level['actions']:>9}{level['throughput_per_s']:>11}{level['p50_ms']:>10}"
+              f"{level['p95_ms']:>10}{level['p99_ms']:>10}{level['error_rate']:>8.1%}{level['peak_rss_mb']:>9}")
+
+def parse_mix(value: str) -> list:
+    mix = []
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"unknown action '{name}', use {', '.join(ACTIONS)}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+def level_argv(args) -> list:
+    return [
+        "--duration", str(args.duration), "--think-time", str(args.think_time),
+        "--mix", ",".join(f"{name}={weight}" for name, weight in args.mix),
+        "--server-latency", str(args.server_latency), "--model-latency", str(args.model_latency),
+        "--token-rate", str(args.token_rate), "--pdf-pages", str(args.pdf_pages),
+        "--timeout", str(args.timeout), "--seed", str(args.seed),
+    ] + (["--unique-pdfs"] if args.unique_pdfs else []) + (["--summary-cache"] if args.summary_cache else [])
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test app.py with many concurrent simulated Streamlit sessions against a local fixture "
+                    "server and a fake model, to find the concurrency at which one machine saturates."
+    )
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32],
+                        help="Concurrency levels to run, each in a fresh process")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load per level")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean pause between a session's actions")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("chat=6,url=3,pdf=1,pdf_chat=2"),
+                        help="Action weights, e.g. chat=6,url=3,pdf=1,pdf_chat=2")
+    parser.add_argument("--server-latency", type=float, default=0.05, help="Fixture server delay in seconds")
+    parser.add_argument("--model-latency", type=float, default=0.5, help="Fake model time to first token")
+    parser.add_argument("--token-rate", type=float, default=100, help="Fake model output tokens per second")
+    parser.add_argument("--pdf-pages", type=int, default=20, help="Pages in each uploaded PDF")
+    parser.add_argument("--unique-pdfs", action="store_true",
+                        help="Make every upload a different file so none are served from the PDF store")
+    parser.add_argument("--summary-cache", action="store_true", help="Use the on-disk summary cache")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds before a script run counts as failed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-gain", type=float, default=0.1,
+                        help="Smallest throughput gain over the previous level before it counts as saturated")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--max-p95-ms", type=float, default=0, help="Latency objective for p95 (0 to ignore)")
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--run-level", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_level:
+        warnings.filterwarnings("ignore")
+        os.environ["CANTELL_CACHE_DIR"] = tempfile.mkdtemp(prefix="cantell-load-cache-")
+        os.environ["CANTELL_LOG_DIR"] = tempfile.mkdtemp(prefix="cantell-load-logs-")
+        os.environ["CANTELL_LOG_DEBUG_RATE"] = "1"
+        os.environ["CANTELL_METRICS_PORT"] = "0"
+        print(json.dumps(run_level(args)))
+        return
+
+    levels = []
+    for sessions in args.sessions:
+        print(f"Running {sessions} session(s) for {args.duration:.0f}s...", file=sys.stderr, flush=True)
+        levels.append(run_level_in_subprocess(sessions, level_argv(args)))
+
+    print_levels(levels)
+    saturation = find_saturation(levels, args.min_gain, args.max_error_rate, args.max_p95_ms)
+    print()
+    if saturation["saturated_at"] is None:
+        print(f"No saturation up to {levels[-1]['sessions']} sessions; try higher levels.")
+    else:
+        print(f"Saturated at {saturation['saturated_at']} sessions ({', '.join(saturation['reasons'])}); "
+              f"capacity is about {saturation['capacity_sessions']} concurrent sessions.")
+
+    if args.output:
+        report = {
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "settings": vars(args),
+            "levels": levels,
+            "saturation": saturation,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import asyncio
+import contextvars
+import functools
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterator
+from src.logger import logger
+
+BLOCKING_WORKERS = int(os.getenv("CANTELL_BLOCKING_WORKERS", "32"))
+
+async def _run_in_context(coro, context: contextvars.Context):
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+# One event loop on a daemon thread shared by every Streamlit session. Script
+# threads submit coroutines and wait on the returned futures, so an LLM or
+# network round trip holds a cheap future instead of a worker thread.
+class AsyncRuntime:
+    def __init__(self, blocking_workers: int = BLOCKING_WORKERS):
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=blocking_workers, thread_name_prefix="cantell-blocking")
+        self.loop.set_default_executor(self.executor)
+        self._thread = threading.Thread(target=self._run, name="cantell-event-loop", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro) -> Future:
+        return asyncio.run_coroutine_threadsafe(_run_in_context(coro, contextvars.copy_context()), self.loop)
+
+    def run(self, coro, timeout: float = None):
+        return self.submit(coro).result(timeout)
+
+    async def run_blocking(self, fn: Callable, *args, **kwargs):
+        call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    def iterate(self, agen: AsyncIterator) -> Iterator:
+        items = queue.Queue()
+        done = object()
+
+        async def drain():
+            try:
+                async for item in agen:
+                    items.put((item, None))
+            except BaseException as e:
+                items.put((None, e))
+                raise
+            finally:
+                items.put((done, None))
+
+        future = self.submit(drain())
+        try:
+            while True:
+                item, error = items.get()
+                if error is not None:
+                    raise error
+                if item is done:
+                    return
+                yield item
+        finally:
+            future.cancel()
+
+runtime = None
+_runtime_lock = threading.Lock()
+
+def get_runtime() -> AsyncRuntime:
+    global runtime
+    with _runtime_lock:
+        if runtime is None:
+            logger.info("Starting shared async runtime")
+            runtime = AsyncRuntime()
+        return runtime
@@ -0,0 +1,305 @@
+import json
+import math
+import os
+import re
+import threading
+from typing import Iterator, List
+import numpy as np
+import requests
+from dotenv import load_dotenv
+from src.logger import logger
+from src.chunker import estimate_tokens
+from src.retrieval import tokenize
+
+load_dotenv()
+
+GEMINI_MODEL = "gemini-3-flash-preview"
+BACKEND = os.getenv("CANTELL_BACKEND", "gemini").lower()
+OPENAI_BASE_URL = os.getenv("CANTELL_OPENAI_BASE_URL", "http://localhost:8080/v1")
+OPENAI_MODEL = os.getenv("CANTELL_OPENAI_MODEL", "local-model")
+OPENAI_TIMEOUT = float(os.getenv("CANTELL_OPENAI_TIMEOUT", "120"))
+EXTRACTIVE_MAX_TOKENS = int(os.getenv("CANTELL_EXTRACTIVE_MAX_TOKENS", "150"))
+LATENCY_BUDGET = float(os.getenv("CANTELL_LATENCY_BUDGET", "0")) or None
+EXTRACTIVE_FALLBACK = os.getenv("CANTELL_EXTRACTIVE_FALLBACK", "1") != "0"
+
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_ITERATIONS = 50
+MAX_SENTENCES = 400
+LATENCY_SMOOTHING = 0.2
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+class BackendError(Exception):
+    def __init__(self, message: str, code: int = None, retry_after: float = None):
+        super().__init__(message)
+        self.code = code
+        self.retry_after = retry_after
+
+class BackendResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+# Gemini through whichever SDK is installed: the google-genai client when it is
+# available, otherwise the older google-generativeai package. Both expose the
+# same generate_content(prompt, stream) surface to the summarizer, plus
+# provider-side context caching: create_context() uploads a system instruction
+# and optional content once and generate_content(context=name) reuses it.
+class GeminiBackend:
+    name = "gemini"
+
+    def __init__(self, model_name: str = GEMINI_MODEL, api_key: str = None):
+        api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            logger.warning("GEMINI_API_KEY not found in environment variables")
+            raise BackendError("GEMINI_API_KEY not found. Please set it in .env file.")
+
+        self.model_name = model_name
+        self._client = None
+        self._model = None
+        self._legacy_contexts = {}
+        try:
+            from google import genai
+            self._client = genai.Client(api_key=api_key)
+        except ImportError:
+            import google.generativeai as legacy_genai
+            legacy_genai.configure(api_key=api_key)
+            self._model = legacy_genai.GenerativeModel(model_name)
+
+    def _legacy_model(self, context: str):
+        if context is None:
+            return self._model
+        try:
+            return self._legacy_contexts[context][1]
+        except KeyError:
+            raise BackendError(f"Cached context {context} not found", code=404)
+
+    def _config(self, context: str):
+        if context is None:
+            return None
+        from google.genai import types
+        return types.GenerateContentConfig(cached_content=context)
+
+    def generate_content(self, prompt: str, stream: bool = False, context: str = None):
+        if self._client is None:
+            return self._legacy_model(context).generate_content(prompt, stream=stream)
+        models = self._client.models
+        if stream:
+            return models.generate_content_stream(model=self.model_name, contents=prompt, config=self._config(context))
+        return models.generate_content(model=self.model_name, contents=prompt, config=self._config(context))
+
+    async def generate_content_async(self, prompt: str, context: str = None):
+        if self._client is None:
+            return await self._legacy_model(context).generate_content_async(prompt)
+        return await self._client.aio.models.generate_content(
+            model=self.model_name, contents=prompt, config=self._config(context)
+        )
+
+    def create_context(self, system: str, content: str = None, ttl: int = 3600) -> str:
+        contents = [content] if content else None
+        if self._client is None:
+            import datetime
+            import google.generativeai as legacy_genai
+            from google.generativeai import caching
+            cached = caching.CachedContent.create(
+                model=self.model_name, system_instruction=system, contents=contents,
+                ttl=datetime.timedelta(seconds=ttl),
+            )
+            self._legacy_contexts[cached.name] = (cached, legacy_genai.GenerativeModel.from_cached_content(cached))
+            return cached.name
+
+        from google.genai import types
+        cached = self._client.caches.create(
+            model=self.model_name,
+            config=types.CreateCachedContentConfig(system_instruction=system, contents=contents, ttl=f"{ttl}s"),
+        )
+        return cached.name
+
+    def delete_context(self, name: str):
+        if self._client is None:
+            cached, _ = self._legacy_contexts.pop(name, (None, None))
+            if cached is not None:
+                cached.delete()
+            return
+        self._client.caches.delete(name=name)
+
+# Any server speaking the OpenAI chat completions API (llama.cpp, vLLM, Ollama,
+# LM Studio). HTTP errors become BackendError with the status code so the rate
+# limiter retries 429 and 5xx the same way it does for Gemini.
+class OpenAICompatibleBackend:
+    name = "openai"
+
+    def __init__(self, base_url: str = OPENAI_BASE_URL, model_name: str = OPENAI_MODEL,
+                 api_key: str = None, timeout: float = OPENAI_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.model_name = model_name
+        self.timeout = timeout
+        self.session = requests.Session()
+        api_key = api_key or os.getenv("CANTELL_OPENAI_API_KEY")
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def _post(self, prompt: str, stream: bool) -> requests.Response:
+        payload = {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": stream,
+        }
+        try:
+            response = self.session.post(f"{self.base_url}/chat/completions", json=payload,
+                                         timeout=self.timeout, stream=stream)
+        except requests.exceptions.RequestException as e:
+            raise BackendError(f"Local model server unreachable: {str(e)}", code=503)
+
+        if response.status_code != 200:
+            retry_after = response.headers.get("Retry-After")
+            raise BackendError(
+                f"Local model server returned HTTP {response.status_code}: {response.text[:200]}",
+                code=response.status_code,
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        return response
+
+    def _stream(self, response: requests.Response) -> Iterator[BackendResponse]:
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                text = (choices[0].get("delta") or {}).get("content")
+                if text:
+                    yield BackendResponse(text)
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        response = self._post(prompt, stream)
+        if stream:
+            return self._stream(response)
+        choices = response.json().get("choices") or [{}]
+        return BackendResponse((choices[0].get("message") or {}).get("content") or "")
+
+def split_sentences(text: str) -> List[str]:
+    sentences = {}
+    for sentence in _SENTENCE.split(text):
+        sentence = " ".join(sentence.split())
+        if len(sentence.split()) > 3:
+            sentences.setdefault(sentence.lower(), sentence)
+    return list(sentences.values())
+
+# TextRank on CPU: sentences are nodes, edges weigh shared non-stopword terms
+# normalised by sentence length, and PageRank scores pick the sentences that are
+# kept, in their original order, until the word limit is reached.
+class ExtractiveBackend:
+    name = "extractive"
+    model_name = "textrank"
+
+    def rank(self, sentences: List[str]) -> np.ndarray:
+        terms = [set(tokenize(s)) for s in sentences]
+        vocabulary = {t: i for i, t in enumerate(set().union(*terms))}
+        if not vocabulary:
+            return np.ones(len(sentences))
+
+        matrix = np.zeros((len(sentences), len(vocabulary)), dtype=np.float32)
+        for row, sentence_terms in enumerate(terms):
+            matrix[row, [vocabulary[t] for t in sentence_terms]] = 1.0
+
+        overlap = matrix @ matrix.T
+        lengths = np.log(np.maximum(matrix.sum(axis=1), 2.0))
+        weights = overlap / (lengths[:, None] + lengths[None, :])
+        np.fill_diagonal(weights, 0.0)
+
+        out_degree = weights.sum(axis=1, keepdims=True)
+        transition = np.divide(weights, out_degree, out=np.zeros_like(weights), where=out_degree > 0)
+        n = len(sentences)
+        scores = np.full(n, 1.0 / n)
+        for _ in range(TEXTRANK_ITERATIONS):
+            updated = (1 - TEXTRANK_DAMPING) / n + TEXTRANK_DAMPING * (transition.T @ scores)
+            if np.abs(updated - scores).sum() < 1e-6:
+                scores = updated
+                break
+            scores = updated
+        return scores
+
+    def summarize(self, text: str, max_words: int = 500) -> str:
+        sentences = split_sentences(text)[:MAX_SENTENCES]
+        if len(sentences) <= 1:
+            words = text.split()
+            return " ".join(words[:max_words])
+
+        scores = self.rank(sentences)
+        chosen, words = [], 0
+        for index in np.argsort(-scores, kind="stable"):
+            length = len(sentences[index].split())
+            if chosen and words + length > max_words:
+                continue
+            chosen.append(index)
+            words += length
+            if words >= max_words:
+                break
+        return " ".join(sentences[i] for i in sorted(chosen))
+
+# Decides per summary whether the generative backend or the extractive path
+# runs. Short inputs and inputs whose estimated model time exceeds the latency
+# budget go extractive; the estimate is a moving average of observed call times
+# multiplied by the number of sequential map/reduce rounds the input needs.
+class BackendRouter:
+    def __init__(self, extractive: ExtractiveBackend = None, max_extractive_tokens: int = EXTRACTIVE_MAX_TOKENS,
+                 latency_budget: float = LATENCY_BUDGET, fallback: bool = EXTRACTIVE_FALLBACK):
+        self.extractive = extractive or ExtractiveBackend()
+        self.max_extractive_tokens = max_extractive_tokens
+        self.latency_budget = latency_budget
+        self.fallback = fallback
+        self.call_seconds = None
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            if self.call_seconds is None:
+                self.call_seconds = seconds
+            else:
+                self.call_seconds += LATENCY_SMOOTHING * (seconds - self.call_seconds)
+
+    @staticmethod
+    def rounds(tokens: int, max_chunk_tokens: int, max_workers: int) -> int:
+        chunks = math.ceil(tokens / max_chunk_tokens)
+        if chunks <= 1:
+            return 1
+        return math.ceil(chunks / max_workers) + 1
+
+    def estimate(self, tokens: int, max_chunk_tokens: int, max_workers: int) -> float:
+        if self.call_seconds is None:
+            return None
+        return self.call_seconds * self.rounds(tokens, max_chunk_tokens, max_workers)
+
+    def extractive_reason(self, text: str, model_available: bool, max_chunk_tokens: int, max_workers: int,
+                          latency_budget: float = None) -> str:
+        if not model_available:
+            return "model unavailable"
+
+        tokens = estimate_tokens(text)
+        if tokens <= self.max_extractive_tokens:
+            return f"short input ({tokens} tokens)"
+
+        budget = latency_budget if latency_budget is not None else self.latency_budget
+        estimated = self.estimate(tokens, max_chunk_tokens, max_workers)
+        if budget is not None and estimated is not None and estimated > budget:
+            return f"estimated {estimated:.1f}s exceeds latency budget of {budget:.1f}s"
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "call_seconds": self.call_seconds,
+            "max_extractive_tokens": self.max_extractive_tokens,
+            "latency_budget": self.latency_budget,
+            "fallback": self.fallback,
+        }
+
+def create_backend(name: str = BACKEND):
+    if name == "gemini":
+        return GeminiBackend()
+    if name == "openai":
+        return OpenAICompatibleBackend()
+    if name == "extractive":
+        return None
+    raise BackendError(f"Unknown model backend '{name}'. Use gemini, openai or extractive.")
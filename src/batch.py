@@ -0,0 +1,87 @@
+import asyncio
+import re
+import time
+from typing import AsyncIterator, Iterator, List
+from urllib.parse import urlparse
+from src.logger import logger, new_correlation_id
+from src.url_handler import fetch_article_from_url
+from src.async_runtime import get_runtime
+
+FETCH_WORKERS = 16
+PER_HOST_LIMIT = 4
+LLM_WORKERS = 4
+MAX_BATCH_URLS = 100
+
+_SEPARATORS = re.compile(r"[\s,]+")
+
+def parse_url_list(text: str, limit: int = MAX_BATCH_URLS) -> List[str]:
+    urls = []
+    seen = set()
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        for url in _SEPARATORS.split(line):
+            if url and url not in seen:
+                seen.add(url)
+                urls.append(url)
+
+    if len(urls) > limit:
+        logger.warning(f"Batch contains {len(urls)} URLs, only the first {limit} will be processed")
+        urls = urls[:limit]
+    return urls
+
+def _host(url: str) -> str:
+    if not url.startswith(("http://", "https://")):
+        url = "https://" + url
+    return urlparse(url).netloc.lower()
+
+async def asummarize_urls(urls: List[str], summarizer, fetch_workers: int = FETCH_WORKERS,
+                          per_host_limit: int = PER_HOST_LIMIT, llm_workers: int = LLM_WORKERS,
+                          fetch=fetch_article_from_url) -> AsyncIterator[dict]:
+    logger.info(f"Starting batch summarization of {len(urls)} URLs")
+
+    runtime = get_runtime()
+    fetch_slots = asyncio.Semaphore(max(1, fetch_workers))
+    llm_slots = asyncio.Semaphore(max(1, llm_workers))
+    host_limits = {}
+
+    async def process(position: int, url: str) -> dict:
+        new_correlation_id()
+        started = time.monotonic()
+        host = _host(url)
+        if host not in host_limits:
+            host_limits[host] = asyncio.Semaphore(per_host_limit)
+        try:
+            async with host_limits[host], fetch_slots:
+                text = await runtime.run_blocking(fetch, url)
+        except Exception as e:
+            logger.error(f"Batch fetch failed for {url}: {str(e)}")
+            return {"position": position, "url": url, "summary": None, "error": str(e),
+                    "seconds": time.monotonic() - started}
+
+        try:
+            async with llm_slots:
+                summary = await summarizer.asummarize_text(text)
+            return {"position": position, "url": url, "summary": summary, "error": None,
+                    "seconds": time.monotonic() - started}
+        except Exception as e:
+            logger.error(f"Batch summarization failed for {url}: {str(e)}")
+            return {"position": position, "url": url, "summary": None, "error": str(e),
+                    "seconds": time.monotonic() - started}
+
+    tasks = [asyncio.ensure_future(process(position, url)) for position, url in enumerate(urls)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+        logger.info("Batch summarization finished")
+
+def summarize_urls(urls: List[str], summarizer, fetch_workers: int = FETCH_WORKERS,
+                   per_host_limit: int = PER_HOST_LIMIT, llm_workers: int = LLM_WORKERS,
+                   fetch=fetch_article_from_url) -> Iterator[dict]:
+    return get_runtime().iterate(
+        asummarize_urls(urls, summarizer, fetch_workers, per_host_limit, llm_workers, fetch)
+    )
@@ -0,0 +1,65 @@
+import re
+from typing import List
+
+CHARS_PER_TOKEN = 4
+
+_PARAGRAPH_BREAK = re.compile(r"\f|\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def _split_oversized(block: str, max_tokens: int) -> List[str]:
+    if estimate_tokens(block) <= max_tokens:
+        return [block]
+
+    for separator in (re.compile(r"\n"), _SENTENCE_END):
+        parts = [p for p in separator.split(block) if p.strip()]
+        if len(parts) > 1:
+            pieces = []
+            for part in parts:
+                pieces.extend(_split_oversized(part, max_tokens))
+            return pieces
+
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    return [block[i:i + max_chars] for i in range(0, len(block), max_chars)]
+
+# Packs paragraphs into chunks of at most max_tokens as text arrives, so a long
+# document can be chunked page by page without joining it into one string first.
+# Feeding the pages separately gives the same chunks as splitting the pages
+# joined with a blank line.
+class ChunkBuilder:
+    def __init__(self, max_tokens: int):
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        self.max_tokens = max_tokens
+        self.current = []
+        self.current_tokens = 0
+
+    def add(self, text: str) -> List[str]:
+        chunks = []
+        for paragraph in _PARAGRAPH_BREAK.split(text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            for block in _split_oversized(paragraph, self.max_tokens):
+                block_tokens = estimate_tokens(block)
+                if self.current and self.current_tokens + block_tokens > self.max_tokens:
+                    chunks.append("\n\n".join(self.current))
+                    self.current = []
+                    self.current_tokens = 0
+                self.current.append(block)
+                self.current_tokens += block_tokens
+        return chunks
+
+    def finish(self) -> List[str]:
+        chunks = ["\n\n".join(self.current)] if self.current else []
+        self.current = []
+        self.current_tokens = 0
+        return chunks
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    builder = ChunkBuilder(max_tokens)
+    return builder.add(text) + builder.finish()
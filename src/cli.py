@@ -0,0 +1,201 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from src.logger import init_worker_logging, logger, new_correlation_id, worker_log_queue
+from src.batch import parse_url_list
+from src.fake_model import FakeModel
+from src.metrics import metrics
+from src.pdf_handler import extract_text_from_pdf
+from src.cache import SummaryCache
+from src.context_cache import ContextCache
+from src.rate_limiter import ModelRateLimiter
+from src.summarizer import ArticleSummarizer
+from src.url_handler import fetch_article_from_url
+
+EXTRACT_WORKERS = os.cpu_count() or 1
+SUMMARY_CONCURRENCY = 4
+REQUESTS_PER_MINUTE = 60
+PROGRESS_EVERY = 10
+
+def _extract(kind: str, item: str) -> str:
+    if kind == "pdf":
+        return extract_text_from_pdf(item, workers=1)
+    return fetch_article_from_url(item)
+
+def discover_items(args) -> list:
+    if args.pdf_dir:
+        if not os.path.isdir(args.pdf_dir):
+            sys.exit(f"Not a directory: {args.pdf_dir}")
+        paths = glob.glob(os.path.join(args.pdf_dir, "**", "*.pdf"), recursive=True)
+        paths += glob.glob(os.path.join(args.pdf_dir, "**", "*.PDF"), recursive=True)
+        return [("pdf", path) for path in sorted(set(paths))]
+
+    with open(args.url_file, "r", encoding="utf-8") as f:
+        return [("url", url) for url in parse_url_list(f.read(), limit=sys.maxsize)]
+
+def load_completed(output_path: str) -> set:
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                completed.add(record["id"])
+    return completed
+
+class ResultWriter:
+    def __init__(self, path: str, total: int):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.file = open(path, "a", encoding="utf-8")
+        self.total = total
+        self.written = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def write(self, record: dict):
+        with self._lock:
+            if self.file.closed:
+                return
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.written += 1
+            if record["status"] != "ok":
+                self.failed += 1
+            if self.written % PROGRESS_EVERY == 0 or self.written == self.total:
+                print(f"[{self.written}/{self.total}] {self.throughput():.1f} docs/min, {self.failed} failed", flush=True)
+
+    def throughput(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.written / elapsed * 60 if elapsed > 0 else 0.0
+
+    def close(self):
+        with self._lock:
+            self.file.close()
+
+# --rpm bounds model calls rather than documents: a long document is summarized
+# with several map calls and a reduce call, and each one goes through the limiter.
+def build_summarizer(args) -> ArticleSummarizer:
+    limiter = ModelRateLimiter(requests_per_minute=args.rpm)
+    if args.fake_model:
+        return ArticleSummarizer(model=FakeModel(latency=args.fake_latency), limiter=limiter)
+    return ArticleSummarizer(cache=SummaryCache(), limiter=limiter, context_cache=ContextCache())
+
+def run(args) -> int:
+    items = discover_items(args)
+    completed = load_completed(args.output)
+    pending = [(kind, item) for kind, item in items if item not in completed]
+
+    print(f"{len(items)} items found, {len(items) - len(pending)} already completed, {len(pending)} to process", flush=True)
+    if not pending:
+        return 0
+
+    summarizer = build_summarizer(args)
+    writer = ResultWriter(args.output, len(pending))
+
+    def summarize(kind: str, item: str, text: str, extract_seconds: float):
+        new_correlation_id()
+        started = time.monotonic()
+        record = {"id": item, "kind": kind, "chars": len(text), "extract_seconds": round(extract_seconds, 3)}
+        try:
+            record.update(status="ok", summary=summarizer.summarize_text(text, max_length=args.max_length))
+        except Exception as e:
+            logger.error(f"Summarization failed for {item}: {str(e)}")
+            record.update(status="error", stage="summarize", error=str(e))
+        record["summarize_seconds"] = round(time.monotonic() - started, 3)
+        record["finished_at"] = time.time()
+        writer.write(record)
+
+    extract_pool = ProcessPoolExecutor(max_workers=args.extract_workers, initializer=init_worker_logging,
+                                       initargs=(worker_log_queue(),))
+    summary_pool = ThreadPoolExecutor(max_workers=args.concurrency)
+    interrupted = False
+    try:
+        submitted = {}
+        for kind, item in pending:
+            submitted[extract_pool.submit(_extract, kind, item)] = (kind, item, time.monotonic())
+
+        summaries = []
+        for future in as_completed(submitted):
+            kind, item, started = submitted.pop(future)
+            try:
+                text = future.result()
+            except Exception as e:
+                logger.error(f"Extraction failed for {item}: {str(e)}")
+                writer.write({"id": item, "kind": kind, "status": "error", "stage": "extract",
+                              "error": str(e), "finished_at": time.time()})
+                continue
+            summaries.append(summary_pool.submit(summarize, kind, item, text, time.monotonic() - started))
+
+        for future in as_completed(summaries):
+            future.result()
+    except KeyboardInterrupt:
+        interrupted = True
+        print("Interrupted; completed items are saved and will be skipped on the next run. "
+              "Documents still being summarized are not recorded; press Ctrl-C again to stop waiting for them.",
+              flush=True)
+        return 130
+    finally:
+        # Queued work is cancelled on Ctrl-C instead of being run to completion.
+        extract_pool.shutdown(wait=not interrupted, cancel_futures=interrupted)
+        summary_pool.shutdown(wait=not interrupted, cancel_futures=interrupted)
+        writer.close()
+        if args.metrics_file:
+            metrics.dump(args.metrics_file)
+
+    print(f"Done: {writer.written - writer.failed} succeeded, {writer.failed} failed, "
+          f"{writer.throughput():.1f} docs/min", flush=True)
+    return 1 if writer.failed else 0
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+def positive_float(value: str) -> float:
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be a positive number, got {value}")
+    return number
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.cli",
+        description="Summarize a directory of PDFs or a file of URLs without the Streamlit UI."
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--pdf-dir", help="Directory containing PDF files (searched recursively)")
+    source.add_argument("--url-file", help="Text file with one URL per line")
+    parser.add_argument("--output", "-o", default="summaries.jsonl",
+                        help="JSONL results file; also used as the resume checkpoint")
+    parser.add_argument("--extract-workers", type=positive_int, default=EXTRACT_WORKERS,
+                        help="Processes used for PDF extraction and URL fetching")
+    parser.add_argument("--concurrency", type=positive_int, default=SUMMARY_CONCURRENCY,
+                        help="Concurrent summarization requests")
+    parser.add_argument("--rpm", type=positive_float, default=REQUESTS_PER_MINUTE,
+                        help="Maximum model requests started per minute, across all documents")
+    parser.add_argument("--max-length", type=int, default=500, help="Target summary length in words")
+    parser.add_argument("--metrics-file", help="Write per-stage latency and token metrics here when the job ends")
+    parser.add_argument("--fake-model", action="store_true", help="Use the offline fake model (dry run)")
+    parser.add_argument("--fake-latency", type=float, default=0.5, help="Fake model latency in seconds")
+    args = parser.parse_args(argv)
+
+    logger.info(f"Starting batch job, output: {args.output}")
+    return run(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from src.logger import logger
+from src.chunker import estimate_tokens
+from src.metrics import metrics
+
+CONTEXT_TTL = int(os.getenv("CANTELL_CONTEXT_CACHE_TTL", "3600"))
+MIN_CONTEXT_TOKENS = int(os.getenv("CANTELL_CONTEXT_CACHE_MIN_TOKENS", "1024"))
+MAX_CONTEXT_TOKENS = int(os.getenv("CANTELL_CONTEXT_CACHE_MAX_TOKENS", "500000"))
+MAX_CONTEXTS = 32
+REFRESH_MARGIN = 60
+FAILURE_BACKOFF = 300
+
+class CachedContext:
+    def __init__(self, key: str, name: str, tokens: int, expires_at: float):
+        self.key = key
+        self.name = name
+        self.tokens = tokens
+        self.expires_at = expires_at
+
+# Provider-side cached contexts (Gemini context caching) keyed by model and by
+# what they hold: the persona, or the persona plus one uploaded document. Entries
+# are recreated shortly before their TTL runs out, at most MAX_CONTEXTS are kept
+# alive (least recently used ones are deleted at the provider), and a key whose
+# creation failed, or whose content is outside the provider's size limits, is
+# not retried for FAILURE_BACKOFF seconds. Content may be passed as a callable so
+# it is only built when a context actually has to be created. Per-key locks only
+# live while a caller holds or waits on them, so evicted and expired keys leave
+# nothing behind.
+class ContextCache:
+    def __init__(self, ttl: int = CONTEXT_TTL, min_tokens: int = MIN_CONTEXT_TOKENS,
+                 max_tokens: int = MAX_CONTEXT_TOKENS, max_contexts: int = MAX_CONTEXTS):
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.max_contexts = max_contexts
+        self._contexts = OrderedDict()
+        self._failed = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def supports(model) -> bool:
+        return model is not None and hasattr(model, "create_context")
+
+    @contextmanager
+    def _key_lock(self, cache_key: tuple):
+        with self._lock:
+            entry = self._key_locks.setdefault(cache_key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[cache_key]
+
+    def get(self, model, key: str, system: str, content=None) -> CachedContext:
+        if not self.ttl or not self.supports(model):
+            return None
+
+        cache_key = (model.model_name, key)
+        with self._key_lock(cache_key):
+            now = time.time()
+            with self._lock:
+                context = self._contexts.get(cache_key)
+                if context is not None and context.expires_at - REFRESH_MARGIN > now:
+                    self._contexts.move_to_end(cache_key)
+                    metrics.inc("cantell_context_cache_total", result="hit")
+                    return context
+                self._contexts.pop(cache_key, None)
+                if self._failed.get(cache_key, 0) > now:
+                    return None
+
+            if callable(content):
+                content = content()
+            tokens = estimate_tokens(system) + estimate_tokens(content or "")
+            if tokens < self.min_tokens or tokens > self.max_tokens:
+                logger.debug(f"Not caching context '{key}': about {tokens} tokens is outside the cacheable range")
+                with self._lock:
+                    self._failed[cache_key] = now + FAILURE_BACKOFF
+                return None
+
+            try:
+                name = model.create_context(system, content, self.ttl)
+            except Exception as e:
+                logger.warning(f"Could not create cached context '{key}': {str(e)}")
+                metrics.inc("cantell_context_cache_total", result="failed")
+                with self._lock:
+                    self._failed[cache_key] = now + FAILURE_BACKOFF
+                return None
+
+            context = CachedContext(key, name, tokens, now + self.ttl)
+            with self._lock:
+                self._failed.pop(cache_key, None)
+                self._contexts[cache_key] = context
+                evicted = []
+                while len(self._contexts) > self.max_contexts:
+                    evicted.append(self._contexts.popitem(last=False)[1])
+            metrics.inc("cantell_context_cache_total", result="created")
+            logger.info(f"Created cached context '{key}' of about {tokens} tokens, TTL {self.ttl}s")
+
+        for old in evicted:
+            self._delete(model, old)
+        return context
+
+    def invalidate(self, model, key: str):
+        if not self.supports(model):
+            return
+        with self._lock:
+            context = self._contexts.pop((model.model_name, key), None)
+            self._failed.pop((model.model_name, key), None)
+        if context is not None:
+            logger.info(f"Invalidated cached context '{key}'")
+            self._delete(model, context)
+
+    def _delete(self, model, context: CachedContext):
+        try:
+            model.delete_context(context.name)
+        except Exception as e:
+            logger.warning(f"Could not delete cached context {context.name}: {str(e)}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "contexts": len(self._contexts),
+                "cached_tokens": sum(c.tokens for c in self._contexts.values()),
+                "skipped": len(self._failed),
+            }
@@ -0,0 +1,231 @@
+import os
+import re
+import threading
+from typing import Tuple
+from src.logger import logger
+
+lxml_html = None
+etree = None
+
+EXTRACTOR = os.getenv("CANTELL_EXTRACTOR", "density")
+MIN_DENSITY_CHARS = 250
+MIN_BLOCK_CHARS = 25
+
+BLOCK_TAGS = frozenset([
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "pre", "blockquote", "td", "tr", "table",
+    "h1", "h2", "h3", "h4", "h5", "h6", "dd", "dt", "figcaption", "br", "hr",
+])
+PARAGRAPH_TAGS = frozenset(["p", "pre", "blockquote", "td", "li", "h2", "h3", "h4", "h5", "h6", "dd"])
+DROP_TAGS = ("script", "style", "noscript", "template", "svg", "iframe", "form", "button", "select")
+BOILERPLATE_TAGS = frozenset(["nav", "footer", "header", "aside"])
+CONTENT_HINTS = re.compile(r"article|content|post|body|text|entry|story|main", re.I)
+BOILERPLATE_HINTS = re.compile(r"comment|footer|sidebar|share|social|related|promo|advert|nav|menu|cookie|subscribe", re.I)
+
+class HeuristicExtractor:
+    name = "heuristic"
+
+    def extract(self, content: bytes) -> Tuple[str, str]:
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(content, 'html.parser')
+
+        for script in soup(["script", "style"]):
+            script.decompose()
+
+        title = ""
+        title_tag = soup.find('h1')
+        if title_tag:
+            title = title_tag.get_text(strip=True)
+        else:
+            title_tag = soup.find('title')
+            if title_tag:
+                title = title_tag.get_text(strip=True)
+
+        article_content = ""
+
+        article_tag = soup.find('article')
+        if article_tag:
+            article_content = article_tag.get_text(separator='\n', strip=True)
+
+        if not article_content:
+            main_tag = soup.find('main')
+            if main_tag:
+                article_content = main_tag.get_text(separator='\n', strip=True)
+
+        if not article_content:
+            content_divs = soup.find_all('div', class_=lambda x: x and ('content' in x.lower() or 'article' in x.lower() or 'post' in x.lower() or 'body' in x.lower() or 'text' in x.lower() or 'entry' in x.lower()))
+            for div in content_divs:
+                text = div.get_text(separator='\n', strip=True)
+                if len(text) > len(article_content):
+                    article_content = text
+
+        if not article_content:
+            section_tags = soup.find_all('section')
+            for section in section_tags:
+                text = section.get_text(separator='\n', strip=True)
+                if len(text) > len(article_content):
+                    article_content = text
+
+        if not article_content:
+            p_tags = soup.find_all('p')
+            paragraphs = [p.get_text(strip=True) for p in p_tags if p.get_text(strip=True)]
+            if paragraphs:
+                article_content = '\n\n'.join(paragraphs)
+
+        if not article_content:
+            body = soup.find('body')
+            if body:
+                article_content = body.get_text(separator='\n', strip=True)
+
+        return title, article_content
+
+def _load_lxml() -> bool:
+    global lxml_html, etree
+    if etree is None:
+        try:
+            import lxml.html as lxml_html
+            from lxml import etree
+        except ImportError:
+            return False
+    return True
+
+# Scores every block in one bottom-up pass over the lxml tree: paragraph-like
+# blocks earn points for text length and commas, which flow up to their parent
+# and grandparent, and each candidate is discounted by its link density.
+class DensityExtractor:
+    name = "density"
+
+    def __init__(self, fallback=None):
+        self.fallback = fallback or HeuristicExtractor()
+
+    def extract(self, content: bytes) -> Tuple[str, str]:
+        if not _load_lxml():
+            return self.fallback.extract(content)
+
+        try:
+            root = lxml_html.fromstring(content)
+        except (etree.ParserError, ValueError) as e:
+            logger.warning(f"lxml could not parse page, using fallback extractor: {str(e)}")
+            return self.fallback.extract(content)
+
+        title = self._title(root)
+        etree.strip_elements(root, *DROP_TAGS, etree.Comment, etree.ProcessingInstruction, with_tail=False)
+
+        stats = self._measure(root)
+        best = self._best_candidate(root, stats)
+        text = self._block_text(best, stats) if best is not None else ""
+
+        if len(text) < MIN_DENSITY_CHARS:
+            logger.debug("Density extraction found too little text, using fallback extractor")
+            fallback_title, fallback_text = self.fallback.extract(content)
+            if len(fallback_text) > len(text):
+                return title or fallback_title, fallback_text
+
+        return title, text
+
+    @staticmethod
+    def _title(root) -> str:
+        for path in ("//h1", "//title"):
+            found = root.xpath(path)
+            if found:
+                text = " ".join(found[0].text_content().split())
+                if text:
+                    return text
+        return ""
+
+    @staticmethod
+    def _measure(root) -> dict:
+        stats = {}
+        for el in reversed(list(root.iter(tag=etree.Element))):
+            text_len = len(el.text.strip()) if el.text else 0
+            link_len = 0
+            for child in el:
+                child_text, child_links = stats.get(child, (0, 0))
+                text_len += child_text + (len(child.tail.strip()) if child.tail else 0)
+                link_len += child_links
+            if el.tag == "a":
+                link_len = text_len
+            stats[el] = (text_len, link_len)
+        return stats
+
+    @staticmethod
+    def _class_weight(el) -> float:
+        hints = f"{el.get('class', '')} {el.get('id', '')}"
+        weight = 0.0
+        if el.tag in ("article", "main"):
+            weight += 25
+        if el.tag in BOILERPLATE_TAGS:
+            weight -= 25
+        if hints.strip():
+            if CONTENT_HINTS.search(hints):
+                weight += 25
+            if BOILERPLATE_HINTS.search(hints):
+                weight -= 25
+        return weight
+
+    def _best_candidate(self, root, stats: dict):
+        scores = {}
+        for el in root.iter(*PARAGRAPH_TAGS):
+            text_len, _ = stats[el]
+            if text_len < MIN_BLOCK_CHARS:
+                continue
+            score = 1 + el.text_content().count(",") + min(text_len // 100, 3)
+            parent = el.getparent()
+            if parent is None:
+                continue
+            scores[parent] = scores.get(parent, 0) + score
+            grandparent = parent.getparent()
+            if grandparent is not None:
+                scores[grandparent] = scores.get(grandparent, 0) + score / 2
+
+        best = None
+        best_score = 0.0
+        for el, score in scores.items():
+            text_len, link_len = stats[el]
+            link_density = link_len / text_len if text_len else 1.0
+            score = (score + self._class_weight(el)) * (1 - link_density)
+            if score > best_score:
+                best, best_score = el, score
+        return best
+
+    def _block_text(self, el, stats: dict) -> str:
+        parts = []
+        self._collect(el, stats, parts)
+        lines = (" ".join(line.split()) for line in "".join(parts).split("\n"))
+        return "\n".join(line for line in lines if line)
+
+    def _collect(self, el, stats: dict, parts: list):
+        text_len, link_len = stats.get(el, (0, 0))
+        boilerplate = el.tag in BOILERPLATE_TAGS or BOILERPLATE_HINTS.search(f"{el.get('class', '')} {el.get('id', '')}")
+        if (boilerplate or (text_len and link_len / text_len > 0.5)) and el.tag not in ("a", "article", "main"):
+            return
+
+        block = el.tag in BLOCK_TAGS
+        if block:
+            parts.append("\n")
+        if el.text:
+            parts.append(el.text)
+        for child in el:
+            if isinstance(child.tag, str):
+                self._collect(child, stats, parts)
+            if child.tail:
+                parts.append(child.tail)
+        if block:
+            parts.append("\n")
+
+ENGINES = {
+    DensityExtractor.name: DensityExtractor,
+    HeuristicExtractor.name: HeuristicExtractor,
+}
+
+_extractors = {}
+_extractors_lock = threading.Lock()
+
+def get_extractor(name: str = None):
+    name = name or EXTRACTOR
+    if name not in ENGINES:
+        logger.warning(f"Unknown extractor '{name}', using heuristic extractor")
+        name = HeuristicExtractor.name
+    with _extractors_lock:
+        if name not in _extractors:
+            _extractors[name] = ENGINES[name]()
+        return _extractors[name]
@@ -0,0 +1,136 @@
+import asyncio
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterator, List, Optional
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+class FakeRateLimitError(Exception):
+    code = 429
+
+    def __init__(self, retry_after: float = None):
+        super().__init__("429 Resource has been exhausted (fake quota)")
+        self.retry_after = retry_after
+
+class FakeContextNotFoundError(Exception):
+    code = 404
+
+    def __init__(self, name: str):
+        super().__init__(f"404 Cached content {name} not found (fake)")
+
+# Offline stand-in for the Gemini backend: records prompts in call order and the
+# peak number of concurrent calls, can throttle like a quota, and keeps cached
+# contexts in memory so only the per-call prompt is counted as sent.
+class FakeModel:
+    model_name = "fake-model"
+
+    def __init__(self, latency: float = 0.0, responder: Optional[Callable[[str], str]] = None,
+                 token_latency: float = 0.0, quota: int = None, quota_window: float = 60.0,
+                 max_concurrency: int = None):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.responder = responder or self._default_responder
+        self.quota = quota
+        self.quota_window = quota_window
+        self.max_concurrency = max_concurrency
+        self.prompts: List[str] = []
+        self.active_calls = 0
+        self.peak_concurrency = 0
+        self.throttled_calls = 0
+        self.contexts = {}
+        self.deleted_contexts = []
+        self._accepted = deque()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _default_responder(prompt: str) -> str:
+        return f"Summary of {len(prompt)} prompt characters."
+
+    @property
+    def call_count(self) -> int:
+        return len(self.prompts)
+
+    def _enter(self, prompt: str):
+        with self._lock:
+            now = time.monotonic()
+            while self._accepted and now - self._accepted[0] >= self.quota_window:
+                self._accepted.popleft()
+            over_quota = self.quota is not None and len(self._accepted) >= self.quota
+            over_concurrency = self.max_concurrency is not None and self.active_calls >= self.max_concurrency
+            if over_quota or over_concurrency:
+                self.throttled_calls += 1
+                retry_after = self.quota_window - (now - self._accepted[0]) if over_quota else None
+                raise FakeRateLimitError(retry_after)
+
+            self._accepted.append(now)
+            self.prompts.append(prompt)
+            self.active_calls += 1
+            self.peak_concurrency = max(self.peak_concurrency, self.active_calls)
+
+    def _exit(self):
+        with self._lock:
+            self.active_calls -= 1
+
+    def create_context(self, system: str, content: str = None, ttl: int = 3600) -> str:
+        with self._lock:
+            name = f"cachedContents/fake-{len(self.contexts) + len(self.deleted_contexts) + 1}"
+            self.contexts[name] = "\n\n".join(part for part in (system, content) if part)
+        return name
+
+    def delete_context(self, name: str):
+        with self._lock:
+            self.contexts.pop(name)
+            self.deleted_contexts.append(name)
+
+    def _full_prompt(self, prompt: str, context: str) -> str:
+        if context is None:
+            return prompt
+        if context not in self.contexts:
+            raise FakeContextNotFoundError(context)
+        return f"{self.contexts[context]}\n\n{prompt}"
+
+    def generate_content(self, prompt: str, stream: bool = False, context: str = None):
+        if stream:
+            return self._stream(prompt, context)
+
+        full_prompt = self._full_prompt(prompt, context)
+        self._enter(prompt)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            text = self.responder(full_prompt)
+            if self.token_latency:
+                time.sleep(self.token_latency * len(re.findall(r"\S+", text)))
+            return FakeResponse(text)
+        finally:
+            self._exit()
+
+    async def generate_content_async(self, prompt: str, context: str = None):
+        full_prompt = self._full_prompt(prompt, context)
+        self._enter(prompt)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            text = self.responder(full_prompt)
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency * len(re.findall(r"\S+", text)))
+            return FakeResponse(text)
+        finally:
+            self._exit()
+
+    def _stream(self, prompt: str, context: str = None) -> Iterator[FakeResponse]:
+        full_prompt = self._full_prompt(prompt, context)
+        self._enter(prompt)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            for token in re.findall(r"\S+\s*", self.responder(full_prompt)):
+                if self.token_latency:
+                    time.sleep(self.token_latency)
+                yield FakeResponse(token)
+        finally:
+            self._exit()
@@ -1,17 +1,174 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import multiprocessing
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from datetime import datetime
 
-LOG_DIR = "logs"
+LOG_DIR = os.getenv("CANTELL_LOG_DIR", "logs")
 LOG_FILE = os.path.join(LOG_DIR, "cantell_assistant.log")
 MAX_BYTES = 5 * 1024 * 1024
 BACKUP_COUNT = 3
+QUEUE_SIZE = 10000
+DEBUG_RATE = float(os.getenv("CANTELL_LOG_DEBUG_RATE", "20"))
+DEBUG_BURST = 50
 
-def setup_logger(name: str = "cantell_assistant") -> logging.Logger:
-    if not os.path.exists(LOG_DIR):
-        os.makedirs(LOG_DIR)
+correlation_id = contextvars.ContextVar("correlation_id", default="-")
+
+def new_correlation_id() -> str:
+    value = uuid.uuid4().hex[:12]
+    correlation_id.set(value)
+    return value
+
+class ContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+# Token bucket per call site for DEBUG records: a hot loop such as per-page PDF
+# logging keeps its first DEBUG_BURST lines, then DEBUG_RATE lines per second,
+# and the next line that gets through reports how many were dropped.
+class DebugSamplingFilter(logging.Filter):
+    def __init__(self, rate: float = DEBUG_RATE, burst: int = DEBUG_BURST):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, suppressed = self._sites.get(site, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._sites[site] = (tokens, now, suppressed + 1)
+                return False
+            self._sites[site] = (tokens - 1, now, 0)
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", "-"),
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName,
+        }
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+# Never blocks the caller: a record that finds the queue full is dropped, and the
+# next record that gets through is followed by a warning with the number lost.
+class NonBlockingQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.reported = 0
+
+    # QueueHandler.prepare() folds the traceback into the message and clears it,
+    # which hid it from JsonFormatter. The traceback is kept as exc_text instead:
+    # a string crosses the queue, and the process boundary, without holding frames.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped > self.reported:
+            self._report_dropped(record)
+
+    def _report_dropped(self, after: logging.LogRecord):
+        count = self.dropped - self.reported
+        warning = logging.LogRecord(
+            after.name, logging.WARNING, __file__, 0,
+            f"Dropped {count} log record(s) because the log queue was full", None, None
+        )
+        warning.correlation_id = getattr(after, "correlation_id", "-")
+        try:
+            self.queue.put_nowait(warning)
+        except queue.Full:
+            return
+        self.reported += count
 
+listener = None
+worker_queue = None
+worker_listener = None
+_worker_lock = threading.Lock()
+
+def stop_logging():
+    global listener, worker_listener
+    if worker_listener is not None:
+        worker_listener.stop()
+        worker_listener = None
+    if listener is not None:
+        listener.stop()
+        listener = None
+
+# Worker processes log through a queue drained by this process's handlers, so
+# only one process ever writes and rotates the log file. Pass the queue to
+# init_worker_logging() in the pool initializer; workers that start pools of
+# their own hand the same queue down. Returns None in a process that has neither.
+def worker_log_queue():
+    global worker_queue, worker_listener
+    with _worker_lock:
+        if worker_queue is None and listener is not None:
+            # A spawn-context queue can be handed to fork, forkserver and spawn workers alike.
+            worker_queue = multiprocessing.get_context("spawn").Queue(QUEUE_SIZE)
+            worker_listener = QueueListener(worker_queue, *listener.handlers, respect_handler_level=True)
+            worker_listener.start()
+        return worker_queue
+
+def init_worker_logging(log_queue, name: str = "cantell_assistant"):
+    global listener, worker_queue
+    if log_queue is None:
+        return
+    worker_queue = log_queue
+    listener = None
+
+    logger = logging.getLogger(name)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(DebugSamplingFilter())
+    logger.addHandler(queue_handler)
+
+def setup_logger(name: str = "cantell_assistant") -> logging.Logger:
+    global listener
     logger = logging.getLogger(name)
     logger.setLevel(logging.DEBUG)
 
@@ -19,24 +176,44 @@ def setup_logger(name: str = "cantell_assistant") -> logging.Logger:
         return logger
 
     formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        "%(asctime)s - %(name)s - %(levelname)s - [%(correlation_id)s] %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S"
     )
 
+    # Worker processes leave the log file to the parent; until init_worker_logging()
+    # connects them to its queue they only log to the console.
+    if multiprocessing.parent_process() is not None:
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+        console_handler.addFilter(ContextFilter())
+        console_handler.setFormatter(formatter)
+        logger.addHandler(console_handler)
+        return logger
+
+    if not os.path.exists(LOG_DIR):
+        os.makedirs(LOG_DIR)
+
     file_handler = RotatingFileHandler(
         LOG_FILE,
         maxBytes=MAX_BYTES,
         backupCount=BACKUP_COUNT
     )
     file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(formatter)
+    file_handler.setFormatter(JsonFormatter())
 
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    queue_handler = NonBlockingQueueHandler(queue.Queue(QUEUE_SIZE))
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(DebugSamplingFilter())
+
+    listener = QueueListener(queue_handler.queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_logging)
+
+    logger.addHandler(queue_handler)
 
     return logger
 
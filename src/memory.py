@@ -0,0 +1,74 @@
+from collections import deque
+from typing import List
+from src.logger import logger
+from src.chunker import CHARS_PER_TOKEN, estimate_tokens
+
+MAX_TURNS = 6
+MAX_HISTORY_TOKENS = 2000
+MAX_SUMMARY_TOKENS = 500
+
+class ConversationMemory:
+    def __init__(self, max_turns: int = MAX_TURNS, max_history_tokens: int = MAX_HISTORY_TOKENS,
+                 max_summary_tokens: int = MAX_SUMMARY_TOKENS):
+        self.max_turns = max_turns
+        self.max_history_tokens = max_history_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.summary = ""
+        self.turns = deque()
+        self._history_tokens = 0
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def history(self) -> List[dict]:
+        return list(self.turns)
+
+    def add_turn(self, user: str, assistant: str, summarizer=None):
+        turn = {"user": user, "assistant": assistant}
+        self.turns.append(turn)
+        self._history_tokens += self._turn_tokens(turn)
+
+        if len(self.turns) <= self.max_turns and self._history_tokens <= self.max_history_tokens:
+            return
+
+        # Each roll-up is a model call on the request path, so once the window is
+        # full its older half is folded in at once rather than one turn per message.
+        keep = max(1, self.max_turns // 2)
+        evicted = []
+        while len(self.turns) > 1 and (len(self.turns) > keep or self._history_tokens > self.max_history_tokens):
+            old = self.turns.popleft()
+            self._history_tokens -= self._turn_tokens(old)
+            evicted.append(old)
+
+        if evicted:
+            self._roll_into_summary(evicted, summarizer)
+
+    def clear(self):
+        self.summary = ""
+        self.turns.clear()
+        self._history_tokens = 0
+
+    @staticmethod
+    def _turn_tokens(turn: dict) -> int:
+        return estimate_tokens(turn["user"]) + estimate_tokens(turn["assistant"])
+
+    def _roll_into_summary(self, evicted: List[dict], summarizer):
+        logger.info(f"Rolling {len(evicted)} conversation turns into the running summary")
+
+        if summarizer is not None:
+            try:
+                self.summary = self._truncate(
+                    summarizer.summarize_conversation(self.summary, evicted, self.max_summary_tokens)
+                )
+                return
+            except Exception as e:
+                logger.warning(f"Could not update conversation summary, keeping a truncated copy: {str(e)}")
+
+        appended = "\n".join(f"User: {t['user']}\nEIT: {t['assistant']}" for t in evicted)
+        self.summary = self._truncate(f"{self.summary}\n{appended}".strip(), keep_end=True)
+
+    def _truncate(self, text: str, keep_end: bool = False) -> str:
+        max_chars = self.max_summary_tokens * CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+        return text[-max_chars:] if keep_end else text[:max_chars]
@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.logger import logger
+
+METRICS_HOST = os.getenv("CANTELL_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("CANTELL_METRICS_PORT", "9464"))
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    "cantell_stage_seconds": "Time spent in each processing stage",
+    "cantell_errors_total": "Errors raised per processing stage",
+    "cantell_tokens_total": "Estimated model tokens sent, received and served from cached contexts",
+    "cantell_cache_requests_total": "Cache lookups by cache and result",
+    "cantell_extractive_summaries_total": "Summaries served by the extractive backend",
+    "cantell_context_cache_total": "Provider-side cached context lookups by result",
+    "cantell_singleflight_total": "Coalesced requests by group and role (leader ran the work, follower shared it)",
+    "cantell_session_evictions_total": "Session state evicted to stay within the per-session memory budget",
+}
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(key: tuple, extra: dict = None) -> str:
+    pairs = list(key) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+class Histogram:
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+# Counters and latency histograms kept in process memory and rendered in the
+# Prometheus text format; labels are plain keyword arguments.
+class MetricsRegistry:
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def span(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc("cantell_errors_total", stage=stage)
+            raise
+        finally:
+            self.observe("cantell_stage_seconds", time.perf_counter() - started, stage=stage)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": {f"{name}{_format_labels(key)}": value for (name, key), value in self.counters.items()},
+                "histograms": {
+                    f"{name}{_format_labels(key)}": {
+                        "count": h.count,
+                        "sum": round(h.sum, 6),
+                        "p50": h.quantile(0.5),
+                        "p95": h.quantile(0.95),
+                        "p99": h.quantile(0.99),
+                    }
+                    for (name, key), h in self.histograms.items()
+                },
+            }
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+
+        described = set()
+        for (name, key), value in counters:
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_format_labels(key)} {value}")
+
+        for (name, key), h in histograms:
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip(h.buckets, h.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(key, {'le': bound})} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(key, {'le': '+Inf'})} {h.count}")
+            lines.append(f"{name}_sum{_format_labels(key)} {h.sum}")
+            lines.append(f"{name}_count{_format_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+
+metrics = MetricsRegistry()
+
+def _health() -> dict:
+    from src import resources
+    registry = resources.registry
+    if registry is None:
+        return {"ready": False, "warming": False, "resources": {}}
+    return registry.health()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/healthz":
+            health = _health()
+            self._send(200 if health["ready"] else 503, json.dumps(health), "application/json")
+        elif path in ("/", "/metrics"):
+            self._send(200, metrics.render(), "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self.send_error(404)
+
+    def _send(self, status: int, text: str, content_type: str):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="cantell-metrics", daemon=True).start()
+    logger.info(f"Metrics endpoint listening on http://{host}:{server.server_port}/metrics (health at /healthz)")
+    return server
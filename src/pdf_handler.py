@@ -1,41 +1,234 @@
+import hashlib
 import io
-from PyPDF2 import PdfReader
-from src.logger import logger
+import multiprocessing
+import os
+import queue
+import tempfile
+import time
+from collections import deque
+from typing import Callable, Iterable, Iterator, Tuple, Union
+from src.logger import init_worker_logging, logger, worker_log_queue
+from src.metrics import metrics
+
+MAX_PDF_BYTES = 50 * 1024 * 1024
+MAX_PAGES = 500
+PAGE_TIMEOUT = 30
+PDF_WORKERS = int(os.getenv("CANTELL_PDF_WORKERS", os.cpu_count() or 1))
+PARALLEL_MIN_PAGES = 8
+SPOOL_MEMORY_BYTES = int(os.getenv("CANTELL_PDF_SPOOL_BYTES", 4 * 1024 * 1024))
+SPOOL_BLOCK_BYTES = 1024 * 1024
+PAGE_SEPARATOR = "\n\n"
 
 class PDFHandlerError(Exception):
     pass
 
-def extract_text_from_pdf(pdf_file) -> str:
-    logger.info(f"Extracting text from PDF file")
-    
-    try:
-        if hasattr(pdf_file, 'read'):
-            file_content = pdf_file.read()
-            pdf_file = io.BytesIO(file_content)
-        
-        reader = PdfReader(pdf_file)
-        
-        if len(reader.pages) == 0:
-            logger.error("PDF has no pages")
-            raise PDFHandlerError("The PDF file appears to be empty or corrupted.")
+_worker_reader = None
+
+def _init_worker(source: Union[str, bytes], log_queue=None):
+    global _worker_reader
+    init_worker_logging(log_queue)
+    from PyPDF2 import PdfReader
+    _worker_reader = PdfReader(source if isinstance(source, str) else io.BytesIO(source))
+
+def _extract_page(page_index: int) -> Tuple[str, float]:
+    started = time.perf_counter()
+    text = _worker_reader.pages[page_index].extract_text() or ""
+    return text, time.perf_counter() - started
+
+# An upload copied in blocks while it is hashed: small files stay in memory,
+# anything over SPOOL_MEMORY_BYTES goes to a temporary file on disk that the
+# reader and the worker processes open by path, so a large PDF is never held as
+# a second full copy in memory. Paths on disk are read in place.
+class SpooledPDF:
+    def __init__(self, pdf_file, max_bytes: int = MAX_PDF_BYTES):
+        self.path = None
+        self.size = 0
+        digest = hashlib.sha256()
+        on_disk = isinstance(pdf_file, (str, os.PathLike))
         
-        logger.info(f"PDF has {len(reader.pages)} pages")
+        if on_disk:
+            self.path = os.fspath(pdf_file)
+            self.file = open(self.path, "rb")
+        else:
+            self.file = io.BytesIO()
         
-        full_text = []
+        try:
+            source = self.file if on_disk else pdf_file
+            while True:
+                block = source.read(SPOOL_BLOCK_BYTES)
+                if not block:
+                    break
+                self.size += len(block)
+                if self.size > max_bytes:
+                    logger.error(f"PDF exceeds the {max_bytes} byte limit")
+                    raise PDFHandlerError(f"The PDF file is too large. The maximum size is {max_bytes // (1024 * 1024)} MB.")
+                digest.update(block)
+                if not on_disk:
+                    if self.size > SPOOL_MEMORY_BYTES and isinstance(self.file, io.BytesIO):
+                        self._spool_to_disk()
+                    self.file.write(block)
+        except BaseException:
+            self.close()
+            raise
         
-        for page_num, page in enumerate(reader.pages):
-            try:
-                text = page.extract_text()
-                if text:
-                    full_text.append(text)
-                    logger.debug(f"Extracted {len(text)} characters from page {page_num + 1}")
-            except Exception as e:
-                logger.warning(f"Error extracting text from page {page_num + 1}: {str(e)}")
-                continue
+        self.sha256 = digest.hexdigest()
+        self.file.seek(0)
+    
+    def _spool_to_disk(self):
+        spooled = tempfile.NamedTemporaryFile(prefix="cantell-upload-", suffix=".pdf")
+        spooled.write(self.file.getbuffer())
+        self.file = spooled
+        self.path = spooled.name
+    
+    @property
+    def worker_source(self) -> Union[str, bytes]:
+        return self.path or self.file.getvalue()
+    
+    def close(self):
+        self.file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def _iter_pages_serial(reader, total: int) -> Iterator[Tuple[int, str, float]]:
+    for page_num in range(total):
+        started = time.perf_counter()
+        try:
+            text = reader.pages[page_num].extract_text() or ""
+        except Exception as e:
+            logger.warning(f"Error extracting text from page {page_num + 1}: {str(e)}")
+            text = ""
+        yield page_num + 1, text, time.perf_counter() - started
+
+def _iter_pages_parallel(source: Union[str, bytes], total: int, workers: int,
+                         page_timeout: float) -> Iterator[Tuple[int, str, float]]:
+    pending = deque(range(total))
+    
+    while pending:
+        results = queue.Queue()
+        in_flight = {}
+        stalled = False
+        pool = _mp_context().Pool(processes=workers, initializer=_init_worker,
+                                  initargs=(source, worker_log_queue()))
         
-        combined_text = '\n\n'.join(full_text)
+        try:
+            while pending or in_flight:
+                while pending and len(in_flight) < workers:
+                    page_index = pending.popleft()
+                    in_flight[page_index] = time.monotonic()
+                    pool.apply_async(
+                        _extract_page, (page_index,),
+                        callback=lambda result, i=page_index: results.put((i, result, None)),
+                        error_callback=lambda e, i=page_index: results.put((i, None, e))
+                    )
+                
+                deadline = min(in_flight.values()) + page_timeout
+                try:
+                    page_index, result, error = results.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    now = time.monotonic()
+                    for page_index, started in list(in_flight.items()):
+                        if now - started >= page_timeout:
+                            logger.warning(f"Timed out extracting text from page {page_index + 1} after {page_timeout}s")
+                            del in_flight[page_index]
+                            yield page_index + 1, "", now - started
+                    pending.extendleft(sorted(in_flight, reverse=True))
+                    stalled = True
+                    break
+                
+                if in_flight.pop(page_index, None) is None:
+                    continue
+                if error is not None:
+                    logger.warning(f"Error extracting text from page {page_index + 1}: {str(error)}")
+                    yield page_index + 1, "", 0.0
+                    continue
+                text, seconds = result
+                yield page_index + 1, text, seconds
+        finally:
+            if stalled or pending or in_flight:
+                pool.terminate()
+            else:
+                pool.close()
+            pool.join()
+
+def iter_pdf_pages(pdf_file, max_pages: int = MAX_PAGES, max_bytes: int = MAX_PDF_BYTES,
+                   page_timeout: float = PAGE_TIMEOUT, workers: int = None,
+                   on_start: Callable[[int], None] = None) -> Iterator[Tuple[int, str]]:
+    if isinstance(pdf_file, SpooledPDF):
+        yield from _iter_spooled_pages(pdf_file, max_pages, page_timeout, workers, on_start)
+        return
+    
+    with SpooledPDF(pdf_file, max_bytes) as spool:
+        yield from _iter_spooled_pages(spool, max_pages, page_timeout, workers, on_start)
+
+def _iter_spooled_pages(spool: SpooledPDF, max_pages: int, page_timeout: float, workers: int,
+                        on_start: Callable[[int], None]) -> Iterator[Tuple[int, str]]:
+    from PyPDF2 import PdfReader
+    
+    try:
+        spool.file.seek(0)
+        reader = PdfReader(spool.file)
+        page_count = len(reader.pages)
+    except Exception as e:
+        logger.error(f"Error processing PDF: {str(e)}")
+        raise PDFHandlerError(f"Error processing PDF: {str(e)}")
+    
+    if page_count == 0:
+        logger.error("PDF has no pages")
+        raise PDFHandlerError("The PDF file appears to be empty or corrupted.")
+    
+    logger.info(f"PDF has {page_count} pages")
+    
+    total = page_count
+    if total > max_pages:
+        logger.warning(f"PDF has {page_count} pages, only the first {max_pages} will be processed")
+        total = max_pages
+    
+    if on_start is not None:
+        on_start(total)
+    
+    workers = min(workers or PDF_WORKERS, total)
+    if workers > 1 and total >= PARALLEL_MIN_PAGES:
+        logger.info(f"Extracting {total} pages with {workers} worker processes")
+        del reader
+        pages = _iter_pages_parallel(spool.worker_source, total, workers, page_timeout)
+    else:
+        pages = _iter_pages_serial(reader, total)
+    
+    for page_num, text, seconds in pages:
+        metrics.observe("cantell_stage_seconds", seconds, stage="pdf_page")
+        logger.debug(f"Extracted {len(text)} characters from page {page_num}")
+        yield page_num, text
+
+def in_page_order(pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+    buffered = {}
+    next_page = 1
+    for page_num, text in pages:
+        buffered[page_num] = text
+        while next_page in buffered:
+            yield next_page, buffered.pop(next_page)
+            next_page += 1
+
+def extract_text_from_pdf(pdf_file, max_pages: int = MAX_PAGES, max_bytes: int = MAX_PDF_BYTES,
+                          page_timeout: float = PAGE_TIMEOUT, workers: int = None) -> str:
+    logger.info(f"Extracting text from PDF file")
+    
+    try:
+        with metrics.span("pdf_extract"):
+            combined_text = PAGE_SEPARATOR.join(
+                text
+                for _, text in in_page_order(iter_pdf_pages(pdf_file, max_pages, max_bytes, page_timeout, workers))
+                if text.strip()
+            )
         
-        if not combined_text.strip():
+        if not combined_text:
             logger.warning("No text could be extracted from PDF")
             raise PDFHandlerError("Could not extract text from this PDF. It might contain only images or use OCR.")
         
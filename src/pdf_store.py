@@ -0,0 +1,346 @@
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Tuple
+from src.logger import logger
+from src.cache import CACHE_DIR
+from src.chunker import ChunkBuilder
+from src.retrieval import CHUNK_TOKENS, ChunkIndex
+from src.pdf_handler import MAX_PDF_BYTES, PAGE_SEPARATOR, PDFHandlerError, SpooledPDF, in_page_order, iter_pdf_pages
+from src.metrics import metrics
+from src.singleflight import FlightAbandoned, SingleFlight
+
+STORE_DIR = os.path.join(CACHE_DIR, "pdf_text")
+TEXT_FILE = "text.txt"
+CHUNKS_FILE = "chunks.txt"
+INDEX_FILE = "index.json"
+MAX_ENTRIES = 500
+MAX_BYTES = int(float(os.getenv("CANTELL_PDF_STORE_MB", "500")) * 1024 * 1024)
+MAX_INDEXES = int(os.getenv("CANTELL_PDF_INDEXES", "16"))
+
+def _read_span(path: str, start: int, end: int) -> str:
+    if end <= start:
+        return ""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return mm[start:end].decode("utf-8")
+
+class StoredChunks:
+    def __init__(self, path: str, spans: List[Tuple[int, int]]):
+        self.path = path
+        self.spans = spans
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __getitem__(self, position: int) -> str:
+        start, end = self.spans[position]
+        return _read_span(self.path, start, end)
+
+    def __iter__(self):
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start, end in self.spans:
+                yield mm[start:end].decode("utf-8")
+
+class PDFHandle:
+    def __init__(self, sha256: str, directory: str, index: dict):
+        self.sha256 = sha256
+        self.directory = directory
+        self.pages = [tuple(page) for page in index["pages"]]
+        self.metadata = index["metadata"]
+        self.chunks = StoredChunks(os.path.join(directory, CHUNKS_FILE), [tuple(s) for s in index["chunks"]])
+
+    @property
+    def text_path(self) -> str:
+        return os.path.join(self.directory, TEXT_FILE)
+
+    @property
+    def size(self) -> int:
+        return self.pages[-1][2] if self.pages else 0
+
+    def text(self) -> str:
+        return _read_span(self.text_path, 0, self.size)
+
+    def iter_pages(self) -> Iterator[Tuple[int, str]]:
+        if not self.pages:
+            return
+        with open(self.text_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for number, start, end in self.pages:
+                yield number, mm[start:end].decode("utf-8")
+
+    def page_text(self, page_number: int) -> str:
+        for number, start, end in self.pages:
+            if number == page_number:
+                return _read_span(self.text_path, start, end)
+        raise KeyError(page_number)
+
+# Writes a store entry page by page into a staging directory: page text is
+# appended to the text file and chunks are flushed to the chunks file as soon as
+# they fill up, so only the offsets are kept in memory while a PDF is extracted.
+class _EntryWriter:
+    def __init__(self, directory: str, sha256: str, chunk_tokens: int):
+        self.staging_dir = tempfile.mkdtemp(prefix=f".{sha256[:12]}-", dir=directory)
+        self.pages = []
+        self.chunks = []
+        self._separator = PAGE_SEPARATOR.encode("utf-8")
+        self._text = open(os.path.join(self.staging_dir, TEXT_FILE), "wb")
+        self._chunk_file = open(os.path.join(self.staging_dir, CHUNKS_FILE), "wb")
+        self._text_offset = 0
+        self._chunk_offset = 0
+        self._builder = ChunkBuilder(chunk_tokens)
+
+    def add_page(self, number: int, text: str):
+        if not text.strip():
+            return
+        if self.pages:
+            self._text.write(self._separator)
+            self._text_offset += len(self._separator)
+        data = text.encode("utf-8")
+        self._text.write(data)
+        self.pages.append([number, self._text_offset, self._text_offset + len(data)])
+        self._text_offset += len(data)
+        for chunk in self._builder.add(text):
+            self._add_chunk(chunk)
+
+    def _add_chunk(self, chunk: str):
+        data = chunk.encode("utf-8")
+        self._chunk_file.write(data)
+        self.chunks.append([self._chunk_offset, self._chunk_offset + len(data)])
+        self._chunk_offset += len(data)
+
+    def finish(self, pdf_size: int, page_count: int) -> dict:
+        for chunk in self._builder.finish():
+            self._add_chunk(chunk)
+        self._text.close()
+        self._chunk_file.close()
+        index = {
+            "pages": self.pages,
+            "chunks": self.chunks,
+            "metadata": {
+                "pdf_bytes": pdf_size,
+                "page_count": page_count,
+                "pages_with_text": len(self.pages),
+                "last_page": self.pages[-1][0] if self.pages else 0,
+                "text_bytes": self._text_offset,
+                "created_at": time.time(),
+            },
+        }
+        with open(os.path.join(self.staging_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        return index
+
+    def discard(self):
+        self._text.close()
+        self._chunk_file.close()
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+# Entries are evicted least recently used first once the store holds more than
+# max_entries PDFs or max_bytes on disk; reading an entry marks it as used. The
+# BM25 index of each recently used PDF is kept here too, shared by every session
+# that loaded it, so sessions only need to remember the PDF's hash.
+class PDFTextStore:
+    def __init__(self, directory: str = STORE_DIR, chunk_tokens: int = CHUNK_TOKENS,
+                 max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES, max_indexes: int = MAX_INDEXES):
+        self.directory = directory
+        self.chunk_tokens = chunk_tokens
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_indexes = max_indexes
+        self._flights = SingleFlight("pdf_extract")
+        self._index_flights = SingleFlight("pdf_index")
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self._evict()
+
+    def _entry_dir(self, sha256: str) -> str:
+        return os.path.join(self.directory, sha256)
+
+    def get(self, sha256: str):
+        entry_dir = self._entry_dir(sha256)
+        index_path = os.path.join(entry_dir, INDEX_FILE)
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            os.utime(index_path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable PDF store entry {sha256}: {str(e)}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+        return PDFHandle(sha256, entry_dir, index)
+
+    def index(self, sha256: str) -> Optional[ChunkIndex]:
+        with self._lock:
+            pdf_index = self._indexes.get(sha256)
+            if pdf_index is not None:
+                self._indexes.move_to_end(sha256)
+        if pdf_index is not None:
+            metrics.inc("cantell_cache_requests_total", cache="pdf_index", result="hit")
+            return pdf_index
+
+        metrics.inc("cantell_cache_requests_total", cache="pdf_index", result="miss")
+        return self._index_flights.do(sha256, self._build_index, sha256)
+
+    def _build_index(self, sha256: str) -> Optional[ChunkIndex]:
+        handle = self.get(sha256)
+        if handle is None:
+            return None
+        pdf_index = ChunkIndex(chunks=handle.chunks, doc_id=sha256)
+        with self._lock:
+            self._indexes[sha256] = pdf_index
+            self._indexes.move_to_end(sha256)
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        return pdf_index
+
+    def _evict(self, keep: str = None):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(".") or not entry.is_dir():
+                continue
+            try:
+                size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                last_used = os.stat(os.path.join(entry.path, INDEX_FILE)).st_mtime
+            except OSError:
+                continue
+            entries.append((last_used, entry.name, size))
+
+        count, total = len(entries), sum(size for _, _, size in entries)
+        evicted = 0
+        for _, sha256, size in sorted(entries):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            if sha256 == keep:
+                continue
+            shutil.rmtree(self._entry_dir(sha256), ignore_errors=True)
+            with self._lock:
+                self._indexes.pop(sha256, None)
+            count -= 1
+            total -= size
+            evicted += 1
+
+        if evicted:
+            logger.info(f"Evicted {evicted} entries from the PDF text store")
+
+    def get_or_extract(self, pdf_file, max_bytes: int = MAX_PDF_BYTES, **extract_options) -> PDFHandle:
+        spool = SpooledPDF(pdf_file, max_bytes)
+        handle = self.get(spool.sha256)
+        if handle is not None:
+            spool.close()
+            logger.info(f"PDF text store hit for {spool.sha256[:12]}, skipping extraction")
+            return handle
+
+        for _ in self._extract_flight(spool, extract_options, replay_stored=False):
+            pass
+        handle = self.get(spool.sha256)
+        if handle is None:
+            raise PDFHandlerError("Error storing extracted PDF text.")
+        return handle
+
+    def iter_pages(self, pdf_file, max_bytes: int = MAX_PDF_BYTES,
+                   **extract_options) -> Tuple[str, Iterator[Tuple[int, str, int]]]:
+        spool = SpooledPDF(pdf_file, max_bytes)
+        handle = self.get(spool.sha256)
+        if handle is not None:
+            spool.close()
+            logger.info(f"PDF text store hit for {spool.sha256[:12]}, replaying stored pages")
+            return spool.sha256, self._stored_pages(handle)
+
+        return spool.sha256, self._extract_flight(spool, extract_options, replay_stored=True)
+
+    @staticmethod
+    def _stored_pages(handle: PDFHandle) -> Iterator[Tuple[int, str, int]]:
+        metadata = handle.metadata
+        total = metadata.get("page_count", metadata["last_page"])
+        for number, text in handle.iter_pages():
+            yield number, text, total
+        # Trailing pages without text are not stored; report the last one so
+        # progress still ends at the real page count.
+        if metadata["last_page"] < total:
+            yield total, "", total
+
+    # Identical uploads share one extraction. The flight keeps no pages: the
+    # leader streams them as they are extracted and callers that joined it wait
+    # for the entry to land in the store and read it from disk, closing their
+    # own copy of the upload as soon as they know they did not lead.
+    def _extract_flight(self, spool: SpooledPDF, extract_options: dict,
+                        replay_stored: bool) -> Iterator[Tuple[int, str, int]]:
+        followed = False
+
+        def follow():
+            nonlocal followed
+            followed = True
+            spool.close()
+
+        try:
+            yield from self._flights.stream(
+                spool.sha256, lambda: self._extract_pages(spool, extract_options), replay=False, on_follow=follow
+            )
+        except FlightAbandoned:
+            logger.warning(f"Shared extraction of PDF {spool.sha256[:12]} was abandoned by its leader")
+            raise PDFHandlerError("Extraction of this PDF was interrupted. Please try again.")
+        if not followed or not replay_stored:
+            return
+
+        handle = self.get(spool.sha256)
+        if handle is None:
+            raise PDFHandlerError("Error storing extracted PDF text.")
+        yield from self._stored_pages(handle)
+
+    def _extract_pages(self, spool: SpooledPDF, extract_options: dict) -> Iterator[Tuple[int, str, int]]:
+        sha256 = spool.sha256
+        logger.info(f"PDF text store miss for {sha256[:12]}, extracting pages progressively")
+        total = 0
+
+        def started(page_count: int):
+            nonlocal total
+            total = page_count
+
+        writer = _EntryWriter(self.directory, sha256, self.chunk_tokens)
+        try:
+            with spool, metrics.span("pdf_extract"):
+                for page_num, text in in_page_order(iter_pdf_pages(spool, on_start=started, **extract_options)):
+                    writer.add_page(page_num, text)
+                    yield page_num, text, total
+
+            if not writer.pages:
+                logger.warning("No text could be extracted from PDF")
+                raise PDFHandlerError("Could not extract text from this PDF. It might contain only images or use OCR.")
+            index = writer.finish(spool.size, total)
+        except PDFHandlerError:
+            writer.discard()
+            raise
+        except Exception as e:
+            writer.discard()
+            logger.error(f"Error storing extracted PDF text: {str(e)}")
+            raise PDFHandlerError(f"Error storing extracted PDF text: {str(e)}")
+        except BaseException:
+            writer.discard()
+            raise
+
+        try:
+            os.rename(writer.staging_dir, self._entry_dir(sha256))
+        except OSError:
+            logger.info(f"PDF store entry {sha256[:12]} was written concurrently, using existing copy")
+            shutil.rmtree(writer.staging_dir, ignore_errors=True)
+            return
+        logger.info(f"Stored extracted text for PDF {sha256[:12]} ({len(index['pages'])} pages, "
+                    f"{len(index['chunks'])} chunks)")
+        self._evict(keep=sha256)
+
+pdf_store = None
+_store_lock = threading.Lock()
+
+def get_pdf_store() -> PDFTextStore:
+    global pdf_store
+    with _store_lock:
+        if pdf_store is None:
+            pdf_store = PDFTextStore()
+        return pdf_store
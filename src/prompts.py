@@ -0,0 +1,173 @@
+from string import Formatter
+from src.personality import PERSONALITY
+
+# Prompt text split once, at import, into literal segments and field names, so
+# rendering a turn is a single join. Fields passed as static values (the persona)
+# are folded into the literals when the template is compiled.
+class PromptTemplate:
+    def __init__(self, template: str, **static):
+        literals, fields = [""], []
+        for literal, field, _, _ in Formatter().parse(template):
+            literals[-1] += literal
+            if field is None:
+                continue
+            if field in static:
+                literals[-1] += str(static[field])
+            else:
+                fields.append(field)
+                literals.append("")
+        self.literals = tuple(literals)
+        self.fields = tuple(fields)
+
+    def render(self, **values) -> str:
+        parts = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            parts.append(str(values[field]))
+            parts.append(literal)
+        return "".join(parts)
+
+    @property
+    def static_text(self) -> str:
+        return "".join(self.literals)
+
+SUMMARY = PromptTemplate("""{persona}
+
+Please summarize the following article concisely.
+Provide a clear summary that captures the main points, key findings, and important details.
+Keep the summary around {max_length} words or less, but make sure it's comprehensive.
+
+Article to summarize:
+---
+{text}
+---
+
+Summary:""", persona=PERSONALITY)
+
+CHUNK_SUMMARY = PromptTemplate("""{persona}
+
+The following is part {index} of {total} of a longer document.
+Summarize this part concisely, keeping the main points, key findings, names and figures.
+Keep the summary around {max_length} words or less.
+
+Document part {index} of {total}:
+---
+{chunk}
+---
+
+Summary of part {index}:""", persona=PERSONALITY)
+
+COMBINE_SUMMARIES = PromptTemplate("""{persona}
+
+The following are summaries of consecutive sections of one long document, in order.
+Combine them into a single clear summary of the whole document that captures the main points,
+key findings, and important details without repeating yourself.
+Keep the summary around {max_length} words or less, but make sure it's comprehensive.
+
+Section summaries:
+---
+{sections}
+---
+
+Summary:""", persona=PERSONALITY)
+
+PAGES_SUMMARY = PromptTemplate("""{persona}
+
+The following are pages {first_page} to {last_page} of a PDF document that is still being read.
+Summarize them concisely, keeping the main points, key findings, names and figures.
+Keep the summary around {max_length} words or less.
+
+Pages {first_page} to {last_page}:
+---
+{text}
+---
+
+Summary:""", persona=PERSONALITY)
+
+REFINE_SUMMARY = PromptTemplate("""{persona}
+
+You are summarizing a long PDF document section by section.
+Below is the current summary of pages 1 to {summarized_through}, followed by the next section of the document.
+Update the summary so it covers everything up to page {last_page}: integrate the main points, key findings,
+names and figures of the new section, and keep what still matters from the current summary.
+Keep the summary around {max_length} words or less, but make sure it's comprehensive.
+
+Current summary:
+---
+{summary}
+---
+
+New section (pages {first_page} to {last_page}):
+---
+{text}
+---
+
+Updated summary:""", persona=PERSONALITY)
+
+CHAT = PromptTemplate("""{persona}
+
+{summary_section}Conversation history:
+{history}
+
+User: {message}
+
+EIT:""", persona=PERSONALITY)
+
+CHAT_TURN = PromptTemplate("""{summary_section}Conversation history:
+{history}
+
+User: {message}
+
+EIT:""")
+
+CONVERSATION_SUMMARY = PromptTemplate("""You maintain a running summary of a conversation between a user and EIT, an AI assistant.
+Update the summary below with the new conversation turns.
+Keep facts, names, user preferences and open questions; drop pleasantries and repetition.
+Keep the updated summary under {max_words} words.
+
+Current summary:
+---
+{summary}
+---
+
+New conversation turns:
+---
+{turns}
+---
+
+Updated summary:""")
+
+PDF_CHAT = PromptTemplate("""{persona}
+
+You are helping the user understand a PDF document.
+Use ONLY the content from the PDF excerpts below to answer the user's question.
+The excerpts are the parts of the PDF most relevant to the question, in document order.
+If the answer is not in the excerpts, say so clearly.
+Be helpful, clear, and concise in your response.
+
+PDF Excerpts:
+---
+{context}
+---
+
+User's Question: {question}
+
+Your Answer:""", persona=PERSONALITY)
+
+# Cached-context variants: the persona and instructions become the system
+# instruction of a provider-side cached context holding the whole document, and
+# each turn only sends the question.
+PDF_SYSTEM = PromptTemplate("""{persona}
+
+You are helping the user understand a PDF document, which is provided in full in your context.
+Use ONLY the content of that PDF to answer the user's questions.
+If the answer is not in the PDF, say so clearly.
+Be helpful, clear, and concise in your response.""", persona=PERSONALITY).static_text
+
+PDF_DOCUMENT = PromptTemplate("""PDF Document:
+---
+{text}
+---""")
+
+PDF_QUESTION = PromptTemplate("""User's Question: {question}
+
+Your Answer:""")
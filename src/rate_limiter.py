@@ -0,0 +1,280 @@
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Iterator
+from src.logger import logger
+
+REQUESTS_PER_MINUTE = float(os.getenv("CANTELL_GEMINI_RPM", "60"))
+TOKENS_PER_MINUTE = float(os.getenv("CANTELL_GEMINI_TPM", "1000000"))
+MAX_CONCURRENCY = int(os.getenv("CANTELL_GEMINI_CONCURRENCY", "8"))
+MIN_CONCURRENCY = 1
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+RETRYABLE_STATUS = frozenset([429, 500, 502, 503, 504])
+
+current_session = contextvars.ContextVar("current_session", default="default")
+
+# Tokens are booked in the order callers ask for them: a caller that finds the
+# bucket short takes its tokens on credit and sleeps until the refill covers
+# them, so waiters are served first come, first served instead of racing to
+# retry after their sleeps.
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_minute / 60.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self, amount: float = 1.0):
+        wait = self.reserve(amount)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, amount: float = 1.0):
+        wait = self.reserve(amount)
+        if wait:
+            await asyncio.sleep(wait)
+
+class _AsyncGrant:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.granted = False
+
+    def set(self):
+        self.granted = True
+        self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+    def is_set(self) -> bool:
+        return self.granted
+
+# AIMD concurrency limit with round-robin admission across sessions, so one
+# busy session cannot starve the others while the limit is backed off.
+class AdaptiveConcurrencyLimiter:
+    def __init__(self, max_limit: int = MAX_CONCURRENCY, min_limit: int = MIN_CONCURRENCY,
+                 initial_limit: float = None, decrease_factor: float = 0.5):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(initial_limit or max_limit)
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._queues = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, session: str = "default"):
+        granted = threading.Event()
+        with self._lock:
+            self._queues.setdefault(session, deque()).append(granted)
+            self._dispatch()
+        granted.wait()
+
+    async def acquire_async(self, session: str = "default"):
+        granted = _AsyncGrant(asyncio.get_running_loop())
+        with self._lock:
+            self._queues.setdefault(session, deque()).append(granted)
+            self._dispatch()
+        try:
+            await granted.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if granted.is_set():
+                    self.in_flight -= 1
+                    self._dispatch()
+                else:
+                    waiters = self._queues.get(session)
+                    if waiters is not None and granted in waiters:
+                        waiters.remove(granted)
+                        if not waiters:
+                            del self._queues[session]
+            raise
+
+    def release(self, throttled: bool = False):
+        with self._lock:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                logger.warning(f"Model throttled, concurrency limit reduced to {self.limit:.2f}")
+            else:
+                self.limit = min(self.max_limit, self.limit + 1.0 / max(self.limit, 1.0))
+            self._dispatch()
+
+    def _dispatch(self):
+        while self._queues and self.in_flight < max(self.min_limit, int(self.limit)):
+            session, waiters = next(iter(self._queues.items()))
+            granted = waiters.popleft()
+            if waiters:
+                self._queues.move_to_end(session)
+            else:
+                del self._queues[session]
+            self.in_flight += 1
+            granted.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "waiting": sum(len(w) for w in self._queues.values()),
+                "sessions_waiting": len(self._queues),
+            }
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if callable(status):
+        try:
+            status = status()
+        except Exception:
+            status = None
+    return status in RETRYABLE_STATUS
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    hinted = getattr(error, "retry_after", None)
+    if isinstance(hinted, (int, float)) and hinted > 0:
+        return min(BACKOFF_MAX, float(hinted))
+    return min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+# Calls are admitted through the per-session fair queue first and only then
+# take request and prompt tokens, so when the quota is the binding limit the
+# order in which sessions get it is still decided round-robin. The request
+# bucket allows a burst of one call per concurrency slot.
+class ModelRateLimiter:
+    def __init__(self, requests_per_minute: float = REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = TOKENS_PER_MINUTE, max_concurrency: int = MAX_CONCURRENCY,
+                 max_retries: int = MAX_RETRIES):
+        self.requests = TokenBucket(requests_per_minute,
+                                    capacity=max(1.0, min(requests_per_minute, float(max_concurrency))))
+        self.tokens = TokenBucket(tokens_per_minute, capacity=tokens_per_minute)
+        self.concurrency = AdaptiveConcurrencyLimiter(max_limit=max_concurrency)
+        self.max_retries = max_retries
+        self.throttled = 0
+        self.retries = 0
+
+    def _admit(self, tokens: int):
+        self.concurrency.acquire(current_session.get())
+        try:
+            self.requests.acquire(1)
+            self.tokens.acquire(tokens)
+        except BaseException:
+            self.concurrency.release()
+            raise
+
+    async def _admit_async(self, tokens: int):
+        await self.concurrency.acquire_async(current_session.get())
+        try:
+            await self.requests.acquire_async(1)
+            await self.tokens.acquire_async(tokens)
+        except BaseException:
+            self.concurrency.release()
+            raise
+
+    def _failure_delay(self, error: Exception, attempt: int):
+        retryable = is_retryable(error)
+        self.concurrency.release(throttled=retryable)
+        if retryable:
+            self.throttled += 1
+        if not retryable or attempt >= self.max_retries:
+            return None
+
+        self.retries += 1
+        delay = _retry_delay(error, attempt)
+        logger.warning(f"Model call failed with {type(error).__name__}, retrying in {delay:.1f}s "
+                       f"(attempt {attempt + 1} of {self.max_retries})")
+        return delay
+
+    def _handle_failure(self, error: Exception, attempt: int) -> bool:
+        delay = self._failure_delay(error, attempt)
+        if delay is None:
+            return False
+        time.sleep(delay)
+        return True
+
+    def call(self, fn: Callable, tokens: int = 1):
+        attempt = 0
+        while True:
+            self._admit(tokens)
+            try:
+                result = fn()
+            except Exception as e:
+                if self._handle_failure(e, attempt):
+                    attempt += 1
+                    continue
+                raise
+            self.concurrency.release()
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable], tokens: int = 1):
+        attempt = 0
+        while True:
+            await self._admit_async(tokens)
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                self.concurrency.release()
+                raise
+            except Exception as e:
+                delay = self._failure_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self.concurrency.release()
+            return result
+
+    def stream(self, fn: Callable[[], Iterator], tokens: int = 1) -> Iterator:
+        attempt = 0
+        while True:
+            self._admit(tokens)
+            started = False
+            try:
+                for item in fn():
+                    started = True
+                    yield item
+            except GeneratorExit:
+                self.concurrency.release()
+                raise
+            except Exception as e:
+                if not started and self._handle_failure(e, attempt):
+                    attempt += 1
+                    continue
+                if started:
+                    self.concurrency.release(throttled=is_retryable(e))
+                raise
+            self.concurrency.release()
+            return
+
+    def stats(self) -> dict:
+        stats = self.concurrency.stats()
+        stats.update(throttled=self.throttled, retries=self.retries)
+        return stats
+
+model_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_model_limiter() -> ModelRateLimiter:
+    global model_limiter
+    with _limiter_lock:
+        if model_limiter is None:
+            model_limiter = ModelRateLimiter()
+        return model_limiter
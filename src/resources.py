@@ -0,0 +1,178 @@
+import threading
+import time
+from typing import Callable
+from src.logger import logger
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+WARMUP_HTML = b"<html><head><title>warm-up</title></head><body><article><p>warm-up</p></article></body></html>"
+
+class Resource:
+    def __init__(self, name: str, factory: Callable, required: bool = True):
+        self.name = name
+        self.factory = factory
+        self.required = required
+        self.value = None
+        self.state = PENDING
+        self.error = None
+        self.seconds = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.state == READY:
+            return self.value
+
+        with self._lock:
+            if self.state != READY:
+                started = time.monotonic()
+                try:
+                    self.value = self.factory()
+                except Exception as e:
+                    self.state = FAILED
+                    self.error = str(e)
+                    logger.error(f"Resource '{self.name}' failed to initialize: {str(e)}")
+                    raise
+                self.seconds = time.monotonic() - started
+                self.error = None
+                self.state = READY
+                logger.info(f"Resource '{self.name}' ready in {self.seconds * 1000:.0f} ms")
+        return self.value
+
+# Process-wide registry of the shared clients. Each resource is created once
+# behind its own lock, so concurrent sessions never race on construction, and
+# warm_up() builds them all in the background right after the server starts.
+class ResourceRegistry:
+    def __init__(self):
+        self._resources = {}
+        self._lock = threading.Lock()
+        self._warmup_thread = None
+
+    def register(self, name: str, factory: Callable, required: bool = True):
+        with self._lock:
+            self._resources[name] = Resource(name, factory, required)
+
+    def get(self, name: str):
+        return self._resources[name].get()
+
+    def warm_up(self, background: bool = True):
+        with self._lock:
+            if self._warmup_thread is not None:
+                return
+            self._warmup_thread = threading.Thread(target=self._warm_all, name="cantell-warmup", daemon=True)
+
+        if background:
+            self._warmup_thread.start()
+        else:
+            self._warmup_thread.run()
+
+    def _warm_all(self):
+        started = time.monotonic()
+        for resource in list(self._resources.values()):
+            try:
+                resource.get()
+            except Exception:
+                continue
+        logger.info(f"Warm-up finished in {time.monotonic() - started:.2f}s, ready: {self.ready}")
+
+    @property
+    def ready(self) -> bool:
+        return all(r.state == READY for r in self._resources.values() if r.required)
+
+    @property
+    def warming(self) -> bool:
+        thread = self._warmup_thread
+        return thread is not None and thread.is_alive()
+
+    def health(self) -> dict:
+        return {
+            "ready": self.ready,
+            "warming": self.warming,
+            "resources": {
+                name: {"state": r.state, "required": r.required, "seconds": r.seconds, "error": r.error}
+                for name, r in self._resources.items()
+            },
+        }
+
+def _warm_extractor():
+    from src.extraction import get_extractor
+    extractor = get_extractor()
+    extractor.extract(WARMUP_HTML)
+    return extractor
+
+def _warm_pdf_reader():
+    import PyPDF2
+    return PyPDF2
+
+def _check_model_backend():
+    from src.summarizer import get_summarizer
+    summarizer = get_summarizer()
+    if summarizer.model_error:
+        raise RuntimeError(summarizer.model_error)
+    return summarizer.model
+
+def _start_metrics():
+    from src.metrics import METRICS_PORT, start_metrics_server
+    if not METRICS_PORT:
+        return None
+    return start_metrics_server()
+
+def _default_registry() -> ResourceRegistry:
+    from src.async_runtime import get_runtime
+    from src.rate_limiter import get_model_limiter
+    from src.summarizer import get_summarizer
+    from src.url_handler import get_http_cache, get_http_session
+    from src.pdf_store import get_pdf_store
+
+    registry = ResourceRegistry()
+    registry.register("metrics_server", _start_metrics, required=False)
+    registry.register("async_runtime", get_runtime)
+    registry.register("model_limiter", get_model_limiter)
+    registry.register("summarizer", get_summarizer)
+    registry.register("model_backend", _check_model_backend)
+    registry.register("http_session", get_http_session)
+    registry.register("http_cache", get_http_cache, required=False)
+    registry.register("extractor", _warm_extractor)
+    registry.register("pdf_store", get_pdf_store, required=False)
+    registry.register("pdf_reader", _warm_pdf_reader)
+    return registry
+
+registry = None
+_registry_lock = threading.Lock()
+
+def get_registry() -> ResourceRegistry:
+    global registry
+    with _registry_lock:
+        if registry is None:
+            registry = _default_registry()
+        return registry
+
+# Readiness probe for the running app: the registry lives in the server process,
+# so the probe asks that process through the /healthz route of the metrics server.
+def probe(host: str = None, port: int = None, timeout: float = 5.0) -> dict:
+    import json
+    from urllib.request import urlopen
+    from urllib.error import HTTPError
+    from src.metrics import METRICS_HOST, METRICS_PORT
+
+    url = f"http://{host or METRICS_HOST}:{port or METRICS_PORT}/healthz"
+    try:
+        with urlopen(url, timeout=timeout) as response:
+            return json.loads(response.read())
+    except HTTPError as e:
+        if e.code == 503:
+            return json.loads(e.read())
+        raise
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    try:
+        health = probe()
+    except OSError as e:
+        print(f"Cantell is not reachable: {str(e)}", file=sys.stderr)
+        sys.exit(2)
+    print(json.dumps(health, indent=2))
+    sys.exit(0 if health["ready"] else 1)
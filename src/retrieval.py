@@ -0,0 +1,98 @@
+import hashlib
+import re
+from collections import Counter
+from typing import Dict, List, Sequence
+import numpy as np
+from src.logger import logger
+from src.chunker import estimate_tokens, split_into_chunks
+from src.metrics import metrics
+
+CHUNK_TOKENS = 400
+TOP_K = 6
+MAX_CONTEXT_TOKENS = 3000
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers him his how i if in into is it its itself just me more most my no nor not now of off on once only
+or other our ours out over own same she should so some such than that the their theirs them then there these
+they this those through to too under until up very was we were what when where which while who whom why will
+with would you your yours
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+class ChunkIndex:
+    def __init__(self, text: str = None, chunk_tokens: int = CHUNK_TOKENS,
+                 chunks: Sequence[str] = None, doc_id: str = None):
+        if chunks is None:
+            self.doc_id = hashlib.sha256(text.encode("utf-8", errors="replace")).hexdigest()
+            self.chunks = split_into_chunks(text, chunk_tokens)
+        else:
+            self.doc_id = doc_id
+            self.chunks = chunks
+        self._postings: Dict[str, tuple] = {}
+        self._build()
+        logger.info(f"Built PDF chunk index with {len(self.chunks)} chunks and {len(self._postings)} terms")
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def _build(self):
+        term_counts = [Counter(tokenize(chunk)) for chunk in self.chunks]
+        lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+        avg_length = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / avg_length)
+
+        postings: Dict[str, list] = {}
+        for doc, counts in enumerate(term_counts):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc, tf))
+
+        total = len(self.chunks)
+        for term, entries in postings.items():
+            docs = np.fromiter((d for d, _ in entries), dtype=np.int32, count=len(entries))
+            tfs = np.fromiter((tf for _, tf in entries), dtype=np.float32, count=len(entries))
+            idf = np.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            weights = idf * tfs * (BM25_K1 + 1) / (tfs + norm[docs])
+            self._postings[term] = (docs, weights.astype(np.float32))
+
+    def search(self, query: str, top_k: int = TOP_K) -> List[int]:
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if posting is not None:
+                docs, weights = posting
+                scores[docs] += weights
+
+        matched = np.flatnonzero(scores)
+        if len(matched) == 0:
+            return list(range(min(top_k, len(self.chunks))))
+
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        return matched[np.argsort(-scores[matched], kind="stable")].tolist()
+
+    def context_for(self, query: str, top_k: int = TOP_K, max_tokens: int = MAX_CONTEXT_TOKENS) -> str:
+        with metrics.span("retrieval"):
+            return self._context_for(query, top_k, max_tokens)
+
+    def _context_for(self, query: str, top_k: int, max_tokens: int) -> str:
+        selected = []
+        used = 0
+        for position in self.search(query, top_k):
+            tokens = estimate_tokens(self.chunks[position])
+            if selected and used + tokens > max_tokens:
+                continue
+            selected.append(position)
+            used += tokens
+
+        return "\n\n".join(
+            f"[Excerpt {position + 1} of {len(self.chunks)}]\n{self.chunks[position]}"
+            for position in sorted(selected)
+        )
@@ -0,0 +1,72 @@
+import io
+import os
+import sys
+import types
+from collections import deque
+from typing import Dict, Iterable, List, Mapping
+import numpy as np
+
+SESSION_MEMORY_BUDGET = int(float(os.getenv("CANTELL_SESSION_MEMORY_MB", "32")) * 1024 * 1024)
+
+_LEAVES = (str, bytes, bytearray, int, float, complex, bool, type(None))
+_SKIPPED = (type, types.ModuleType, types.FunctionType, types.MethodType, types.BuiltinFunctionType)
+
+# Approximate deep size of session state values: containers and plain objects
+# are walked, NumPy arrays count their buffers and in-memory files (uploads)
+# count their contents. Objects reachable from several keys are counted once,
+# under the first key measured, so shared message dicts are not double counted.
+def sizeof(obj, seen: set = None) -> int:
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SKIPPED):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj, 0)
+
+        if isinstance(obj, _LEAVES):
+            continue
+        if isinstance(obj, np.ndarray):
+            total += obj.nbytes if obj.base is None else 0
+            continue
+        if isinstance(obj, io.BytesIO):
+            try:
+                total += obj.getbuffer().nbytes
+            except ValueError:
+                pass
+            continue
+        if isinstance(obj, Mapping):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            stack.extend(obj)
+        if hasattr(obj, "__dict__"):
+            stack.append(vars(obj))
+        for slot in getattr(type(obj), "__slots__", ()):
+            if hasattr(obj, slot):
+                stack.append(getattr(obj, slot))
+    return total
+
+def measure(state: Mapping, first: Iterable[str] = ()) -> Dict[str, int]:
+    seen = set()
+    keys = [key for key in first if key in state]
+    keys += [key for key in state if key not in keys]
+    return {key: sizeof(state[key], seen) for key in keys}
+
+def trim_oldest(items: List, excess: int, keep: int) -> List:
+    dropped, freed = 0, 0
+    while freed < excess and len(items) - dropped > keep:
+        freed += sizeof(items[dropped])
+        dropped += 1
+    removed = items[:dropped]
+    del items[:dropped]
+    return removed
+
+def format_bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
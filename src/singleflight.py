@@ -0,0 +1,179 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Iterator
+from src.logger import logger
+from src.metrics import metrics
+
+class FlightAbandoned(Exception):
+    pass
+
+class Flight:
+    def __init__(self):
+        self.future = Future()
+        self.parts = []
+        self.followers = 0
+        self._changed = threading.Condition()
+
+    def publish(self, part: str):
+        with self._changed:
+            self.parts.append(part)
+            self._changed.notify_all()
+
+    def finish(self, result: Any = None, error: BaseException = None):
+        with self._changed:
+            if error is None:
+                self.future.set_result(result)
+            else:
+                self.future.set_exception(error)
+            self._changed.notify_all()
+
+    def follow(self) -> Iterator[str]:
+        position = 0
+        while True:
+            with self._changed:
+                while position == len(self.parts) and not self.future.done():
+                    self._changed.wait()
+                new_parts = self.parts[position:]
+                done = self.future.done()
+            position += len(new_parts)
+            yield from new_parts
+            if done:
+                break
+
+        error = self.future.exception()
+        if error is not None:
+            raise error
+        if position == 0 and self.future.result() is not None:
+            yield self.future.result()
+
+# Process-wide request coalescing: the first caller for a key runs the work and
+# every caller that arrives while it is in flight waits for the same result or
+# exception instead of repeating it. Sync, async and streaming callers can share
+# one flight; streamed parts are replayed to late joiners. Streams too large to
+# keep can turn replay off: the leader then streams on its own thread and
+# followers only wait for the flight to land, reading the result from wherever
+# the leader stored it. If the leader is cancelled rather than failing, waiters
+# start a new flight, except no-replay followers that gave up their own input
+# in on_follow: they get FlightAbandoned.
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: str):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = Flight()
+                leader = True
+            else:
+                flight.followers += 1
+                leader = False
+        metrics.inc("cantell_singleflight_total", group=self.name, role="leader" if leader else "follower")
+        return flight, leader
+
+    def _land(self, key: str, flight: Flight, result: Any = None, error: BaseException = None):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        if error is not None and not isinstance(error, Exception):
+            error = FlightAbandoned(f"{self.name} flight was abandoned by its leader")
+        flight.finish(result, error)
+        if flight.followers:
+            logger.info(f"Coalesced {flight.followers} duplicate {self.name} request(s) into one")
+
+    def do(self, key: str, fn: Callable, *args):
+        while True:
+            flight, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return flight.future.result()
+            except FlightAbandoned:
+                continue
+
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, result)
+        return result
+
+    async def ado(self, key: str, coro_fn: Callable):
+        while True:
+            flight, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return await asyncio.shield(asyncio.wrap_future(flight.future))
+            except FlightAbandoned:
+                continue
+
+        try:
+            result = await coro_fn()
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, result)
+        return result
+
+    def stream(self, key: str, gen_fn: Callable[[], Iterator], combine: Callable[[list], Any] = "".join,
+               replay: bool = True, on_follow: Callable[[], None] = None) -> Iterator:
+        while True:
+            flight, leader = self._join(key)
+            if not replay:
+                if leader:
+                    yield from self._lead(key, flight, gen_fn)
+                    return
+                if on_follow is not None:
+                    on_follow()
+                try:
+                    flight.future.result()
+                    return
+                except FlightAbandoned:
+                    if on_follow is not None:
+                        raise
+                    continue
+
+            if leader:
+                context = contextvars.copy_context()
+                threading.Thread(
+                    target=context.run, args=(self._produce, key, flight, gen_fn, combine),
+                    name=f"cantell-{self.name}-flight", daemon=True,
+                ).start()
+
+            yielded = False
+            try:
+                for part in flight.follow():
+                    yielded = True
+                    yield part
+                return
+            except FlightAbandoned:
+                if yielded:
+                    raise
+
+    def _lead(self, key: str, flight: Flight, gen_fn: Callable[[], Iterator]) -> Iterator:
+        try:
+            yield from gen_fn()
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight)
+
+    def _produce(self, key: str, flight: Flight, gen_fn: Callable[[], Iterator], combine: Callable[[list], Any]):
+        try:
+            for part in gen_fn():
+                flight.publish(part)
+            result = combine(flight.parts)
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            return
+        self._land(key, flight, result)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
@@ -1,90 +1,632 @@
-import os
-import google.generativeai as genai
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Tuple
 from dotenv import load_dotenv
 from src.logger import logger
-from src.personality import get_personality_prompt
+from src.personality import PERSONALITY
+from src import prompts
+from src.chunker import CHARS_PER_TOKEN, estimate_tokens, split_into_chunks
+from src.cache import SummaryCache, make_key, normalize_text
+from src.retrieval import ChunkIndex
+from src.rate_limiter import ModelRateLimiter, get_model_limiter
+from src.async_runtime import get_runtime
+from src.metrics import metrics
+from src.backends import GEMINI_MODEL, BackendRouter, create_backend
+from src.context_cache import CachedContext, ContextCache
+from src.singleflight import SingleFlight
 
 load_dotenv()
 
+MODEL_NAME = GEMINI_MODEL
+MAX_CHUNK_TOKENS = 8000
+MAX_WORKERS = 4
+MAX_REDUCE_DEPTH = 5
+EXTRACTIVE_NOTE = "*Quick extractive summary: the key sentences, taken word for word from the text.*"
+STALE_CONTEXT_CODES = (403, 404)
+FIRST_WINDOW_TOKENS = 1000
+WINDOW_TOKENS = 2000
+
 class SummarizerError(Exception):
     pass
 
+class SummaryProgress:
+    def __init__(self, pages_read: int, total_pages: int, summarized_through: int, summary: str,
+                 done: bool = False):
+        self.pages_read = pages_read
+        self.total_pages = total_pages
+        self.summarized_through = summarized_through
+        self.summary = summary
+        self.done = done
+
 class ArticleSummarizer:
-    def __init__(self):
-        self.model = None
-        self._initialize_model()
+    def __init__(self, model=None, max_chunk_tokens: int = MAX_CHUNK_TOKENS, max_workers: int = MAX_WORKERS,
+                 cache: SummaryCache = None, limiter: ModelRateLimiter = None, router: BackendRouter = None,
+                 context_cache: ContextCache = None):
+        self.model = model
+        self.model_error = None
+        self.cache = cache
+        self.limiter = limiter
+        self.router = router or BackendRouter()
+        self.context_cache = context_cache
+        self.flights = SingleFlight("summary")
+        self.max_chunk_tokens = max_chunk_tokens
+        self.max_workers = max_workers
+        if self.model is None:
+            self._initialize_model()
     
     def _initialize_model(self):
         try:
-            api_key = os.getenv("GEMINI_API_KEY")
-            if not api_key:
-                logger.warning("GEMINI_API_KEY not found in environment variables")
-                raise SummarizerError("GEMINI_API_KEY not found. Please set it in .env file.")
-            
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-3-flash-preview')
-            logger.info("Gemini model initialized successfully")
+            self.model = create_backend()
         except Exception as e:
-            logger.error(f"Failed to initialize Gemini model: {str(e)}")
-            raise
+            self.model_error = str(e)
+            logger.error(f"Failed to initialize model backend: {str(e)}. Summaries will be extractive only.")
+            return
+        
+        if self.model is None:
+            logger.info("Extractive backend selected, no generative model loaded")
+        else:
+            logger.info(f"Model backend '{self.model.name}' initialized with {self.model_name}")
     
-    def summarize_text(self, text: str, max_length: int = 500) -> str:
-        logger.info(f"Summarizing text of length {len(text)} characters")
+    def _require_model(self):
+        if self.model is None:
+            raise SummarizerError(
+                f"The AI model is unavailable: {self.model_error or 'no generative backend is configured.'}"
+            )
+    
+    @property
+    def model_name(self) -> str:
+        return getattr(self.model, "model_name", MODEL_NAME)
+    
+    def _cache_key(self, kind: str, *parts) -> str:
+        return make_key(kind, self.model_name, PERSONALITY, *parts)
+    
+    def _cache_get(self, key: str):
+        if self.cache is None:
+            return None
+        try:
+            value = self.cache.get(key)
+            metrics.inc("cantell_cache_requests_total", cache="summary", result="miss" if value is None else "hit")
+            return value
+        except Exception as e:
+            logger.warning(f"Summary cache lookup failed: {str(e)}")
+            return None
+    
+    def _cache_set(self, key: str, value: str):
+        if self.cache is None:
+            return
+        try:
+            self.cache.set(key, value)
+        except Exception as e:
+            logger.warning(f"Summary cache write failed: {str(e)}")
+    
+    @staticmethod
+    def _count_output(response):
+        try:
+            text = response.text
+        except ValueError:
+            return
+        metrics.inc("cantell_tokens_total", estimate_tokens(text or ""), direction="output")
+    
+    @staticmethod
+    def _count_input(prompt: str, context: CachedContext) -> int:
+        tokens = estimate_tokens(prompt)
+        metrics.inc("cantell_tokens_total", tokens, direction="input")
+        if context is not None:
+            metrics.inc("cantell_tokens_total", context.tokens, direction="cached")
+        return tokens
+    
+    @staticmethod
+    def _context_kwargs(context: CachedContext) -> dict:
+        return {} if context is None else {"context": context.name}
+    
+    def _call_model(self, prompt: str, context: CachedContext = None):
+        self._require_model()
+        tokens = self._count_input(prompt, context)
+        kwargs = self._context_kwargs(context)
+        started = time.perf_counter()
+        with metrics.span("model_call"):
+            if self.limiter is None:
+                response = self.model.generate_content(prompt, **kwargs)
+            else:
+                response = self.limiter.call(lambda: self.model.generate_content(prompt, **kwargs), tokens=tokens)
+        self.router.observe(time.perf_counter() - started)
+        self._count_output(response)
+        return response
+    
+    def _stream_model(self, prompt: str, context: CachedContext = None):
+        self._require_model()
+        tokens = self._count_input(prompt, context)
+        kwargs = self._context_kwargs(context)
+        if self.limiter is None:
+            return self.model.generate_content(prompt, stream=True, **kwargs)
+        return self.limiter.stream(lambda: self.model.generate_content(prompt, stream=True, **kwargs), tokens=tokens)
+    
+    async def _acall_model(self, prompt: str, context: CachedContext = None):
+        if not hasattr(self.model, "generate_content_async"):
+            return await get_runtime().run_blocking(self._call_model, prompt, context)
+        tokens = self._count_input(prompt, context)
+        kwargs = self._context_kwargs(context)
+        started = time.perf_counter()
+        with metrics.span("model_call"):
+            if self.limiter is None:
+                response = await self.model.generate_content_async(prompt, **kwargs)
+            else:
+                response = await self.limiter.acall(
+                    lambda: self.model.generate_content_async(prompt, **kwargs), tokens=tokens
+                )
+        self.router.observe(time.perf_counter() - started)
+        self._count_output(response)
+        return response
+    
+    def _cached_context(self, key: str, system: str, content=None) -> CachedContext:
+        if self.context_cache is None:
+            return None
+        return self.context_cache.get(self.model, key, system, content)
+    
+    def _stale_context(self, error: Exception, context: CachedContext) -> bool:
+        if context is None or getattr(error, "code", None) not in STALE_CONTEXT_CODES:
+            return False
+        logger.warning(f"Cached context '{context.key}' is no longer available, resending the full prompt")
+        self.context_cache.invalidate(self.model, context.key)
+        return True
+    
+    def _call_request(self, request: tuple):
+        prompt, context, inline = request
+        try:
+            return self._call_model(prompt, context)
+        except Exception as e:
+            if not self._stale_context(e, context):
+                raise
+            return self._call_model(inline())
+    
+    async def _acall_request(self, request: tuple):
+        prompt, context, inline = request
+        try:
+            return await self._acall_model(prompt, context)
+        except Exception as e:
+            if not self._stale_context(e, context):
+                raise
+            return await self._acall_model(await get_runtime().run_blocking(inline))
+    
+    def _generate(self, prompt: str, empty_message: str) -> str:
+        response = self._call_model(prompt)
+        
+        if not response.text:
+            logger.warning("Empty response from the model")
+            raise SummarizerError(empty_message)
+        
+        return response.text
+    
+    async def _agenerate(self, prompt: str, empty_message: str) -> str:
+        response = await self._acall_model(prompt)
+        
+        if not response.text:
+            logger.warning("Empty response from the model")
+            raise SummarizerError(empty_message)
+        
+        return response.text
+    
+    def _generate_stream(self, prompt: str, empty_message: str, context: CachedContext = None) -> Iterator[str]:
+        received = False
+        output_chars = 0
+        started = time.perf_counter()
+        with metrics.span("model_stream"):
+            for chunk in self._stream_model(prompt, context):
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue
+                if text:
+                    if not received:
+                        metrics.observe("cantell_stage_seconds", time.perf_counter() - started, stage="model_first_token")
+                    received = True
+                    output_chars += len(text)
+                    yield text
+        metrics.inc("cantell_tokens_total", output_chars // CHARS_PER_TOKEN, direction="output")
+        
+        if not received:
+            logger.warning("Empty response from the model")
+            raise SummarizerError(empty_message)
+    
+    def _stream_and_cache(self, request: tuple, cache_key: str, empty_message: str,
+                          error_label: str) -> Iterator[str]:
+        prompt, context, inline = request
+        parts = []
+        try:
+            try:
+                for text in self._generate_stream(prompt, empty_message, context):
+                    parts.append(text)
+                    yield text
+            except Exception as e:
+                if parts or not self._stale_context(e, context):
+                    raise
+                for text in self._generate_stream(inline(), empty_message):
+                    parts.append(text)
+                    yield text
+        except SummarizerError:
+            raise
+        except Exception as e:
+            logger.error(f"Error during {error_label.lower()}: {str(e)}")
+            raise SummarizerError(f"{error_label} failed: {str(e)}")
         
+        response = "".join(parts)
+        self._cache_set(cache_key, response)
+        logger.info(f"Successfully streamed {error_label.lower()} response of {len(response)} characters")
+    
+    def _validate_text(self, text: str):
         if not text or not text.strip():
             logger.error("Empty text provided for summarization")
             raise SummarizerError("No text provided for summarization.")
+    
+    def _extractive_reason(self, text: str, latency_budget: float) -> str:
+        return self.router.extractive_reason(
+            text, self.model is not None, self.max_chunk_tokens, self.max_workers, latency_budget
+        )
+    
+    def _extractive_summary(self, text: str, max_length: int, reason: str) -> str:
+        logger.info(f"Using extractive summary: {reason}")
+        metrics.inc("cantell_extractive_summaries_total")
+        with metrics.span("extractive"):
+            summary = self.router.extractive.summarize(text, max_length)
+        return f"{EXTRACTIVE_NOTE}\n\n{summary}"
+    
+    def _summary_failed(self, text: str, max_length: int, error: Exception) -> str:
+        logger.error(f"Error during summarization: {str(error)}")
+        if not self.router.fallback:
+            if isinstance(error, SummarizerError):
+                raise error
+            raise SummarizerError(f"Summarization failed: {str(error)}")
+        return self._extractive_summary(text, max_length, "model call failed")
+    
+    def summarize_text(self, text: str, max_length: int = 500, latency_budget: float = None) -> str:
+        logger.info(f"Summarizing text of length {len(text)} characters")
+        self._validate_text(text)
+        
+        cache_key = self._cache_key("summary", normalize_text(text), max_length)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            logger.info("Returning cached summary")
+            return cached
+        
+        return self.flights.do(cache_key, self._summarize_uncached, text, max_length, latency_budget, cache_key)
+    
+    def _summarize_uncached(self, text: str, max_length: int, latency_budget: float, cache_key: str) -> str:
+        reason = self._extractive_reason(text, latency_budget)
+        if reason:
+            return self._extractive_summary(text, max_length, reason)
         
         try:
-            prompt = f"""{get_personality_prompt()}
-
-Please summarize the following article concisely. 
-Provide a clear summary that captures the main points, key findings, and important details.
-Keep the summary around {max_length} words or less, but make sure it's comprehensive.
-
-Article to summarize:
----
-{text}
----
-
-Summary:"""
+            with metrics.span("prompt"):
+                prompt = self._final_summary_prompt(text, max_length)
+            summary = self._generate(prompt, "Failed to generate summary. Please try again.")
             
-            response = self.model.generate_content(prompt)
+            self._cache_set(cache_key, summary)
+            logger.info(f"Successfully generated summary of {len(summary)} characters")
+            return summary
             
-            if not response.text:
-                logger.warning("Empty response from Gemini model")
-                raise SummarizerError("Failed to generate summary. Please try again.")
+        except Exception as e:
+            return self._summary_failed(text, max_length, e)
+    
+    async def asummarize_text(self, text: str, max_length: int = 500, latency_budget: float = None) -> str:
+        logger.info(f"Summarizing text of length {len(text)} characters")
+        self._validate_text(text)
+        
+        runtime = get_runtime()
+        cache_key = self._cache_key("summary", normalize_text(text), max_length)
+        cached = await runtime.run_blocking(self._cache_get, cache_key)
+        if cached is not None:
+            logger.info("Returning cached summary")
+            return cached
+        
+        return await self.flights.ado(
+            cache_key, lambda: self._asummarize_uncached(text, max_length, latency_budget, cache_key)
+        )
+    
+    async def _asummarize_uncached(self, text: str, max_length: int, latency_budget: float, cache_key: str) -> str:
+        runtime = get_runtime()
+        reason = self._extractive_reason(text, latency_budget)
+        if reason:
+            return await runtime.run_blocking(self._extractive_summary, text, max_length, reason)
+        
+        try:
+            with metrics.span("prompt"):
+                prompt = await self._afinal_summary_prompt(text, max_length)
+            summary = await self._agenerate(prompt, "Failed to generate summary. Please try again.")
             
-            logger.info(f"Successfully generated summary of {len(response.text)} characters")
-            return response.text
+            await runtime.run_blocking(self._cache_set, cache_key, summary)
+            logger.info(f"Successfully generated summary of {len(summary)} characters")
+            return summary
+            
+        except Exception as e:
+            return await runtime.run_blocking(self._summary_failed, text, max_length, e)
+    
+    def summarize_text_stream(self, text: str, max_length: int = 500,
+                              latency_budget: float = None) -> Iterator[str]:
+        logger.info(f"Streaming summary of text of length {len(text)} characters")
+        self._validate_text(text)
+        
+        cache_key = self._cache_key("summary", normalize_text(text), max_length)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            logger.info("Returning cached summary")
+            yield cached
+            return
+        
+        yield from self.flights.stream(
+            cache_key, lambda: self._summarize_stream_uncached(text, max_length, latency_budget, cache_key)
+        )
+    
+    def _summarize_stream_uncached(self, text: str, max_length: int, latency_budget: float,
+                                   cache_key: str) -> Iterator[str]:
+        reason = self._extractive_reason(text, latency_budget)
+        if reason:
+            yield self._extractive_summary(text, max_length, reason)
+            return
+        
+        streamed = False
+        try:
+            with metrics.span("prompt"):
+                prompt = self._final_summary_prompt(text, max_length)
+            for part in self._stream_and_cache(
+                (prompt, None, None), cache_key, "Failed to generate summary. Please try again.", "Summarization"
+            ):
+                streamed = True
+                yield part
+        except Exception as e:
+            if streamed:
+                raise
+            yield self._summary_failed(text, max_length, e)
+    
+    def summarize_pages(self, pages: Iterable[Tuple[int, str, int]], doc_id: str,
+                        max_length: int = 500) -> Iterator[SummaryProgress]:
+        cache_key = self._cache_key("pdf_progressive", doc_id, max_length)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            logger.info("Returning cached progressive summary")
+            pages_read = total = 0
+            for pages_read, _, total in pages:
+                yield SummaryProgress(pages_read, total, total, cached)
+            yield SummaryProgress(pages_read, total, total, cached, done=True)
+            return
+        
+        yield from self.flights.stream(
+            cache_key, lambda: self._summarize_pages(pages, max_length, cache_key),
+            combine=lambda updates: updates[-1].summary if updates else None,
+        )
+    
+    # Refine-style summary of a document whose pages are still arriving: pages are
+    # collected into windows and each window updates the running summary on a
+    # worker thread, so page progress keeps flowing while the model is busy. The
+    # first window is small to get a summary on screen quickly; later windows are
+    # whatever arrived while the previous update ran, within the chunk budget.
+    def _summarize_pages(self, pages: Iterable[Tuple[int, str, int]], max_length: int,
+                         cache_key: str) -> Iterator[SummaryProgress]:
+        summary = ""
+        summarized_through = 0
+        fell_back = False
+        pages_read = total = 0
+        window: List[Tuple[int, str]] = []
+        pending = None
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cantell-refine")
+        
+        def finish_update():
+            nonlocal summary, summarized_through, pending, fell_back
+            summary, summarized_through, window_fell_back = pending.result()
+            fell_back = fell_back or window_fell_back
+            pending = None
+        
+        def start_update():
+            taken, used = [], 0
+            while window and (not taken or used + estimate_tokens(window[0][1]) <= self.max_chunk_tokens):
+                used += estimate_tokens(window[0][1])
+                taken.append(window.pop(0))
+            context = contextvars.copy_context()
+            return executor.submit(context.run, self._refine_summary, summary, summarized_through, taken, max_length)
+        
+        try:
+            for pages_read, text, total in pages:
+                if text.strip():
+                    window.append((pages_read, text))
+                
+                if pending is not None and pending.done():
+                    finish_update()
+                threshold = WINDOW_TOKENS if summary else FIRST_WINDOW_TOKENS
+                if pending is None and sum(estimate_tokens(t) for _, t in window) >= threshold:
+                    pending = start_update()
+                yield SummaryProgress(pages_read, total, summarized_through, summary)
             
+            while pending is not None or window:
+                if pending is None:
+                    pending = start_update()
+                finish_update()
+                yield SummaryProgress(pages_read, total, summarized_through, summary)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        if not summary:
+            raise SummarizerError("No text provided for summarization.")
+        # A summary that fell back to extractive for any window is not cached, so it
+        # is redone once the model is back instead of being served for the cache TTL.
+        if fell_back:
+            logger.info("Not caching a progressive summary that used the extractive fallback")
+        else:
+            self._cache_set(cache_key, summary)
+        logger.info(f"Progressive summary of {pages_read} pages finished with {len(summary)} characters")
+        yield SummaryProgress(pages_read, total, summarized_through, summary, done=True)
+    
+    def _refine_summary(self, summary: str, summarized_through: int, window: List[Tuple[int, str]],
+                        max_length: int) -> Tuple[str, int, bool]:
+        first_page, last_page = window[0][0], window[-1][0]
+        text = "\n\n".join(t for _, t in window)
+        if summary:
+            prompt = prompts.REFINE_SUMMARY.render(
+                summary=summary, summarized_through=summarized_through, first_page=first_page,
+                last_page=last_page, text=text, max_length=max_length,
+            )
+        else:
+            prompt = prompts.PAGES_SUMMARY.render(
+                first_page=first_page, last_page=last_page, text=text, max_length=max_length
+            )
+        
+        previous = summary[len(EXTRACTIVE_NOTE):].strip() if summary.startswith(EXTRACTIVE_NOTE) else summary
+        if self.model is None:
+            return self._extractive_summary(f"{previous}\n\n{text}", max_length, "model unavailable"), last_page, True
+        
+        try:
+            with metrics.span("refine"):
+                updated = self._generate(prompt, f"Failed to summarize pages {first_page} to {last_page}.")
         except Exception as e:
-            logger.error(f"Error during summarization: {str(e)}")
-            raise SummarizerError(f"Summarization failed: {str(e)}")
+            return self._summary_failed(f"{previous}\n\n{text}", max_length, e), last_page, True
+        
+        logger.info(f"Running summary now covers pages 1 to {last_page}")
+        return updated, last_page, False
+    
+    def _summary_prompt(self, text: str, max_length: int) -> str:
+        return prompts.SUMMARY.render(text=text, max_length=max_length)
+    
+    def _chunk_prompt(self, chunk: str, index: int, total: int, max_length: int) -> str:
+        return prompts.CHUNK_SUMMARY.render(chunk=chunk, index=index, total=total, max_length=max_length)
     
-    def chat(self, message: str, history: list = None) -> str:
+    def _summarize_chunk(self, chunk: str, index: int, total: int, max_length: int) -> str:
+        return self._generate(self._chunk_prompt(chunk, index, total, max_length),
+                              f"Failed to summarize part {index} of {total}. Please try again.")
+    
+    def _combine_prompt(self, partials: list, max_length: int) -> str:
+        sections = "\n\n".join(
+            f"Section {i} summary:\n{partial}" for i, partial in enumerate(partials, start=1)
+        )
+        return prompts.COMBINE_SUMMARIES.render(sections=sections, max_length=max_length)
+    
+    def _map_summaries(self, chunks: list, max_length: int) -> list:
+        total = len(chunks)
+        workers = max(1, min(self.max_workers, total))
+        contexts = [contextvars.copy_context() for _ in chunks]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(
+                lambda item: contexts[item[0] - 1].run(self._summarize_chunk, item[1], item[0], total, max_length),
+                enumerate(chunks, start=1)
+            ))
+    
+    async def _amap_summaries(self, chunks: list, max_length: int) -> list:
+        total = len(chunks)
+        slots = asyncio.Semaphore(max(1, min(self.max_workers, total)))
+        
+        async def summarize(index: int, chunk: str) -> str:
+            async with slots:
+                return await self._agenerate(self._chunk_prompt(chunk, index, total, max_length),
+                                             f"Failed to summarize part {index} of {total}. Please try again.")
+        
+        return await asyncio.gather(*(summarize(i, chunk) for i, chunk in enumerate(chunks, start=1)))
+    
+    def _final_summary_prompt(self, text: str, max_length: int, depth: int = 0) -> str:
+        if estimate_tokens(text) <= self.max_chunk_tokens:
+            return self._summary_prompt(text, max_length)
+        
+        chunks = split_into_chunks(text, self.max_chunk_tokens)
+        logger.info(f"Map-reduce summarization: {len(chunks)} chunks at depth {depth}")
+        
+        if len(chunks) == 1:
+            return self._summary_prompt(chunks[0], max_length)
+        
+        partials = self._map_summaries(chunks, max_length)
+        combined = "\n\n".join(partials)
+        
+        if estimate_tokens(combined) > self.max_chunk_tokens:
+            if depth + 1 >= MAX_REDUCE_DEPTH:
+                raise SummarizerError("Document is too long to summarize. Please try a shorter document.")
+            return self._final_summary_prompt(combined, max_length, depth + 1)
+        
+        return self._combine_prompt(partials, max_length)
+    
+    async def _afinal_summary_prompt(self, text: str, max_length: int, depth: int = 0) -> str:
+        if estimate_tokens(text) <= self.max_chunk_tokens:
+            return self._summary_prompt(text, max_length)
+        
+        chunks = split_into_chunks(text, self.max_chunk_tokens)
+        logger.info(f"Map-reduce summarization: {len(chunks)} chunks at depth {depth}")
+        
+        if len(chunks) == 1:
+            return self._summary_prompt(chunks[0], max_length)
+        
+        partials = await self._amap_summaries(chunks, max_length)
+        combined = "\n\n".join(partials)
+        
+        if estimate_tokens(combined) > self.max_chunk_tokens:
+            if depth + 1 >= MAX_REDUCE_DEPTH:
+                raise SummarizerError("Document is too long to summarize. Please try a shorter document.")
+            return await self._afinal_summary_prompt(combined, max_length, depth + 1)
+        
+        return self._combine_prompt(partials, max_length)
+    
+    def _chat_prompt(self, message: str, history_text: str, summary: str = "") -> str:
+        summary_section = f"Summary of the earlier conversation:\n{summary}\n\n" if summary else ""
+        return prompts.CHAT.render(summary_section=summary_section, history=history_text, message=message)
+    
+    def _chat_request(self, message: str, history_text: str, summary: str) -> tuple:
+        context = self._cached_context("persona", PERSONALITY)
+        inline = lambda: self._chat_prompt(message, history_text, summary)
+        if context is None:
+            return inline(), None, None
+        summary_section = f"Summary of the earlier conversation:\n{summary}\n\n" if summary else ""
+        prompt = prompts.CHAT_TURN.render(summary_section=summary_section, history=history_text, message=message)
+        return prompt, context, inline
+    
+    def _prepare_chat(self, message: str, history: list, summary: str):
         logger.info(f"Chat message received: {message[:50]}...")
         
         if not message or not message.strip():
             raise SummarizerError("Please provide a message.")
         
-        try:
+        with metrics.span("prompt"):
             history = history or []
+            history_text = "\n".join([f"User: {h['user']}\nEIT: {h['assistant']}" for h in history])
             
-            prompt = f"""{get_personality_prompt()}
-
-Conversation history:
-{chr(10).join([f"User: {h['user']}\nEIT: {h['assistant']}" for h in history])}
-
-User: {message}
-
-EIT:"""
+            cache_key = self._cache_key(
+                "chat", normalize_text(summary or ""), normalize_text(history_text), normalize_text(message)
+            )
+            return self._chat_request(message, history_text, summary), cache_key
+    
+    def chat(self, message: str, history: list = None, summary: str = "") -> str:
+        request, cache_key = self._prepare_chat(message, history, summary)
+        
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            logger.info("Returning cached chat response")
+            return cached
+        
+        try:
+            response = self._call_request(request)
+            
+            if not response.text:
+                raise SummarizerError("Failed to generate response. Please try again.")
             
-            response = self.model.generate_content(prompt)
+            self._cache_set(cache_key, response.text)
+            logger.info("Successfully generated chat response")
+            return response.text
+            
+        except Exception as e:
+            logger.error(f"Error during chat: {str(e)}")
+            raise SummarizerError(f"Chat failed: {str(e)}")
+    
+    async def achat(self, message: str, history: list = None, summary: str = "") -> str:
+        runtime = get_runtime()
+        request, cache_key = await runtime.run_blocking(self._prepare_chat, message, history, summary)
+        
+        cached = await runtime.run_blocking(self._cache_get, cache_key)
+        if cached is not None:
+            logger.info("Returning cached chat response")
+            return cached
+        
+        try:
+            response = await self._acall_request(request)
             
             if not response.text:
                 raise SummarizerError("Failed to generate response. Please try again.")
             
+            await runtime.run_blocking(self._cache_set, cache_key, response.text)
             logger.info("Successfully generated chat response")
             return response.text
             
@@ -92,50 +634,137 @@ EIT:"""
             logger.error(f"Error during chat: {str(e)}")
             raise SummarizerError(f"Chat failed: {str(e)}")
     
-    def chat_about_pdf(self, question: str, pdf_text: str) -> str:
+    def chat_stream(self, message: str, history: list = None, summary: str = "") -> Iterator[str]:
+        request, cache_key = self._prepare_chat(message, history, summary)
+        
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            logger.info("Returning cached chat response")
+            yield cached
+            return
+        
+        yield from self._stream_and_cache(
+            request, cache_key, "Failed to generate response. Please try again.", "Chat"
+        )
+    
+    def summarize_conversation(self, previous_summary: str, turns: list, max_tokens: int = 500) -> str:
+        logger.info(f"Updating conversation summary with {len(turns)} turns")
+        
+        turns_text = "\n".join(f"User: {t['user']}\nEIT: {t['assistant']}" for t in turns)
+        prompt = prompts.CONVERSATION_SUMMARY.render(
+            max_words=int(max_tokens * 0.75), summary=previous_summary or "(empty)", turns=turns_text
+        )
+        
+        try:
+            return self._generate(prompt, "Failed to update conversation summary.")
+        except SummarizerError:
+            raise
+        except Exception as e:
+            logger.error(f"Error updating conversation summary: {str(e)}")
+            raise SummarizerError(f"Conversation summary failed: {str(e)}")
+    
+    def _pdf_chat_prompt(self, question: str, pdf_context: str) -> str:
+        return prompts.PDF_CHAT.render(context=pdf_context, question=question)
+    
+    def _document_context(self, pdf_index: ChunkIndex) -> CachedContext:
+        return self._cached_context(
+            f"pdf:{pdf_index.doc_id}", prompts.PDF_SYSTEM,
+            lambda: prompts.PDF_DOCUMENT.render(text="\n\n".join(pdf_index.chunks)),
+        )
+    
+    def _pdf_chat_request(self, question: str, pdf_index: ChunkIndex) -> tuple:
+        context = self._document_context(pdf_index)
+        inline = lambda: self._pdf_chat_prompt(question, pdf_index.context_for(question))
+        if context is None:
+            return inline(), None, None
+        return prompts.PDF_QUESTION.render(question=question), context, inline
+    
+    def release_document(self, doc_id: str):
+        if self.context_cache is not None:
+            self.context_cache.invalidate(self.model, f"pdf:{doc_id}")
+    
+    def _prepare_pdf_chat(self, question: str, pdf_text: str, pdf_index: ChunkIndex):
         logger.info(f"PDF chat question: {question[:50]}...")
         
         if not question or not question.strip():
             raise SummarizerError("Please provide a question.")
         
-        if not pdf_text or not pdf_text.strip():
-            raise SummarizerError("No PDF content available. Please upload a PDF first.")
+        if pdf_index is None:
+            if not pdf_text or not pdf_text.strip():
+                raise SummarizerError("No PDF content available. Please upload a PDF first.")
+            pdf_index = ChunkIndex(pdf_text)
+        
+        cache_key = self._cache_key("pdf_chat", pdf_index.doc_id, normalize_text(question))
+        return pdf_index, cache_key
+    
+    def chat_about_pdf(self, question: str, pdf_text: str = None, pdf_index: ChunkIndex = None) -> str:
+        pdf_index, cache_key = self._prepare_pdf_chat(question, pdf_text, pdf_index)
+        
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            logger.info("Returning cached PDF chat response")
+            return cached
         
         try:
-            truncated_text = pdf_text[:15000]
+            response = self._call_request(self._pdf_chat_request(question, pdf_index))
             
-            prompt = f"""{get_personality_prompt()}
-
-You are helping the user understand a PDF document. 
-Use ONLY the content from the PDF below to answer the user's question.
-If the answer is not in the PDF, say so clearly.
-Be helpful, clear, and concise in your response.
-
-PDF Content:
----
-{truncated_text}
----
-
-User's Question: {question}
-
-Your Answer:"""
+            if not response.text:
+                raise SummarizerError("Failed to generate response. Please try again.")
+            
+            self._cache_set(cache_key, response.text)
+            logger.info("Successfully generated PDF chat response")
+            return response.text
             
-            response = self.model.generate_content(prompt)
+        except Exception as e:
+            logger.error(f"Error during PDF chat: {str(e)}")
+            raise SummarizerError(f"PDF chat failed: {str(e)}")
+    
+    async def achat_about_pdf(self, question: str, pdf_text: str = None, pdf_index: ChunkIndex = None) -> str:
+        runtime = get_runtime()
+        pdf_index, cache_key = await runtime.run_blocking(self._prepare_pdf_chat, question, pdf_text, pdf_index)
+        
+        cached = await runtime.run_blocking(self._cache_get, cache_key)
+        if cached is not None:
+            logger.info("Returning cached PDF chat response")
+            return cached
+        
+        try:
+            request = await runtime.run_blocking(self._pdf_chat_request, question, pdf_index)
+            response = await self._acall_request(request)
             
             if not response.text:
                 raise SummarizerError("Failed to generate response. Please try again.")
             
+            await runtime.run_blocking(self._cache_set, cache_key, response.text)
             logger.info("Successfully generated PDF chat response")
             return response.text
             
         except Exception as e:
             logger.error(f"Error during PDF chat: {str(e)}")
             raise SummarizerError(f"PDF chat failed: {str(e)}")
+    
+    def chat_about_pdf_stream(self, question: str, pdf_text: str = None,
+                              pdf_index: ChunkIndex = None) -> Iterator[str]:
+        pdf_index, cache_key = self._prepare_pdf_chat(question, pdf_text, pdf_index)
+        
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            logger.info("Returning cached PDF chat response")
+            yield cached
+            return
+        
+        yield from self._stream_and_cache(
+            self._pdf_chat_request(question, pdf_index), cache_key, "Failed to generate response. Please try again.", "PDF chat"
+        )
 
 summarizer = None
+_summarizer_lock = threading.Lock()
 
 def get_summarizer() -> ArticleSummarizer:
     global summarizer
-    if summarizer is None:
-        summarizer = ArticleSummarizer()
-    return summarizer
+    with _summarizer_lock:
+        if summarizer is None:
+            summarizer = ArticleSummarizer(
+                cache=SummaryCache(), limiter=get_model_limiter(), context_cache=ContextCache()
+            )
+        return summarizer
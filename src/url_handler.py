@@ -1,104 +1,190 @@
+import json
+import os
+import re
+import threading
+import time
 import warnings
+from urllib.parse import urlsplit, urlunsplit
 warnings.filterwarnings('ignore', message='Unverified HTTPS request')
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from src.logger import logger
+from src.extraction import get_extractor
+from src.cache import CACHE_DIR, SummaryCache, make_key
+from src.async_runtime import get_runtime
+from src.metrics import metrics
+from src.singleflight import SingleFlight
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Connection": "keep-alive",
+}
+REQUEST_TIMEOUT = 30
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 32
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5
+HTTP_CACHE_FILE = os.path.join(CACHE_DIR, "http.sqlite3")
+HTTP_CACHE_TTL = 24 * 60 * 60
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+_DEFAULT_PORTS = {"http": 80, "https": 443}
 
 class URLHandlerError(Exception):
     pass
 
+_session = None
+_http_cache = None
+_lock = threading.Lock()
+_fetch_flights = SingleFlight("fetch")
+
+def get_http_session() -> requests.Session:
+    global _session
+    with _lock:
+        if _session is None:
+            retry = Retry(
+                total=RETRY_TOTAL,
+                read=1,
+                backoff_factor=RETRY_BACKOFF,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET", "HEAD"],
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+            logger.info("HTTP session pool initialized")
+        return _session
+
+def get_http_cache() -> SummaryCache:
+    global _http_cache
+    with _lock:
+        if _http_cache is None:
+            _http_cache = SummaryCache(path=HTTP_CACHE_FILE, default_ttl=HTTP_CACHE_TTL)
+        return _http_cache
+
+def _cache_lookup(key: str):
+    try:
+        cached = get_http_cache().get(key)
+        return json.loads(cached) if cached else None
+    except Exception as e:
+        logger.warning(f"HTTP cache lookup failed: {str(e)}")
+        return None
+
+def _cache_store(key: str, response: requests.Response, article: str):
+    cache_control = response.headers.get("Cache-Control", "").lower()
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    max_age = _MAX_AGE.search(cache_control)
+    fresh_for = int(max_age.group(1)) if max_age and "no-cache" not in cache_control else 0
+    
+    if "no-store" in cache_control or not (etag or last_modified or fresh_for):
+        return
+    
+    entry = {
+        "etag": etag,
+        "last_modified": last_modified,
+        "fresh_until": time.time() + fresh_for,
+        "article": article,
+    }
+    try:
+        get_http_cache().set(key, json.dumps(entry))
+    except Exception as e:
+        logger.warning(f"HTTP cache write failed: {str(e)}")
+
+def _refresh_cache_entry(key: str, entry: dict, response: requests.Response):
+    max_age = _MAX_AGE.search(response.headers.get("Cache-Control", "").lower())
+    if max_age:
+        entry["fresh_until"] = time.time() + int(max_age.group(1))
+    entry["etag"] = response.headers.get("ETag", entry.get("etag"))
+    entry["last_modified"] = response.headers.get("Last-Modified", entry.get("last_modified"))
+    try:
+        get_http_cache().set(key, json.dumps(entry))
+    except Exception as e:
+        logger.warning(f"HTTP cache write failed: {str(e)}")
+
+def _get(url: str, headers: dict) -> requests.Response:
+    session = get_http_session()
+    try:
+        return session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    except requests.exceptions.SSLError:
+        logger.warning(f"SSL verification failed, retrying without verification for: {url}")
+        return session.get(url, headers=headers, timeout=REQUEST_TIMEOUT, verify=False)
+
+def normalize_url(url: str) -> str:
+    url = url.strip()
+    if not url.lower().startswith(("http://", "https://")):
+        url = "https://" + url
+        logger.info(f"Added https:// prefix: {url}")
+    
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc
+    if "@" not in netloc and parts.hostname:
+        host = f"[{parts.hostname}]" if ":" in parts.hostname else parts.hostname
+        try:
+            port = parts.port
+            netloc = host if port in (None, _DEFAULT_PORTS.get(scheme)) else f"{host}:{port}"
+        except ValueError:
+            pass
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
 def fetch_article_from_url(url: str) -> str:
     logger.info(f"Fetching article from URL: {url}")
     
-    if not url:
+    if not url or not url.strip():
         logger.error("Empty URL provided")
         raise URLHandlerError("Please provide a valid URL")
     
-    if not url.startswith(("http://", "https://")):
-        url = "https://" + url
-        logger.info(f"Added https:// prefix: {url}")
+    url = normalize_url(url)
+    return _fetch_flights.do(url, _fetch_article, url)
+
+def _fetch_article(url: str) -> str:
+    cache_key = make_key("http", url)
+    entry = _cache_lookup(cache_key)
+    
+    if entry and entry["fresh_until"] > time.time():
+        logger.info(f"Serving fresh cached article for URL: {url}")
+        metrics.inc("cantell_cache_requests_total", cache="http", result="hit")
+        return entry["article"]
     
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Connection": "keep-alive",
-        }
-        
-        try:
-            response = requests.get(url, headers=headers, timeout=30)
-        except requests.exceptions.SSLError:
-            logger.warning(f"SSL verification failed, retrying without verification for: {url}")
-            response = requests.get(url, headers=headers, timeout=30, verify=False)
-        
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        
+        with metrics.span("fetch_network"):
+            response = _get(url, headers)
+        
+        if entry and response.status_code == 304:
+            logger.info(f"URL not modified, serving cached article: {url}")
+            metrics.inc("cantell_cache_requests_total", cache="http", result="revalidated")
+            _refresh_cache_entry(cache_key, entry, response)
+            return entry["article"]
+        
+        metrics.inc("cantell_cache_requests_total", cache="http", result="miss")
         response.raise_for_status()
         
         logger.info(f"Successfully fetched URL, status code: {response.status_code}")
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        title = ""
-        title_tag = soup.find('h1')
-        if title_tag:
-            title = title_tag.get_text(strip=True)
-        else:
-            title_tag = soup.find('title')
-            if title_tag:
-                title = title_tag.get_text(strip=True)
-        
-        article_content = ""
-        
-        article_tag = soup.find('article')
-        if article_tag:
-            article_content = article_tag.get_text(separator='\n', strip=True)
-        
-        if not article_content:
-            main_tag = soup.find('main')
-            if main_tag:
-                article_content = main_tag.get_text(separator='\n', strip=True)
-        
-        if not article_content:
-            content_divs = soup.find_all('div', class_=lambda x: x and ('content' in x.lower() or 'article' in x.lower() or 'post' in x.lower() or 'body' in x.lower() or 'text' in x.lower() or 'entry' in x.lower()))
-            for div in content_divs:
-                text = div.get_text(separator='\n', strip=True)
-                if len(text) > len(article_content):
-                    article_content = text
-        
-        if not article_content:
-            section_tags = soup.find_all('section')
-            for section in section_tags:
-                text = section.get_text(separator='\n', strip=True)
-                if len(text) > len(article_content):
-                    article_content = text
-        
-        if not article_content:
-            p_tags = soup.find_all('p')
-            paragraphs = [p.get_text(strip=True) for p in p_tags if p.get_text(strip=True)]
-            if paragraphs:
-                article_content = '\n\n'.join(paragraphs)
-        
-        if not article_content:
-            body = soup.find('body')
-            if body:
-                article_content = body.get_text(separator='\n', strip=True)
-        
-        article_content = '\n'.join([line for line in article_content.split('\n') if line.strip()])
-        
-        if len(article_content) < 50:
-            logger.warning(f"Extracted content seems too short: {len(article_content)} characters")
-            raise URLHandlerError("Could not extract meaningful content from this URL. The page might not contain an article or might require JavaScript rendering.")
-        
-        logger.info(f"Successfully extracted {len(article_content)} characters from URL")
-        
-        result = f"Title: {title}\n\n" if title else ""
-        result += article_content
+        with metrics.span("fetch_parse"):
+            result = _extract_article(response.content)
+        _cache_store(cache_key, response, result)
         
         return result
         
+    except URLHandlerError:
+        raise
     except requests.exceptions.Timeout:
         logger.error(f"Timeout while fetching URL: {url}")
         raise URLHandlerError("The request timed out. Please try a different URL or check your connection.")
@@ -111,3 +197,22 @@ def fetch_article_from_url(url: str) -> str:
     except Exception as e:
         logger.error(f"Error fetching URL {url}: {str(e)}")
         raise URLHandlerError(f"Error fetching article: {str(e)}")
+
+async def afetch_article(url: str) -> str:
+    return await get_runtime().run_blocking(fetch_article_from_url, url)
+
+def _extract_article(content: bytes) -> str:
+    title, article_content = get_extractor().extract(content)
+    
+    article_content = '\n'.join([line for line in article_content.split('\n') if line.strip()])
+    
+    if len(article_content) < 50:
+        logger.warning(f"Extracted content seems too short: {len(article_content)} characters")
+        raise URLHandlerError("Could not extract meaningful content from this URL. The page might not contain an article or might require JavaScript rendering.")
+    
+    logger.info(f"Successfully extracted {len(article_content)} characters from URL")
+    
+    result = f"Title: {title}\n\n" if title else ""
+    result += article_content
+    
+    return result
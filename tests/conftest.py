@@ -0,0 +1,6 @@
+import pytest
+from benchmarks.bench_e2e import make_pdf as build_pdf
+
+@pytest.fixture
+def make_pdf():
+    return build_pdf
@@ -0,0 +1,34 @@
+from src.backends import BackendRouter, ExtractiveBackend
+
+TEXT = (
+    "The council approved the new transit budget on Monday after a long debate. "
+    "Members praised the weather at the start of the meeting. "
+    "The transit budget adds three bus routes and extends service hours. "
+    "Critics said the transit budget ignores cycling and walking routes. "
+    "A short break was held for coffee in the afternoon."
+)
+
+def test_extractive_summary_keeps_central_sentences_in_order_within_the_limit():
+    summary = ExtractiveBackend().summarize(TEXT, max_words=30)
+
+    assert len(summary.split()) <= 30
+    assert "three bus routes" in summary
+    assert "coffee" not in summary
+    assert summary.index("three bus routes") < summary.index("ignores cycling")
+
+def test_router_picks_extractive_for_short_inputs_and_when_the_model_is_gone():
+    router = BackendRouter(max_extractive_tokens=150)
+
+    assert router.extractive_reason(TEXT, False, 1000, 4) == "model unavailable"
+    assert router.extractive_reason(TEXT, True, 1000, 4).startswith("short input")
+    assert router.extractive_reason(TEXT * 20, True, 1000, 4) is None
+
+def test_router_goes_extractive_when_the_estimate_exceeds_the_budget():
+    router = BackendRouter(max_extractive_tokens=10, latency_budget=5.0)
+    text = TEXT * 40
+
+    assert router.extractive_reason(text, True, 200, 2) is None
+    router.observe(2.0)
+    assert router.rounds(1000, 200, 2) == 4
+    assert "exceeds latency budget" in router.extractive_reason(text, True, 200, 2)
+    assert router.extractive_reason(text, True, 200, 2, latency_budget=60.0) is None
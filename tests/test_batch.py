@@ -0,0 +1,27 @@
+from src.batch import parse_url_list, summarize_urls
+from src.fake_model import FakeModel
+from src.summarizer import ArticleSummarizer
+
+def test_url_lists_skip_comments_and_duplicates():
+    text = "# reading list\nhttps://a.example/1, https://b.example/2\n\nhttps://a.example/1 https://c.example/3\n"
+
+    assert parse_url_list(text) == ["https://a.example/1", "https://b.example/2", "https://c.example/3"]
+    assert parse_url_list(text, limit=2) == ["https://a.example/1", "https://b.example/2"]
+
+def test_every_url_gets_a_result_and_failures_stay_isolated():
+    def fetch(url: str) -> str:
+        if "broken" in url:
+            raise ValueError("connection refused")
+        return " ".join(f"Sentence {i} of the article at {url}." for i in range(60))
+
+    urls = [f"https://site{i % 2}.example/{i}" for i in range(6)] + ["https://broken.example/"]
+    model = FakeModel(latency=0.01)
+    summarizer = ArticleSummarizer(model=model, max_chunk_tokens=2000)
+
+    results = sorted(summarize_urls(urls, summarizer, per_host_limit=2, fetch=fetch), key=lambda r: r["position"])
+
+    assert [r["url"] for r in results] == urls
+    assert all(r["summary"] and r["error"] is None for r in results[:-1])
+    assert model.call_count == 6
+    assert results[-1]["summary"] is None
+    assert "connection refused" in results[-1]["error"]
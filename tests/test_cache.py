@@ -0,0 +1,29 @@
+import time
+from src.cache import SummaryCache, make_key, normalize_text
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = SummaryCache(str(tmp_path / "summaries.sqlite3"))
+    cache.set("short", "gone soon", ttl=0.05)
+    cache.set("long", "still here")
+
+    time.sleep(0.1)
+
+    assert cache.get("short") is None
+    assert cache.get("long") == "still here"
+    assert cache.stats()["entries"] == 1
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path):
+    cache = SummaryCache(str(tmp_path / "summaries.sqlite3"), max_entries=2)
+    cache.set("a", "first")
+    cache.set("b", "second")
+    time.sleep(0.01)
+    cache.get("a")
+    cache.set("c", "third")
+
+    assert cache.get("a") == "first"
+    assert cache.get("b") is None
+    assert cache.get("c") == "third"
+
+def test_keys_ignore_whitespace_differences_once_normalized():
+    assert make_key("summary", normalize_text("Some  text\n\nhere ")) == make_key("summary", normalize_text("Some text here"))
+    assert make_key("a", "bc") != make_key("ab", "c")
@@ -0,0 +1,55 @@
+import threading
+from src.context_cache import ContextCache
+from src.fake_model import FakeModel
+
+SYSTEM = "You are a careful reading assistant."
+
+def document(n: int) -> str:
+    return f"Document {n}. " + "Plenty of text for the provider to keep. " * 50
+
+def test_contexts_are_reused_and_built_lazily():
+    model, cache, built = FakeModel(), ContextCache(min_tokens=10), []
+
+    def content():
+        built.append(1)
+        return document(1)
+
+    first = cache.get(model, "doc-1", SYSTEM, content)
+    second = cache.get(model, "doc-1", SYSTEM, content)
+
+    assert first is second
+    assert len(built) == 1
+    assert list(model.contexts) == [first.name]
+
+def test_least_recently_used_contexts_are_deleted_at_the_provider():
+    model, cache = FakeModel(), ContextCache(min_tokens=10, max_contexts=2)
+    first = cache.get(model, "doc-1", SYSTEM, document(1))
+    cache.get(model, "doc-2", SYSTEM, document(2))
+    cache.get(model, "doc-1", SYSTEM, document(1))
+    cache.get(model, "doc-3", SYSTEM, document(3))
+
+    assert len(model.deleted_contexts) == 1
+    assert model.deleted_contexts != [first.name]
+    assert cache.stats()["contexts"] == 2
+
+def test_content_below_the_provider_minimum_is_skipped_without_a_call():
+    model, cache = FakeModel(), ContextCache(min_tokens=100000)
+
+    assert cache.get(model, "doc-1", SYSTEM, document(1)) is None
+    assert model.contexts == {}
+    assert cache.stats()["skipped"] == 1
+
+def test_concurrent_callers_create_one_context_and_leave_no_key_locks():
+    model, cache = FakeModel(), ContextCache(min_tokens=10, max_contexts=2)
+    threads = [
+        threading.Thread(target=cache.get, args=(model, f"doc-{i % 4}", SYSTEM, document(i % 4)))
+        for i in range(16)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(model.contexts) == 2
+    assert len(model.contexts) + len(model.deleted_contexts) >= 4
+    assert cache._key_locks == {}
@@ -0,0 +1,34 @@
+import pytest
+from src.extraction import DensityExtractor, HeuristicExtractor, get_extractor
+
+BODY = " ".join(
+    f"Paragraph {i} explains, in some detail, how the survey was run, who answered it, and what changed since last year."
+    for i in range(3)
+)
+
+PAGE = f"""<html><head><title>Survey results | Example News</title><script>var tracking = 1;</script></head>
+<body>
+<nav><ul>{"".join(f'<li><a href="/s{i}">Section link {i} with a long label</a></li>' for i in range(30))}</ul></nav>
+<div class="content"><h1>Survey results</h1>{"".join(f"<p>{BODY}</p>" for _ in range(3))}</div>
+<div class="comments">{"".join(f"<p>Reader comment {i}: great, thanks, agreed.</p>" for i in range(5))}</div>
+<footer>Copyright Example News. All rights reserved.</footer>
+</body></html>""".encode()
+
+@pytest.mark.parametrize("extractor", [DensityExtractor(), HeuristicExtractor()], ids=["density", "heuristic"])
+def test_article_text_is_kept_and_navigation_dropped(extractor):
+    title, text = extractor.extract(PAGE)
+
+    assert "Survey results" in title
+    assert "how the survey was run" in text
+    assert "Section link" not in text
+    assert "tracking" not in text
+
+def test_density_extractor_drops_comments_and_footer():
+    _, text = DensityExtractor().extract(PAGE)
+
+    assert "Reader comment" not in text
+    assert "Copyright" not in text
+
+def test_unknown_engines_fall_back_to_the_heuristic_extractor():
+    assert isinstance(get_extractor("density"), DensityExtractor)
+    assert isinstance(get_extractor("no-such-engine"), HeuristicExtractor)
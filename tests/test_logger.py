@@ -0,0 +1,61 @@
+import json
+import logging
+import multiprocessing
+import queue
+from src import logger as logger_module
+from src.logger import JsonFormatter, NonBlockingQueueHandler, init_worker_logging
+
+def log_from_worker(message: str) -> list:
+    log = logging.getLogger("cantell_assistant")
+    try:
+        raise ValueError("worker failure")
+    except ValueError:
+        log.exception(message)
+    return [type(h).__name__ for h in log.handlers] + [logger_module.listener is None]
+
+def make_logger(handler: logging.Handler, name: str) -> logging.Logger:
+    log = logging.getLogger(name)
+    log.propagate = False
+    log.handlers = [handler]
+    return log
+
+def test_exception_survives_the_queue():
+    handler = NonBlockingQueueHandler(queue.Queue())
+    log = make_logger(handler, "test_exception_survives_the_queue")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        log.exception("failed")
+
+    record = handler.queue.get_nowait()
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "failed"
+    assert "ValueError: boom" in entry["exception"]
+    assert record.exc_info is None
+
+def test_dropped_records_are_reported():
+    handler = NonBlockingQueueHandler(queue.Queue(2))
+    log = make_logger(handler, "test_dropped_records_are_reported")
+    for i in range(5):
+        log.warning(f"line {i}")
+    assert handler.dropped == 3
+
+    handler.queue.get_nowait()
+    handler.queue.get_nowait()
+    log.warning("after")
+
+    messages = [handler.queue.get_nowait().getMessage() for _ in range(2)]
+    assert messages == ["after", "Dropped 3 log record(s) because the log queue was full"]
+    assert handler.reported == 3
+
+def test_worker_processes_log_through_the_parent_queue():
+    log_queue = multiprocessing.get_context("spawn").Queue()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+    with context.Pool(1, initializer=init_worker_logging, initargs=(log_queue,)) as pool:
+        handlers = pool.apply(log_from_worker, ("from the worker",))
+
+    record = log_queue.get(timeout=10)
+    assert handlers == ["NonBlockingQueueHandler", True]
+    assert record.getMessage() == "from the worker"
+    assert record.processName != "MainProcess"
+    assert "ValueError: worker failure" in json.loads(JsonFormatter().format(record))["exception"]
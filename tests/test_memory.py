@@ -0,0 +1,34 @@
+from src.fake_model import FakeModel
+from src.memory import ConversationMemory
+from src.summarizer import ArticleSummarizer
+
+class FailingModel(FakeModel):
+    def generate_content(self, prompt: str, **kwargs):
+        raise RuntimeError("503 model unavailable")
+
+def test_full_window_rolls_half_the_turns_into_one_summary_call():
+    model = FakeModel(responder=lambda prompt: "Running summary.")
+    summarizer = ArticleSummarizer(model=model)
+    memory = ConversationMemory(max_turns=6)
+
+    calls = []
+    for i in range(1, 21):
+        memory.add_turn(f"question {i}", f"answer {i}", summarizer)
+        calls.append(model.call_count)
+        assert len(memory) <= 6
+
+    assert calls[:6] == [0] * 6
+    assert calls[6] == 1
+    assert model.call_count == 4
+    assert memory.summary == "Running summary."
+    assert [t["user"] for t in memory.history()] == [f"question {i}" for i in range(17, 21)]
+    assert "question 8" in model.prompts[1] and "question 4" not in model.prompts[1]
+
+def test_summary_keeps_a_truncated_transcript_when_the_model_fails():
+    memory = ConversationMemory(max_turns=2, max_summary_tokens=50)
+
+    for i in range(1, 5):
+        memory.add_turn(f"question {i}", f"answer {i}", ArticleSummarizer(model=FailingModel()))
+
+    assert memory.summary == "User: question 1\nEIT: answer 1\nUser: question 2\nEIT: answer 2"
+    assert [t["user"] for t in memory.history()] == ["question 3", "question 4"]
@@ -0,0 +1,54 @@
+import hashlib
+import io
+import os
+import src.pdf_handler as pdf_handler
+from src.pdf_handler import SpooledPDF, extract_text_from_pdf, iter_pdf_pages
+
+def test_spooled_upload_larger_than_memory_round_trips():
+    data = os.urandom(pdf_handler.SPOOL_MEMORY_BYTES * 2 + 12345)
+
+    with SpooledPDF(io.BytesIO(data)) as spool:
+        assert spool.path is not None
+        assert spool.size == len(data)
+        assert spool.sha256 == hashlib.sha256(data).hexdigest()
+        assert os.path.getsize(spool.path) == len(data)
+        spool.file.seek(0)
+        assert spool.file.read() == data
+        path = spool.path
+
+    assert not os.path.exists(path)
+
+def test_spooled_upload_stays_in_memory_under_threshold():
+    data = b"%PDF-1.4\n" + b"x" * 1024
+
+    with SpooledPDF(io.BytesIO(data)) as spool:
+        assert spool.path is None
+        assert spool.worker_source == data
+
+def test_spooled_pdf_extracts_the_same_text_as_in_memory(make_pdf, monkeypatch):
+    pdf = make_pdf(12)
+    expected = extract_text_from_pdf(io.BytesIO(pdf), workers=1)
+
+    monkeypatch.setattr(pdf_handler, "SPOOL_MEMORY_BYTES", 4096)
+    monkeypatch.setattr(pdf_handler, "SPOOL_BLOCK_BYTES", 1024)
+    with SpooledPDF(io.BytesIO(pdf)) as spool:
+        assert spool.path is not None
+        assert os.path.getsize(spool.path) == len(pdf)
+        assert extract_text_from_pdf(spool, workers=1) == expected
+    assert "Page 12 line 19" in expected
+
+def test_small_pdfs_are_extracted_without_a_worker_pool(make_pdf, monkeypatch):
+    def no_pool(*args):
+        raise AssertionError("started a worker pool")
+
+    monkeypatch.setattr(pdf_handler, "_iter_pages_parallel", no_pool)
+    pages = list(iter_pdf_pages(io.BytesIO(make_pdf(pdf_handler.PARALLEL_MIN_PAGES - 1)), workers=4))
+    pages += list(iter_pdf_pages(io.BytesIO(make_pdf(pdf_handler.PARALLEL_MIN_PAGES)), workers=1))
+
+    assert len(pages) == 2 * pdf_handler.PARALLEL_MIN_PAGES - 1
+    assert all(text for _, text in pages)
+
+def test_page_timeout_skips_slow_pages_on_the_worker_pool(make_pdf):
+    pages = list(iter_pdf_pages(io.BytesIO(make_pdf(pdf_handler.PARALLEL_MIN_PAGES)), page_timeout=1e-6, workers=2))
+
+    assert sorted(pages) == [(page, "") for page in range(1, pdf_handler.PARALLEL_MIN_PAGES + 1)]
@@ -0,0 +1,103 @@
+import io
+import os
+import tempfile
+import threading
+import time
+import src.pdf_handler as pdf_handler
+import src.pdf_store as pdf_store
+from src.pdf_store import PDFTextStore
+
+def slow_pages(delay: float, probe):
+    extract = pdf_store.iter_pdf_pages
+
+    def iter_pdf_pages(*args, **kwargs):
+        for page in extract(*args, **kwargs):
+            time.sleep(delay)
+            probe()
+            yield page
+    return iter_pdf_pages
+
+def test_identical_uploads_share_one_extraction_without_keeping_pages(make_pdf, monkeypatch, tmp_path):
+    spool_dir = tmp_path / "spool"
+    spool_dir.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(spool_dir))
+    monkeypatch.setattr(pdf_handler, "SPOOL_MEMORY_BYTES", 1024)
+    store = PDFTextStore(str(tmp_path / "store"))
+    pdf = make_pdf(6)
+    results, extractions, kept_parts, open_spools = {}, [], [], []
+
+    def probe():
+        kept_parts.extend(len(flight.parts) for flight in list(store._flights._flights.values()))
+        open_spools.append(len(os.listdir(spool_dir)))
+
+    monkeypatch.setattr(pdf_store, "iter_pdf_pages", slow_pages(0.02, probe))
+    extract_pages = store._extract_pages
+
+    def counting_extract(spool, options):
+        extractions.append(spool.sha256)
+        return extract_pages(spool, options)
+
+    monkeypatch.setattr(store, "_extract_pages", counting_extract)
+
+    def upload(name: str):
+        sha256, pages = store.iter_pages(io.BytesIO(pdf), workers=1)
+        results[name] = [(number, text) for number, text, _ in pages if text.strip()]
+
+    threads = [threading.Thread(target=upload, args=(f"session-{i}",)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+
+    assert len(extractions) == 1
+    assert len({tuple(pages) for pages in results.values()}) == 1
+    assert [number for number, _ in results["session-0"]] == list(range(1, 7))
+    assert max(kept_parts) == 0
+    assert open_spools[-1] == 1
+    assert store._flights.in_flight() == 0
+    assert os.listdir(spool_dir) == []
+
+def test_chunk_index_is_built_once_and_shared(make_pdf, tmp_path):
+    store = PDFTextStore(str(tmp_path / "store"))
+    handle = store.get_or_extract(io.BytesIO(make_pdf(3)), workers=1)
+
+    pdf_index = store.index(handle.sha256)
+
+    assert pdf_index is store.index(handle.sha256)
+    assert pdf_index.doc_id == handle.sha256
+    assert len(pdf_index) == len(handle.chunks)
+    assert store.index("0" * 64) is None
+
+def test_least_recently_used_entries_are_evicted(make_pdf, tmp_path):
+    store = PDFTextStore(str(tmp_path / "store"), max_entries=2)
+    first, second = (store.get_or_extract(io.BytesIO(make_pdf(pages)), workers=1) for pages in (1, 2))
+    store.index(first.sha256)
+    old = time.time() - 60
+    os.utime(os.path.join(second.directory, pdf_store.INDEX_FILE), (old, old))
+
+    third = store.get_or_extract(io.BytesIO(make_pdf(3)), workers=1)
+
+    assert store.get(second.sha256) is None
+    assert store.get(first.sha256) is not None
+    assert store.get(third.sha256) is not None
+    assert store.index(first.sha256) is not None
+
+def test_replay_reports_the_real_page_count(make_pdf, monkeypatch, tmp_path):
+    def pages_with_blank_tail(spool, on_start=None, **options):
+        on_start(5)
+        yield from [(1, "First page text."), (2, "Second page text."), (3, ""), (4, " "), (5, "")]
+
+    monkeypatch.setattr(pdf_store, "iter_pdf_pages", pages_with_blank_tail)
+    store = PDFTextStore(str(tmp_path / "store"))
+    pdf = make_pdf(1)
+
+    sha256, pages = store.iter_pages(io.BytesIO(pdf))
+    extracted = list(pages)
+    sha256, pages = store.iter_pages(io.BytesIO(pdf))
+    replayed = list(pages)
+
+    assert store.get(sha256).metadata["page_count"] == 5
+    assert {total for _, _, total in extracted + replayed} == {5}
+    assert [number for number, _, _ in replayed] == [1, 2, 5]
+    assert replayed[-1] == (5, "", 5)
@@ -0,0 +1,104 @@
+import threading
+import time
+import pytest
+import src.rate_limiter as rate_limiter
+from src.fake_model import FakeModel
+from src.rate_limiter import AdaptiveConcurrencyLimiter, ModelRateLimiter, TokenBucket, current_session
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "BACKOFF_BASE", 0.01)
+
+def call(limiter: ModelRateLimiter, model: FakeModel, prompt: str = "hello") -> str:
+    return limiter.call(lambda: model.generate_content(prompt)).text
+
+def run_sessions(limiter: ModelRateLimiter, model: FakeModel, sessions: list, stagger: float) -> list:
+    finished, lock, threads = [], threading.Lock(), []
+
+    def run(session: str, number: int):
+        current_session.set(session)
+        call(limiter, model, f"{session} {number}")
+        with lock:
+            finished.append(session)
+
+    for session, calls in sessions:
+        for number in range(calls):
+            thread = threading.Thread(target=run, args=(session, number))
+            thread.start()
+            threads.append(thread)
+        time.sleep(stagger)
+    for thread in threads:
+        thread.join()
+    return finished
+
+def test_quota_errors_back_off_until_the_window_reopens():
+    model = FakeModel(quota=2, quota_window=0.3)
+    limiter = ModelRateLimiter(requests_per_minute=60000, max_concurrency=4)
+
+    started = time.monotonic()
+    results = [call(limiter, model) for _ in range(4)]
+
+    assert len(results) == 4
+    assert model.call_count == 4
+    assert model.throttled_calls >= 1
+    assert limiter.retries == limiter.throttled == model.throttled_calls
+    assert time.monotonic() - started >= 0.3
+
+def test_non_retryable_errors_are_raised_without_retrying():
+    limiter = ModelRateLimiter(requests_per_minute=60000)
+
+    def fail():
+        raise ValueError("bad prompt")
+
+    with pytest.raises(ValueError):
+        limiter.call(fail)
+    assert limiter.retries == 0
+    assert limiter.concurrency.stats()["in_flight"] == 0
+
+def test_concurrency_limit_halves_on_throttling_and_grows_back():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=8)
+    for _ in range(2):
+        limiter.acquire()
+        limiter.release(throttled=True)
+    assert limiter.limit == 2
+
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release()
+    assert 2 < limiter.limit <= 8
+
+def test_throttling_model_shrinks_the_limit_and_every_call_completes():
+    model = FakeModel(latency=0.02, max_concurrency=2)
+    limiter = ModelRateLimiter(requests_per_minute=60000, max_concurrency=8)
+
+    finished = run_sessions(limiter, model, [("busy", 16)], stagger=0)
+
+    assert len(finished) == 16
+    assert model.throttled_calls > 0
+    assert model.peak_concurrency <= 2
+    assert limiter.concurrency.limit < 8
+
+    shrunk = limiter.concurrency.limit
+    for _ in range(10):
+        call(limiter, model)
+    assert limiter.concurrency.limit > shrunk
+
+def test_sessions_share_the_quota_round_robin():
+    model = FakeModel(latency=0.01)
+    limiter = ModelRateLimiter(requests_per_minute=1200, max_concurrency=4)
+
+    finished = run_sessions(limiter, model, [("busy", 20), ("quiet", 3)], stagger=0.01)
+
+    assert len(finished) == 23
+    quiet = [position for position, session in enumerate(finished) if session == "quiet"]
+    assert quiet[-1] <= 15
+
+def test_token_bucket_serves_waiters_in_booking_order():
+    bucket = TokenBucket(600, capacity=1)
+
+    assert bucket.reserve() == 0.0
+    waits = [bucket.reserve() for _ in range(3)]
+
+    assert waits == sorted(waits)
+    assert waits[0] == pytest.approx(0.1, abs=0.02)
+    assert waits[-1] == pytest.approx(0.3, abs=0.02)
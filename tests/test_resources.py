@@ -0,0 +1,42 @@
+import pytest
+from src import resources
+from src.metrics import start_metrics_server
+from src.resources import ResourceRegistry, probe
+
+def failing():
+    raise RuntimeError("backend down")
+
+@pytest.fixture
+def server():
+    server = start_metrics_server(port=0)
+    yield server.server_port
+    server.shutdown()
+    server.server_close()
+
+def test_probe_reports_the_running_registry(server, monkeypatch):
+    registry = ResourceRegistry()
+    registry.register("client", lambda: object())
+    registry.register("cache", failing, required=False)
+    registry.warm_up(background=False)
+    monkeypatch.setattr(resources, "registry", registry)
+
+    health = probe(port=server)
+
+    assert health["ready"] is True
+    assert health["resources"]["client"]["state"] == "ready"
+    assert health["resources"]["cache"]["error"] == "backend down"
+
+def test_probe_reports_not_ready_when_a_required_resource_failed(server, monkeypatch):
+    registry = ResourceRegistry()
+    registry.register("model_backend", failing)
+    registry.warm_up(background=False)
+    monkeypatch.setattr(resources, "registry", registry)
+
+    health = probe(port=server)
+
+    assert health["ready"] is False
+    assert health["resources"]["model_backend"]["state"] == "failed"
+
+def test_probe_before_the_registry_exists(server, monkeypatch):
+    monkeypatch.setattr(resources, "registry", None)
+    assert probe(port=server) == {"ready": False, "warming": False, "resources": {}}
@@ -0,0 +1,28 @@
+from src.chunker import estimate_tokens
+from src.retrieval import ChunkIndex
+
+def filler(topic: str, count: int = 40) -> str:
+    return " ".join(f"The {topic} report covers routine matter {i}." for i in range(count))
+
+def make_index() -> ChunkIndex:
+    chunks = [filler("budget"), filler("staffing") + " The turbine failure was traced to a cracked blade.", filler("travel")]
+    return ChunkIndex(chunks=chunks, doc_id="doc")
+
+def test_search_ranks_the_chunk_holding_the_rare_terms_first():
+    index = make_index()
+
+    assert index.search("why did the turbine fail", top_k=2)[0] == 1
+    assert index.search("travel report", top_k=1) == [2]
+
+def test_unmatched_queries_fall_back_to_the_first_chunks():
+    assert make_index().search("zeppelin", top_k=2) == [0, 1]
+
+def test_context_keeps_document_order_within_the_token_budget():
+    index = make_index()
+    one_chunk = estimate_tokens(index.chunks[1])
+
+    context = index.context_for("turbine budget travel", top_k=3, max_tokens=one_chunk)
+    assert context.count("[Excerpt") == 1
+
+    context = index.context_for("turbine budget travel", top_k=3, max_tokens=10 * one_chunk)
+    assert context.index("[Excerpt 1 of 3]") < context.index("[Excerpt 2 of 3]") < context.index("[Excerpt 3 of 3]")
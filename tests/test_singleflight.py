@@ -0,0 +1,66 @@
+import threading
+import time
+from src.singleflight import SingleFlight
+
+def run_together(count: int, target) -> list:
+    results, errors = [None] * count, [None] * count
+
+    def run(i: int):
+        try:
+            results[i] = target()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+def test_concurrent_callers_share_one_call():
+    flights, calls = SingleFlight("test"), []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.1)
+        return "result"
+
+    results, _ = run_together(5, lambda: flights.do("key", work))
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert flights.in_flight() == 0
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    flights, calls = SingleFlight("test"), []
+
+    def fail():
+        calls.append(1)
+        time.sleep(0.1)
+        raise ValueError("backend down")
+
+    _, errors = run_together(3, lambda: flights.do("key", fail))
+
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert len(calls) == 1
+    assert flights.do("key", lambda: "recovered") == "recovered"
+
+def test_late_stream_joiners_get_the_parts_already_streamed():
+    flights, release, streams = SingleFlight("test"), threading.Event(), []
+
+    def parts():
+        streams.append(1)
+        yield "one "
+        release.wait(5)
+        yield "two"
+
+    leader = flights.stream("key", parts)
+    assert next(leader) == "one "
+    follower = flights.stream("key", parts)
+    assert next(follower) == "one "
+    release.set()
+
+    assert "".join(leader) == "two"
+    assert "".join(follower) == "two"
+    assert len(streams) == 1
@@ -0,0 +1,88 @@
+import asyncio
+import re
+import time
+import pytest
+from src.fake_model import FakeModel
+from src.cache import SummaryCache
+from src.summarizer import EXTRACTIVE_NOTE, ArticleSummarizer
+
+CHUNK_TOKENS = 120
+PARTS = 10
+
+def long_document(parts: int = PARTS) -> str:
+    return "\n\n".join(
+        f"Section {i} opens here. " + " ".join(f"Detail {i}.{j} about the quarterly figures." for j in range(12))
+        for i in range(1, parts + 1)
+    )
+
+# Answers each chunk with its part number, finishing later parts first, so any
+# reduce step that follows completion order instead of chunk order shows up.
+def out_of_order_responder(prompt: str) -> str:
+    part = re.search(r"part (\d+) of (\d+)", prompt)
+    if part is None:
+        return "Final summary."
+    index, total = int(part.group(1)), int(part.group(2))
+    time.sleep(0.01 * (total - index))
+    return f"partial-{index}"
+
+def section_order(prompt: str) -> list:
+    return [int(n) for n in re.findall(r"Section (\d+) summary:\npartial-\1\b", prompt)]
+
+def make_summarizer(max_workers: int):
+    model = FakeModel(latency=0.02, responder=out_of_order_responder)
+    return model, ArticleSummarizer(model=model, max_chunk_tokens=CHUNK_TOKENS, max_workers=max_workers)
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_map_outputs_are_reduced_in_chunk_order(max_workers):
+    model, summarizer = make_summarizer(max_workers)
+
+    assert summarizer.summarize_text(long_document()) == "Final summary."
+
+    chunk_calls = model.call_count - 1
+    assert chunk_calls > max_workers
+    assert section_order(model.prompts[-1]) == list(range(1, chunk_calls + 1))
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_peak_in_flight_calls_stay_within_max_workers(max_workers):
+    model, summarizer = make_summarizer(max_workers)
+
+    summarizer.summarize_text(long_document())
+
+    assert model.peak_concurrency == max_workers
+
+def test_async_map_reduce_keeps_order_and_concurrency_limit():
+    model, summarizer = make_summarizer(3)
+
+    assert asyncio.run(summarizer.asummarize_text(long_document())) == "Final summary."
+
+    chunk_calls = model.call_count - 1
+    assert section_order(model.prompts[-1]) == list(range(1, chunk_calls + 1))
+    assert model.peak_concurrency == 3
+
+def pages_of(parts: int = 3) -> list:
+    return [(i, f"Page {i} reports the quarterly figures for region {i}. " * 40, parts) for i in range(1, parts + 1)]
+
+def test_progressive_summary_after_an_outage_is_not_served_from_cache(tmp_path):
+    outage = True
+
+    def responder(prompt: str) -> str:
+        if outage:
+            raise RuntimeError("503 model unavailable")
+        return "Model summary."
+
+    model = FakeModel(responder=responder)
+    summarizer = ArticleSummarizer(model=model, cache=SummaryCache(str(tmp_path / "summaries.sqlite3")))
+
+    degraded = list(summarizer.summarize_pages(pages_of(), doc_id="report"))[-1]
+    assert degraded.done and degraded.summary.startswith(EXTRACTIVE_NOTE)
+
+    outage = False
+    calls = model.call_count
+    recovered = list(summarizer.summarize_pages(pages_of(), doc_id="report"))[-1]
+    assert recovered.summary == "Model summary."
+    assert model.call_count > calls
+
+    calls = model.call_count
+    cached = list(summarizer.summarize_pages(pages_of(), doc_id="report"))[-1]
+    assert cached.summary == "Model summary."
+    assert model.call_count == calls
@@ -0,0 +1,65 @@
+import pytest
+import requests
+import src.url_handler as url_handler
+from src.cache import SummaryCache
+from src.url_handler import fetch_article_from_url, normalize_url
+
+ARTICLE = (
+    b"<html><head><title>Report</title></head><body><article><h1>Quarterly report</h1>"
+    b"<p>Revenue grew in every region this quarter, led by strong demand for the new product line.</p>"
+    b"</article></body></html>"
+)
+
+def response(status: int, content: bytes = b"", **headers) -> requests.Response:
+    result = requests.Response()
+    result.status_code = status
+    result._content = content
+    result.headers.update({name.replace("_", "-"): value for name, value in headers.items()})
+    return result
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(url_handler, "_http_cache", SummaryCache(str(tmp_path / "http.sqlite3")))
+    requests_seen, replies = [], []
+
+    def get(url, headers):
+        requests_seen.append(dict(headers))
+        return replies.pop(0)
+
+    monkeypatch.setattr(url_handler, "_get", get)
+    return requests_seen, replies
+
+def test_stale_entries_are_revalidated_with_a_conditional_get(server):
+    requests_seen, replies = server
+    replies.append(response(200, ARTICLE, ETag='"v1"'))
+    replies.append(response(304, ETag='"v1"'))
+
+    first = fetch_article_from_url("https://example.com/report")
+    second = fetch_article_from_url("https://example.com/report")
+
+    assert second == first
+    assert "Revenue grew" in first
+    assert requests_seen == [{}, {"If-None-Match": '"v1"'}]
+
+def test_fresh_entries_are_served_without_a_request(server):
+    requests_seen, replies = server
+    replies.append(response(200, ARTICLE, Cache_Control="max-age=600"))
+
+    fetch_article_from_url("https://example.com/report")
+    fetch_article_from_url("example.com:443/report#comments")
+
+    assert len(requests_seen) == 1
+
+def test_no_store_responses_are_not_cached(server):
+    requests_seen, replies = server
+    replies.append(response(200, ARTICLE, ETag='"v1"', Cache_Control="no-store"))
+    replies.append(response(200, ARTICLE, ETag='"v1"', Cache_Control="no-store"))
+
+    fetch_article_from_url("https://example.com/report")
+    fetch_article_from_url("https://example.com/report")
+
+    assert requests_seen == [{}, {}]
+
+def test_urls_are_normalized_before_caching():
+    assert normalize_url(" HTTPS://Example.com:443#top ") == "https://example.com/"
+    assert normalize_url("example.com:8080/a?b=1") == "https://example.com:8080/a?b=1"